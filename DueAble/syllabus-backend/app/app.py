@@ -16,7 +16,13 @@ try:
 except Exception:
     pass
 
-app = FastAPI(title="Syllabus Assignment Extractor", version="1.0.0")
+from .json_response import FastJSONResponse  # noqa: E402
+
+app = FastAPI(
+    title="Syllabus Assignment Extractor",
+    version="1.0.0",
+    default_response_class=FastJSONResponse,
+)
 
 # Import project modules AFTER app is created to avoid circular imports
 from .pdf_extractor import (  # noqa: E402
@@ -167,14 +173,16 @@ def health() -> Dict[str, str]:
     return {"status": "ok"}
 
 
-def _ok(**kwargs) -> Dict[str, Any]:
-    return {"status": "ok", **kwargs}
+# Returned as responses (not dicts) so FastAPI doesn't run jsonable_encoder /
+# response-model validation over every extracted item before encoding.
+def _ok(**kwargs) -> FastJSONResponse:
+    return FastJSONResponse({"status": "ok", **kwargs})
 
 
-def _err(msg: str, **kwargs) -> Dict[str, Any]:
+def _err(msg: str, **kwargs) -> FastJSONResponse:
     d = {"status": "error", "message": msg}
     d.update(kwargs)
-    return d
+    return FastJSONResponse(d)
 
 
 # ------------- date normalization helper to match DB -----------------
@@ -297,7 +305,7 @@ async def assignments_pdf_upload(
         False,
         description="If on and Gemini is configured, try to repair/normalize results.",
     ),
-) -> Dict[str, Any]:
+) -> FastJSONResponse:
     """
     Upload a PDF syllabus, parse assignments, and (optionally) repair with Gemini.
 
@@ -425,7 +433,7 @@ async def assignments_image_upload(
         description="Passed through to your OCR (if supported, e.g. 'screenshot').",
     ),
     use_llm: bool = Query(False, description="Repair/normalize with Gemini if configured"),
-) -> Dict[str, Any]:
+) -> FastJSONResponse:
     """
     Upload an image; OCR runs to extract assignments.
     """
@@ -491,7 +499,7 @@ async def assignments_image_upload(
 @app.post("/assignments/text")
 def assignments_from_text(
     text: str = Body(..., embed=True, description="Raw text blob to parse"),
-) -> Dict[str, Any]:
+) -> FastJSONResponse:
     """
     Simple text-only extraction (no OCR, no LLM).
     """
@@ -0,0 +1,53 @@
+"""
+JSON response class for the extractor API.
+
+Uses orjson when it's installed (several times faster than the stdlib encoder on
+the assignment lists we return) and falls back to json otherwise. Either way the
+payload is encoded directly, without FastAPI's jsonable_encoder pass.
+"""
+from __future__ import annotations
+
+import json
+import math
+from datetime import date, datetime
+from typing import Any
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson  # type: ignore
+except Exception:
+    orjson = None
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    if hasattr(obj, "tolist"):  # numpy arrays / scalars (OCR confidences etc.)
+        return obj.tolist()
+    return jsonable_encoder(obj)
+
+
+def _finite(obj: Any) -> Any:
+    # stdlib json would emit NaN, which isn't valid JSON; orjson writes null
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {k: _finite(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_finite(v) for v in obj]
+    return obj
+
+
+def dumps(content: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return json.dumps(_finite(content), default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -1,9 +1,18 @@
+import asyncio
+import json
 import os
 import time
-from typing import Any, Dict, Optional
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Set
 
 from dotenv import load_dotenv
 
+from . import chat_cache
+from .metrics import track_upstream
+from .replay import gemini_client
+from .rate_limit import PRIORITY_BACKGROUND, PRIORITY_EXPLAIN, PRIORITY_INTERACTIVE, RateLimited, TokenBucketLimiter
+from .ttl_cache import TTLCache, shared_backing
+
 load_dotenv()
 
 # Gemini optional
@@ -13,9 +22,50 @@ GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash-lite")
 AI_DISABLED_UNTIL = 0
 AI_COOLDOWN_SECONDS = 60
 
+# Gemini quota for the configured model/tier; every call goes through one token bucket sized to it
+GEMINI_RPM = int(os.getenv("GEMINI_RPM", "15"))
+GEMINI_TPM = int(os.getenv("GEMINI_TPM", "250000"))
+# Output tokens assumed per call until the response reports real usage
+AI_EXPECTED_OUTPUT_TOKENS = int(os.getenv("AI_EXPECTED_OUTPUT_TOKENS", "300"))
+# How long a call may wait in the queue before its caller uses the fallback text instead
+AI_DEADLINES = {
+    PRIORITY_INTERACTIVE: float(os.getenv("AI_CHAT_DEADLINE_SECONDS", "8")),
+    PRIORITY_EXPLAIN: float(os.getenv("AI_EXPLAIN_DEADLINE_SECONDS", "3")),
+    PRIORITY_BACKGROUND: float(os.getenv("AI_BACKGROUND_DEADLINE_SECONDS", "30")),
+}
+_limiter = TokenBucketLimiter("gemini", GEMINI_RPM, GEMINI_TPM)
+
 CACHE_DURATION = 300           # 5 min
 METRIC_CACHE_DURATION = 86400  # 24h
-explanation_cache: Dict[str, Dict[str, Any]] = {}
+AI_CACHE_MAX_ENTRIES = int(os.getenv("AI_CACHE_MAX_ENTRIES", "2000"))
+AI_CACHE_MAX_BYTES = int(os.getenv("AI_CACHE_MAX_BYTES", str(4 * 1024 * 1024)))
+# Expired explanations are still served (and refreshed in the background) for this long
+AI_MAX_STALE_SECONDS = float(os.getenv("AI_MAX_STALE_SECONDS", "3600"))
+# cache key -> explanation text (main_*) or metric dict (metrics_*), each with its own TTL
+explanation_cache = TTLCache(
+    "ai_explanations",
+    default_ttl=CACHE_DURATION,
+    max_entries=AI_CACHE_MAX_ENTRIES,
+    max_bytes=AI_CACHE_MAX_BYTES,
+    backing=shared_backing(),
+    max_stale=AI_MAX_STALE_SECONDS,
+)
+
+# Explanation prompts that arrive within this window are packed into one structured-output call
+AI_BATCH_WINDOW_SECONDS = float(os.getenv("AI_BATCH_WINDOW_MS", "50")) / 1000.0
+AI_BATCH_MAX_ITEMS = int(os.getenv("AI_BATCH_MAX_ITEMS", "8"))
+
+# cache key -> in-flight computation
+_in_flight: Dict[str, "asyncio.Future[Any]"] = {}
+
+# Pending batch items: {"kind", "line", "prompt", "fallback", "priority", "future"}
+_batch: List[Dict[str, Any]] = []
+_batch_timer: Optional[asyncio.TimerHandle] = None
+_batch_tasks: Set["asyncio.Future[Any]"] = set()
+
+_ai_stats = {"gemini_calls": 0, "batched_calls": 0, "batched_items": 0, "coalesced": 0, "chat_streams": 0}
+# Time to first streamed chat token (ms), most recent calls
+_ttft_ms: Deque[float] = deque(maxlen=200)
 
 try:
     from google import genai  # type: ignore
@@ -25,6 +75,9 @@ try:
 except Exception:
     _client = None
 
+# Replay / record mode (UPSTREAM_MODE) swaps in a fixture-backed client or wraps the real one
+_client = gemini_client(_client)
+
 
 def ai_ready() -> bool:
     return _client is not None and time.time() >= AI_DISABLED_UNTIL
@@ -115,23 +168,179 @@ def _fallback_52wk(current_price: Any, hi: Any, lo: Any) -> str:
         return "52-week range not available."
 
 
-def get_main_explanation(symbol: str, company_name: str, current_price: Any, change_percent: float) -> str:
+def _note_ai_error(e: Exception) -> None:
     global AI_DISABLED_UNTIL
+    msg = str(e)
+    if "429" in msg or "RESOURCE_EXHAUSTED" in msg:
+        AI_DISABLED_UNTIL = time.time() + AI_COOLDOWN_SECONDS
+        _limiter.throttle()
 
-    cache_key = f"main_{symbol}_{round(change_percent, 1)}"
-    now = time.time()
 
-    if cache_key in explanation_cache:
-        cached = explanation_cache[cache_key]
-        if now - cached["timestamp"] < CACHE_DURATION:
-            return cached["text"]
+def _estimate_tokens(prompt: str) -> int:
+    return len(prompt) // 4 + AI_EXPECTED_OUTPUT_TOKENS
+
+
+def _settle(cost: int, resp: Any) -> None:
+    usage = getattr(resp, "usage_metadata", None)
+    _limiter.settle(cost, getattr(usage, "total_token_count", None))
+
+
+def _generate(prompt: str, priority: int = PRIORITY_EXPLAIN) -> str:
+    cost = _estimate_tokens(prompt)
+    _limiter.acquire(cost, priority, AI_DEADLINES[priority])
+    _ai_stats["gemini_calls"] += 1
+    with track_upstream("gemini", "generate"):
+        resp = _client.models.generate_content(model=GEMINI_MODEL, contents=prompt)  # type: ignore
+    _settle(cost, resp)
+    return (resp.text or "").strip()
+
+
+async def _generate_async(prompt: str, priority: int = PRIORITY_EXPLAIN) -> str:
+    cost = _estimate_tokens(prompt)
+    await _limiter.acquire_async(cost, priority, AI_DEADLINES[priority])
+    _ai_stats["gemini_calls"] += 1
+    with track_upstream("gemini", "generate"):
+        resp = await _client.aio.models.generate_content(model=GEMINI_MODEL, contents=prompt)  # type: ignore
+    _settle(cost, resp)
+    return (resp.text or "").strip()
+
+
+async def _generate_json_async(prompt: str, priority: int = PRIORITY_EXPLAIN, outputs: int = 1) -> Dict[str, Any]:
+    """Structured-output call: Gemini is asked for a JSON object and we parse it."""
+    cost = len(prompt) // 4 + AI_EXPECTED_OUTPUT_TOKENS * outputs
+    await _limiter.acquire_async(cost, priority, AI_DEADLINES[priority])
+    _ai_stats["gemini_calls"] += 1
+    with track_upstream("gemini", "generate_json"):
+        resp = await _client.aio.models.generate_content(  # type: ignore
+            model=GEMINI_MODEL,
+            contents=prompt,
+            config={"response_mime_type": "application/json"},
+        )
+    _settle(cost, resp)
+    data = json.loads(resp.text or "{}")
+    return data if isinstance(data, dict) else {}
+
+
+# ---- single-flight: concurrent requests for the same cache key share one computation ----
+
+async def _single_flight(cache_key: str, compute: Callable[[], Awaitable[Any]]) -> Any:
+    """
+    The computation runs as its own task and callers await it through shield(),
+    so one caller timing out doesn't cancel it for the rest.
+    """
+    task = _in_flight.get(cache_key)
+    if task is not None and task.get_loop() is asyncio.get_running_loop():
+        _ai_stats["coalesced"] += 1
+        return await asyncio.shield(task)
+
+    task = asyncio.ensure_future(compute())
+    _in_flight[cache_key] = task
+
+    def _done(t: "asyncio.Future[Any]") -> None:
+        if _in_flight.get(cache_key) is t:
+            _in_flight.pop(cache_key, None)
+
+    task.add_done_callback(_done)
+    return await asyncio.shield(task)
 
-    if not ai_ready():
-        text = fallback_main_explanation(company_name, current_price, change_percent)
-        explanation_cache[cache_key] = {"text": text, "timestamp": now}
-        return text
 
-    prompt = f"""
+# ---- micro-batcher: explanation prompts arriving within a short window share one Gemini call ----
+
+def _submit(
+    kind: str,
+    line: str,
+    prompt: str,
+    fallback: Optional[Dict[str, str]] = None,
+    priority: int = PRIORITY_EXPLAIN,
+) -> "asyncio.Future[Any]":
+    """
+    Queue one explanation task for the next batch.
+    The future resolves to a str ("explain") / dict ("metrics"), or None if Gemini failed
+    or the rate limiter couldn't fit the call in before the deadline.
+    """
+    global _batch_timer
+    loop = asyncio.get_running_loop()
+    item = {
+        "kind": kind,
+        "line": line,
+        "prompt": prompt,
+        "fallback": fallback,
+        "priority": priority,
+        "future": loop.create_future(),
+    }
+    _batch.append(item)
+    if len(_batch) >= AI_BATCH_MAX_ITEMS:
+        _flush_batch()
+    elif _batch_timer is None:
+        _batch_timer = loop.call_later(AI_BATCH_WINDOW_SECONDS, _flush_batch)
+    return item["future"]
+
+
+def _flush_batch() -> None:
+    global _batch_timer
+    if _batch_timer is not None:
+        _batch_timer.cancel()
+        _batch_timer = None
+    items = list(_batch)
+    _batch.clear()
+    if items:
+        task = asyncio.ensure_future(_run_batch(items))
+        _batch_tasks.add(task)
+        task.add_done_callback(_batch_tasks.discard)
+
+
+def _batch_prompt(items: List[Dict[str, Any]]) -> str:
+    tasks = "\n".join(f't{i} ({item["kind"]}): {item["line"]}' for i, item in enumerate(items))
+    return f"""
+You explain stocks to people who have never invested before. Answer every task below.
+
+Return ONLY a JSON object whose keys are the task ids (t0, t1, ...):
+- "explain" task -> a string of 2-3 simple sentences about today's move. Be encouraging but honest.
+- "metrics" task -> an object with keys "pe_ratio", "market_cap", "week_52_range",
+  each 1-2 sentences in simple language.
+
+Tasks:
+{tasks}
+"""
+
+
+def _parse_batched(item: Dict[str, Any], value: Any) -> Any:
+    if item["kind"] == "explain":
+        return value.strip() if isinstance(value, str) and value.strip() else None
+    if not isinstance(value, dict):
+        return None
+    fallback = item["fallback"] or {}
+    return {k: (str(value.get(k) or "").strip() or fallback.get(k, "")) for k in ("pe_ratio", "market_cap", "week_52_range")}
+
+
+async def _run_batch(items: List[Dict[str, Any]]) -> None:
+    # The batch is as urgent as its most urgent item
+    priority = min(item["priority"] for item in items)
+    try:
+        if len(items) == 1:
+            # Nothing to pack: use the plain single-symbol prompt
+            item = items[0]
+            text = await _generate_async(item["prompt"], priority)
+            if item["kind"] == "explain":
+                results = [text or None]
+            else:
+                results = [_parse_metrics(text, item["fallback"]) if text else None]
+        else:
+            _ai_stats["batched_calls"] += 1
+            _ai_stats["batched_items"] += len(items)
+            data = await _generate_json_async(_batch_prompt(items), priority, outputs=len(items))
+            results = [_parse_batched(item, data.get(f"t{i}")) for i, item in enumerate(items)]
+    except Exception as e:
+        _note_ai_error(e)
+        results = [None] * len(items)
+
+    for item, result in zip(items, results):
+        if not item["future"].done():
+            item["future"].set_result(result)
+
+
+def _main_prompt(symbol: str, company_name: str, current_price: Any, change_percent: float) -> str:
+    return f"""
 The stock {symbol} ({company_name}) is currently at ${current_price},
 with a change of {change_percent:.2f}% from yesterday's close.
 
@@ -139,52 +348,75 @@ Explain this to someone who's never invested before in 2-3 simple sentences.
 Be encouraging but honest.
 """
 
-    try:
-        resp = _client.models.generate_content(model=GEMINI_MODEL, contents=prompt)  # type: ignore
-        text = (resp.text or "").strip()
-        if not text:
-            text = fallback_main_explanation(company_name, current_price, change_percent)
-        explanation_cache[cache_key] = {"text": text, "timestamp": now}
-        return text
-    except Exception as e:
-        msg = str(e)
-        if "429" in msg or "RESOURCE_EXHAUSTED" in msg:
-            AI_DISABLED_UNTIL = time.time() + AI_COOLDOWN_SECONDS
-        text = fallback_main_explanation(company_name, current_price, change_percent)
-        explanation_cache[cache_key] = {"text": text, "timestamp": now}
-        return text
 
+def _main_line(symbol: str, company_name: str, current_price: Any, change_percent: float) -> str:
+    return f"{symbol} ({company_name}) is at ${current_price}, {change_percent:+.2f}% from yesterday's close."
 
-def get_metric_explanations(
+
+async def get_main_explanation_async(
     symbol: str,
     company_name: str,
     current_price: Any,
-    pe_ratio: Any,
-    market_cap: Any,
-    week_52_high: Any,
-    week_52_low: Any,
-) -> Dict[str, str]:
-    global AI_DISABLED_UNTIL
+    change_percent: float,
+    meta: Optional[Dict[str, Any]] = None,
+) -> str:
+    """
+    Beginner explanation of today's move (Gemini, or fallback text when it's unavailable).
+    Concurrent callers share one call, and the call itself may be batched with other symbols.
+    An expired entry (within AI_MAX_STALE_SECONDS) is returned right away and refreshed
+    in the background; meta["stale"] tells the caller which one it got.
+    """
+    cache_key = f"main_{symbol}_{round(change_percent, 1)}"
 
-    cache_key = f"metrics_{symbol}"
-    now = time.time()
+    async def compute(keep_stale: bool = False) -> str:
+        text = await _submit(
+            "explain",
+            _main_line(symbol, company_name, current_price, change_percent),
+            _main_prompt(symbol, company_name, current_price, change_percent),
+            priority=PRIORITY_BACKGROUND if keep_stale else PRIORITY_EXPLAIN,
+        )
+        if not text:
+            if keep_stale:
+                raise RuntimeError("explanation refresh failed")  # keep the stale Gemini text
+            text = fallback_main_explanation(company_name, current_price, change_percent)
+        explanation_cache.set(cache_key, text, CACHE_DURATION)
+        return text
+
+    hit = explanation_cache.get_stale(cache_key)
+    if hit is not None:
+        cached, stale = hit
+        if stale and ai_ready():
+            explanation_cache.refresh_in_background(cache_key, lambda: compute(keep_stale=True))
+        if meta is not None:
+            meta["stale"] = stale
+        return cached
+
+    if not ai_ready():
+        text = fallback_main_explanation(company_name, current_price, change_percent)
+        explanation_cache.set(cache_key, text, CACHE_DURATION)
+        return text
 
-    if cache_key in explanation_cache:
-        cached = explanation_cache[cache_key]
-        if now - cached["timestamp"] < METRIC_CACHE_DURATION:
-            return cached["data"]
+    return await _single_flight(cache_key, compute)
 
-    fallback = {
+
+def fallback_metric_explanations(current_price: Any, pe_ratio: Any, market_cap: Any, week_52_high: Any, week_52_low: Any) -> Dict[str, str]:
+    return {
         "pe_ratio": _fallback_pe(pe_ratio),
         "market_cap": _fallback_market_cap(market_cap),
         "week_52_range": _fallback_52wk(current_price, week_52_high, week_52_low),
     }
 
-    if not ai_ready():
-        explanation_cache[cache_key] = {"data": fallback, "timestamp": now}
-        return fallback
 
-    prompt = f"""
+def _metrics_prompt(
+    symbol: str,
+    company_name: str,
+    current_price: Any,
+    pe_ratio: Any,
+    market_cap: Any,
+    week_52_high: Any,
+    week_52_low: Any,
+) -> str:
+    return f"""
 Explain these stock metrics for {company_name} ({symbol}) to a complete beginner.
 For each metric, write 1-2 sentences in simple language.
 
@@ -200,37 +432,108 @@ MARKET_CAP: ...
 WEEK_52_RANGE: ...
 """
 
-    try:
-        resp = _client.models.generate_content(model=GEMINI_MODEL, contents=prompt)  # type: ignore
-        text = (resp.text or "").strip()
 
-        out: Dict[str, str] = {}
+def _metrics_line(
+    symbol: str,
+    company_name: str,
+    current_price: Any,
+    pe_ratio: Any,
+    market_cap: Any,
+    week_52_high: Any,
+    week_52_low: Any,
+) -> str:
+    return (
+        f"{company_name} ({symbol}): Current Price ${current_price}; "
+        f"P/E Ratio {pe_ratio if pe_ratio else 'N/A'}; Market Cap {market_cap if market_cap else 'N/A'}; "
+        f"52 Week High {week_52_high if week_52_high else 'N/A'}; 52 Week Low {week_52_low if week_52_low else 'N/A'}"
+    )
 
-        if "PE_RATIO:" in text and "MARKET_CAP:" in text:
-            out["pe_ratio"] = text.split("PE_RATIO:")[1].split("MARKET_CAP:")[0].strip()
-        else:
-            out["pe_ratio"] = fallback["pe_ratio"]
 
-        if "MARKET_CAP:" in text and "WEEK_52_RANGE:" in text:
-            out["market_cap"] = text.split("MARKET_CAP:")[1].split("WEEK_52_RANGE:")[0].strip()
-        else:
-            out["market_cap"] = fallback["market_cap"]
+def _parse_metrics(text: str, fallback: Dict[str, str]) -> Dict[str, str]:
+    out: Dict[str, str] = {}
+
+    if "PE_RATIO:" in text and "MARKET_CAP:" in text:
+        out["pe_ratio"] = text.split("PE_RATIO:")[1].split("MARKET_CAP:")[0].strip()
+    else:
+        out["pe_ratio"] = fallback["pe_ratio"]
+
+    if "MARKET_CAP:" in text and "WEEK_52_RANGE:" in text:
+        out["market_cap"] = text.split("MARKET_CAP:")[1].split("WEEK_52_RANGE:")[0].strip()
+    else:
+        out["market_cap"] = fallback["market_cap"]
+
+    if "WEEK_52_RANGE:" in text:
+        out["week_52_range"] = text.split("WEEK_52_RANGE:")[1].strip()
+    else:
+        out["week_52_range"] = fallback["week_52_range"]
+
+    return out
 
-        if "WEEK_52_RANGE:" in text:
-            out["week_52_range"] = text.split("WEEK_52_RANGE:")[1].strip()
-        else:
-            out["week_52_range"] = fallback["week_52_range"]
 
-        explanation_cache[cache_key] = {"data": out, "timestamp": now}
+async def get_metric_explanations_async(
+    symbol: str,
+    company_name: str,
+    current_price: Any,
+    pe_ratio: Any,
+    market_cap: Any,
+    week_52_high: Any,
+    week_52_low: Any,
+    meta: Optional[Dict[str, Any]] = None,
+) -> Dict[str, str]:
+    """
+    P/E, market cap and 52-week range explained (Gemini, or fallback text).
+    Concurrent callers share one call, and the call itself may be batched with other symbols.
+    Stale entries are served and refreshed in the background, like get_main_explanation_async.
+    """
+    cache_key = f"metrics_{symbol}"
+    fallback = fallback_metric_explanations(current_price, pe_ratio, market_cap, week_52_high, week_52_low)
+    args = (symbol, company_name, current_price, pe_ratio, market_cap, week_52_high, week_52_low)
+
+    async def compute(keep_stale: bool = False) -> Dict[str, str]:
+        priority = PRIORITY_BACKGROUND if keep_stale else PRIORITY_EXPLAIN
+        out = await _submit("metrics", _metrics_line(*args), _metrics_prompt(*args), fallback, priority)
+        if not out:
+            if keep_stale:
+                raise RuntimeError("metrics refresh failed")
+            out = fallback
+        explanation_cache.set(cache_key, out, METRIC_CACHE_DURATION)
         return out
 
-    except Exception as e:
-        msg = str(e)
-        if "429" in msg or "RESOURCE_EXHAUSTED" in msg:
-            AI_DISABLED_UNTIL = time.time() + AI_COOLDOWN_SECONDS
-        explanation_cache[cache_key] = {"data": fallback, "timestamp": now}
+    hit = explanation_cache.get_stale(cache_key)
+    if hit is not None:
+        cached, stale = hit
+        if stale and ai_ready():
+            explanation_cache.refresh_in_background(cache_key, lambda: compute(keep_stale=True))
+        if meta is not None:
+            meta["stale"] = stale
+        return cached
+
+    if not ai_ready():
+        explanation_cache.set(cache_key, fallback, METRIC_CACHE_DURATION)
         return fallback
 
+    return await _single_flight(cache_key, compute)
+
+
+def _chat_fallback(context: Optional[str]) -> str:
+    if context:
+        return (
+            f"I can help! You’re asking about {context.upper()}. "
+            "Right now AI responses are limited, but you can still check price, change %, and metrics."
+        )
+    return "I can help! Try asking “What is a stock?” or “What does P/E mean?” Open a stock first for more context."
+
+
+def _chat_prompt(msg: str, context: Optional[str]) -> str:
+    ctx_line = f"Context stock: {context.upper()}\n" if context else ""
+    return (
+        "You are a helpful investing tutor for beginners.\n"
+        f"{ctx_line}"
+        f"User question: {msg}\n\n"
+        "Answer in 3-6 short sentences. Be simple and practical."
+    )
+
+
 def chat_with_ai(message: str, context: Optional[str] = None) -> str:
     """
     Returns a plain STRING (never a coroutine).
@@ -240,24 +543,126 @@ def chat_with_ai(message: str, context: Optional[str] = None) -> str:
     if not msg:
         return "Ask me anything about stocks—try: “What is P/E?”"
 
+    # Same / near-duplicate question answered recently: no Gemini call (works even while AI is down)
+    cached = chat_cache.lookup(msg, context)
+    if cached is not None:
+        return cached
+
     # If Gemini isn't configured/ready, return a safe fallback
     if not ai_ready():
-        if context:
-            return f"I can help explain {context.upper()}. Try asking: “What does P/E mean for {context.upper()}?”"
-        return "I can help explain stock basics. Try asking: “What is market cap?”"
+        return _chat_fallback(context)
 
-    # Build prompt
-    ctx_line = f"Context stock: {context.upper()}\n" if context else ""
-    prompt = (
-        "You are a helpful investing tutor for beginners.\n"
-        f"{ctx_line}"
-        f"User question: {msg}\n\n"
-        "Answer in 3-6 short sentences. Be simple and practical."
-    )
+    try:
+        text = _generate(_chat_prompt(msg, chat_cache.prompt_context(msg, context)), PRIORITY_INTERACTIVE)
+        if not text:
+            return "I couldn’t generate a response right now—try again in a moment."
+        chat_cache.store(msg, context, text)
+        return text
+    except RateLimited:
+        return _chat_fallback(context)
+    except Exception:
+        return "I couldn’t reach the AI service right now. Please try again."
 
+
+async def chat_stream_async(message: str, context: Optional[str] = None) -> AsyncIterator[str]:
+    """
+    Streaming chat_with_ai: yields text chunks as Gemini produces them.
+    Time to first chunk is recorded for /health (ttft_ms_p50 / ttft_ms_p95).
+    """
+    msg = (message or "").strip()
+    if not msg:
+        yield "Ask me anything about stocks—try: “What is P/E?”"
+        return
+
+    cached = chat_cache.lookup(msg, context)
+    if cached is not None:
+        yield cached
+        return
+
+    if not ai_ready():
+        yield _chat_fallback(context)
+        return
+
+    start = time.perf_counter()
+    prompt = _chat_prompt(msg, chat_cache.prompt_context(msg, context))
+    cost = _estimate_tokens(prompt)
     try:
-        resp = _client.models.generate_content(model=GEMINI_MODEL, contents=prompt)  # type: ignore
-        text = (resp.text or "").strip()
-        return text or "I couldn’t generate a response right now—try again in a moment."
+        await _limiter.acquire_async(cost, PRIORITY_INTERACTIVE, AI_DEADLINES[PRIORITY_INTERACTIVE])
+    except RateLimited:
+        yield _chat_fallback(context)
+        return
+
+    sent = False
+    parts: List[str] = []
+    last = None
+    _ai_stats["gemini_calls"] += 1
+    _ai_stats["chat_streams"] += 1
+    try:
+        with track_upstream("gemini", "stream_open"):  # time to the response starting; tokens follow
+            stream = await _client.aio.models.generate_content_stream(model=GEMINI_MODEL, contents=prompt)  # type: ignore
+        async for chunk in stream:
+            last = chunk
+            text = chunk.text or ""
+            if not text:
+                continue
+            if not sent:
+                _ttft_ms.append((time.perf_counter() - start) * 1000.0)
+                sent = True
+            parts.append(text)
+            yield text
+    except Exception as e:
+        _note_ai_error(e)
+        if not sent:
+            yield "I couldn’t reach the AI service right now. Please try again."
+        return
+    finally:
+        _settle(cost, last)  # the final chunk carries the usage totals
+
+    if not sent:
+        yield "I couldn’t generate a response right now—try again in a moment."
+        return
+    chat_cache.store(msg, context, "".join(parts))
+
+
+def _percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * pct))], 1)
+
+
+async def chat_with_ai_async(message: str, context: Optional[str] = None) -> str:
+    """Awaitable chat_with_ai for async routes."""
+    msg = (message or "").strip()
+    if not msg:
+        return "Ask me anything about stocks—try: “What is P/E?”"
+
+    cached = chat_cache.lookup(msg, context)
+    if cached is not None:
+        return cached
+
+    if not ai_ready():
+        return _chat_fallback(context)
+
+    try:
+        text = await _generate_async(_chat_prompt(msg, chat_cache.prompt_context(msg, context)), PRIORITY_INTERACTIVE)
+        if not text:
+            return "I couldn’t generate a response right now—try again in a moment."
+        chat_cache.store(msg, context, text)
+        return text
+    except RateLimited:
+        return _chat_fallback(context)
     except Exception:
         return "I couldn’t reach the AI service right now. Please try again."
+
+
+def ai_stats() -> Dict[str, Any]:
+    return {
+        **_ai_stats,
+        "ready": ai_ready(),
+        "disabled_until": AI_DISABLED_UNTIL,
+        "batch_window_ms": AI_BATCH_WINDOW_SECONDS * 1000.0,
+        "ttft_ms_p50": _percentile(list(_ttft_ms), 0.5),
+        "ttft_ms_p95": _percentile(list(_ttft_ms), 0.95),
+        "rate_limit": _limiter.stats(),
+    }
@@ -0,0 +1,160 @@
+# backend/alerts.py
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from bisect import bisect_left, bisect_right
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Set
+
+from .store import get_store
+from .quote_cache import get_quotes
+
+
+ALERT_ENGINE_ENABLED = os.getenv("ALERT_ENGINE_ENABLED", "1") == "1"
+ALERT_POLL_SECONDS = float(os.getenv("ALERT_POLL_SECONDS", "30"))
+ALERT_BATCH_SIZE = int(os.getenv("ALERT_BATCH_SIZE", "25"))
+ALERT_HISTORY_SIZE = int(os.getenv("ALERT_HISTORY_SIZE", "200"))
+ALERT_SUBSCRIBER_QUEUE = 100
+
+# symbol -> {"above": (targets asc, alerts), "below": (targets asc, alerts)}
+_index: Dict[str, Dict[str, Any]] = {}
+_index_version = -1
+
+_recent_triggers: Deque[Dict[str, Any]] = deque(maxlen=ALERT_HISTORY_SIZE)
+_subscribers: Set[asyncio.Queue] = set()
+
+_stats = {"cycles": 0, "symbols_polled": 0, "triggers": 0, "last_cycle_ms": 0.0, "last_cycle_at": None}
+
+
+def build_index(alerts: List[Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Group untriggered alerts by symbol, each direction sorted by target price."""
+    grouped: Dict[str, Dict[str, List[Dict[str, Any]]]] = {}
+    for a in alerts:
+        if a.get("triggered_at") is not None:
+            continue
+        direction = a.get("direction")
+        if direction not in ("above", "below"):
+            continue
+        grouped.setdefault(a["symbol"], {"above": [], "below": []})[direction].append(a)
+
+    index: Dict[str, Dict[str, Any]] = {}
+    for sym, by_dir in grouped.items():
+        index[sym] = {}
+        for direction, items in by_dir.items():
+            items.sort(key=lambda a: a["target_price"])
+            index[sym][direction] = ([a["target_price"] for a in items], items)
+    return index
+
+
+def crossed(index: Dict[str, Dict[str, Any]], symbol: str, price: float) -> List[Dict[str, Any]]:
+    """
+    Alerts crossed at this price, found with bisect instead of scanning:
+    "above" fires for targets <= price (a prefix), "below" for targets >= price (a suffix).
+    """
+    entry = index.get(symbol)
+    if not entry:
+        return []
+    above_targets, above = entry["above"]
+    below_targets, below = entry["below"]
+    return above[: bisect_right(above_targets, price)] + below[bisect_left(below_targets, price):]
+
+
+def _current_index() -> Dict[str, Dict[str, Any]]:
+    global _index, _index_version
+    store = get_store()
+    version = store.alerts_version()
+    if version != _index_version:
+        _index = build_index(store.all_alerts())
+        _index_version = version
+    return _index
+
+
+def _publish(trigger: Dict[str, Any]) -> None:
+    _recent_triggers.append(trigger)
+    for q in list(_subscribers):
+        try:
+            q.put_nowait(trigger)
+        except asyncio.QueueFull:
+            # Slow subscriber: drop its oldest event rather than block the engine
+            try:
+                q.get_nowait()
+                q.put_nowait(trigger)
+            except Exception:
+                pass
+
+
+async def evaluate_once() -> List[Dict[str, Any]]:
+    """Poll every alerted symbol (in batches) and fire crossed alerts once each."""
+    start = time.perf_counter()
+    index = await asyncio.to_thread(_current_index)
+    symbols = sorted(index)
+    fired: List[Dict[str, Any]] = []
+
+    for i in range(0, len(symbols), ALERT_BATCH_SIZE):
+        batch = symbols[i : i + ALERT_BATCH_SIZE]
+        quotes = await asyncio.to_thread(get_quotes, batch)
+        for sym in batch:
+            info = quotes.get(sym) or {}
+            price = info.get("currentPrice", info.get("regularMarketPrice", None))
+            if price is None:
+                continue
+            now = time.time()
+            for a in crossed(index, sym, float(price)):
+                # With several workers each running the engine, only the first to mark it publishes
+                if not await asyncio.to_thread(get_store().mark_alert_triggered, a["id"], now):
+                    continue
+                a["triggered_at"] = now
+                trigger = {"symbol": sym, "price": price, "triggered_at": now, "alert": a}
+                fired.append(trigger)
+                _publish(trigger)
+
+    _stats["cycles"] += 1
+    _stats["symbols_polled"] += len(symbols)
+    _stats["triggers"] += len(fired)
+    _stats["last_cycle_ms"] = round((time.perf_counter() - start) * 1000.0, 1)
+    _stats["last_cycle_at"] = time.time()
+    return fired
+
+
+async def run_alert_engine() -> None:
+    """Background loop started from the app lifespan."""
+    while True:
+        try:
+            await evaluate_once()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            pass  # keep polling; a bad cycle shouldn't kill the engine
+        await asyncio.sleep(ALERT_POLL_SECONDS)
+
+
+def recent_triggers(user: str, symbol: Optional[str] = None, limit: int = 50) -> List[Dict[str, Any]]:
+    items = [
+        t for t in _recent_triggers
+        if t["alert"].get("user_id") == user and (symbol is None or t["symbol"] == symbol)
+    ]
+    if limit <= 0:
+        return []
+    return items[-limit:][::-1]
+
+
+def subscribe() -> asyncio.Queue:
+    q: asyncio.Queue = asyncio.Queue(maxsize=ALERT_SUBSCRIBER_QUEUE)
+    _subscribers.add(q)
+    return q
+
+
+def unsubscribe(q: asyncio.Queue) -> None:
+    _subscribers.discard(q)
+
+
+def alert_engine_stats() -> Dict[str, Any]:
+    return {
+        **_stats,
+        "enabled": ALERT_ENGINE_ENABLED,
+        "poll_seconds": ALERT_POLL_SECONDS,
+        "indexed_symbols": len(_index),
+        "subscribers": len(_subscribers),
+    }
@@ -0,0 +1,80 @@
+# backend/bench_json.py
+"""
+Micro-benchmark: FastAPI's default JSON path (jsonable_encoder + JSONResponse) vs
+FastJSONResponse (backend/json_response.py) on payloads shaped like ours.
+
+    python -m backend.bench_json --repeat 50
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+from .history_cache import BAR_DTYPE, history_columns, history_records
+from .json_response import FastJSONResponse, orjson
+
+
+def _bars(n: int) -> np.ndarray:
+    rng = np.random.default_rng(7)
+    bars = np.zeros(n, dtype=BAR_DTYPE)
+    bars["date"] = np.datetime64("2019-01-02") + np.arange(n)
+    close = 100 + np.cumsum(rng.normal(0, 1, n))
+    bars["open"], bars["high"], bars["low"], bars["close"] = close, close + 1, close - 1, close
+    bars["volume"] = rng.integers(1_000_000, 50_000_000, n)
+    return bars
+
+
+def _payloads() -> Dict[str, Any]:
+    bars = _bars(1260)  # ~5y of trading days
+    watchlist = [
+        {"symbol": f"SYM{i}", "name": f"Company {i}", "price": 100.0 + i, "change": 0.5, "change_percent": 0.5,
+         "currency": "USD", "market_cap": 1e9 * i, "pe_ratio": None, "volume": 1_000_000 + i}
+        for i in range(50)
+    ]
+    return {
+        "history_rows_5y": {"symbol": "AAPL", "period": "5y", "format": "rows", "data": history_records(bars)},
+        "history_columns_5y": {"symbol": "AAPL", "period": "5y", "format": "columns", "data": history_columns(bars)},
+        "watchlist_50": {"watchlist": watchlist, "total": len(watchlist)},
+    }
+
+
+def _default_path(payload: Any) -> bytes:
+    # What FastAPI does for a plain dict return
+    return JSONResponse(jsonable_encoder(payload)).body
+
+
+def _fast_path(payload: Any) -> bytes:
+    return FastJSONResponse(payload).body
+
+
+def _time(fn: Callable[[Any], bytes], payload: Any, repeat: int) -> float:
+    fn(payload)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn(payload)
+    return (time.perf_counter() - start) / repeat * 1000.0
+
+
+def main(argv: List[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=30)
+    args = parser.parse_args(argv)
+
+    print(f"encoder: {'orjson ' + orjson.__version__ if orjson else 'stdlib json (orjson not installed)'}")
+    print(f"{'payload':<20} {'bytes':>9} {'default ms':>11} {'fast ms':>9} {'speedup':>8}")
+    for name, payload in _payloads().items():
+        # jsonable_encoder can't take NumPy arrays, so the default path gets plain lists
+        plain = jsonable_encoder(payload, custom_encoder={np.ndarray: lambda a: a.tolist()})
+        slow = _time(_default_path, plain, args.repeat)
+        fast = _time(_fast_path, payload, args.repeat)
+        size = len(_fast_path(payload))
+        print(f"{name:<20} {size:>9} {slow:>11.2f} {fast:>9.2f} {slow / fast:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+# backend/chat_cache.py
+from __future__ import annotations
+
+import math
+import os
+import re
+import threading
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+# Generic answers ("What is P/E?") are reusable for a long time; ticker-specific ones go stale with the price
+CHAT_CACHE_TTL_SECONDS = float(os.getenv("CHAT_CACHE_TTL_SECONDS", str(24 * 60 * 60)))
+CHAT_CACHE_CONTEXT_TTL_SECONDS = float(os.getenv("CHAT_CACHE_CONTEXT_TTL_SECONDS", "3600"))
+CHAT_CACHE_MAX_ENTRIES = int(os.getenv("CHAT_CACHE_MAX_ENTRIES", "1000"))
+# Cosine similarity (TF-IDF over words + word pairs) needed to reuse a near-duplicate question's answer
+CHAT_CACHE_SIMILARITY = float(os.getenv("CHAT_CACHE_SIMILARITY", "0.8"))
+
+_PHRASES = [
+    (r"price[\s\-]*to[\s\-]*earnings?", " pe "),
+    (r"\bp\s*/\s*e\b|\bp\.e\.?|\bpe ratio\b", " pe "),
+    (r"market[\s\-]*cap(italization|italisation)?\b|\bmkt[\s\-]*cap\b", " marketcap "),
+    (r"52[\s\-]*(week|wk)s?\b", " 52week "),
+    (r"\bdividends?\b", " dividend "),
+    (r"\bstocks\b|\bshares?\b|\bequit(y|ies)\b", " stock "),
+]
+
+_STOPWORDS = {
+    "a", "an", "the", "is", "are", "was", "were", "be", "what", "whats", "what's", "does", "do", "did",
+    "mean", "means", "meaning", "of", "for", "to", "in", "on", "at", "me", "i", "you", "can", "could",
+    "please", "explain", "tell", "about", "how", "and", "or", "by", "with", "my", "s", "like", "im",
+    "just", "really", "simple", "simply", "terms", "word", "words", "hey", "hi", "hello", "thanks",
+}
+
+# Words that make a question about the stock being viewed rather than a general concept
+_CONTEXT_WORDS = {
+    "it", "its", "it's", "this", "that", "they", "their", "them", "company", "here", "now", "today",
+    "should", "buy", "sell", "hold", "invest", "worth", "doing", "going",
+}
+
+# (scope, normalized question) -> {"answer", "tokens", "expires_at"}; scope is "" or the context ticker
+_entries: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+_df: Counter = Counter()  # term -> number of cached questions containing it (for IDF)
+_lock = threading.Lock()
+
+_stats = {"exact_hits": 0, "similar_hits": 0, "misses": 0, "stores": 0}
+
+
+def needs_context(message: str, context: Optional[str]) -> bool:
+    """True if the answer depends on the ticker being viewed (mentions it, or says 'it', 'this', 'buy'...)."""
+    if not context:
+        return False
+    words = set(re.findall(r"[a-z0-9']+", (message or "").lower()))
+    return context.strip().lower() in words or bool(words & _CONTEXT_WORDS)
+
+
+def normalize(message: str) -> str:
+    """'What's the P/E ratio??' -> 'pe'"""
+    text = (message or "").lower()
+    for pattern, repl in _PHRASES:
+        text = re.sub(pattern, repl, text)
+    text = re.sub(r"[^a-z0-9\s]", " ", text)
+    words = []
+    for w in text.split():
+        if w in _STOPWORDS:
+            continue
+        if len(w) > 3 and w.endswith("s") and not w.endswith("ss"):
+            w = w[:-1]  # crude plural folding: "etfs" -> "etf"
+        words.append(w)
+    return " ".join(words)
+
+
+def _terms(norm: str) -> Counter:
+    words = norm.split()
+    return Counter(words + [f"{a}_{b}" for a, b in zip(words, words[1:])])
+
+
+def _scope(message: str, context: Optional[str]) -> str:
+    return context.strip().upper() if needs_context(message, context) else ""
+
+
+def _cosine(a: Counter, b: Counter, n_docs: int) -> float:
+    def weight(term: str, tf: int) -> float:
+        return tf * (math.log((n_docs + 1) / (_df.get(term, 0) + 1)) + 1.0)
+
+    wa = {t: weight(t, c) for t, c in a.items()}
+    wb = {t: weight(t, c) for t, c in b.items()}
+    dot = sum(w * wb[t] for t, w in wa.items() if t in wb)
+    if not dot:
+        return 0.0
+    na = math.sqrt(sum(w * w for w in wa.values()))
+    nb = math.sqrt(sum(w * w for w in wb.values()))
+    return dot / (na * nb)
+
+
+def _drop(key: Tuple[str, str]) -> None:
+    entry = _entries.pop(key)
+    _df.subtract(entry["tokens"].keys())
+    for t in list(entry["tokens"]):
+        if _df[t] <= 0:
+            del _df[t]
+
+
+def lookup(message: str, context: Optional[str] = None) -> Optional[str]:
+    """Cached answer for the same (or a near-duplicate) question in the same scope, else None."""
+    norm = normalize(message)
+    if not norm:
+        return None
+    scope = _scope(message, context)
+    now = time.time()
+
+    with _lock:
+        entry = _entries.get((scope, norm))
+        if entry is not None and entry["expires_at"] > now:
+            _entries.move_to_end((scope, norm))
+            _stats["exact_hits"] += 1
+            return entry["answer"]
+
+        terms = _terms(norm)
+        best_key, best_sim = None, 0.0
+        for key, e in _entries.items():
+            if key[0] != scope or e["expires_at"] <= now:
+                continue
+            sim = _cosine(terms, e["tokens"], len(_entries))
+            if sim > best_sim:
+                best_key, best_sim = key, sim
+
+        if best_key is not None and best_sim >= CHAT_CACHE_SIMILARITY:
+            _entries.move_to_end(best_key)
+            _stats["similar_hits"] += 1
+            return _entries[best_key]["answer"]
+
+        _stats["misses"] += 1
+        return None
+
+
+def store(message: str, context: Optional[str], answer: str) -> None:
+    """Remember a real (Gemini) answer. Fallback / error texts should not be stored."""
+    norm = normalize(message)
+    if not norm or not answer:
+        return
+    scope = _scope(message, context)
+    ttl = CHAT_CACHE_CONTEXT_TTL_SECONDS if scope else CHAT_CACHE_TTL_SECONDS
+    key = (scope, norm)
+
+    with _lock:
+        if key in _entries:
+            _drop(key)
+        tokens = _terms(norm)
+        _entries[key] = {"answer": answer, "tokens": tokens, "expires_at": time.time() + ttl}
+        _df.update(tokens.keys())
+        _stats["stores"] += 1
+
+        now = time.time()
+        for k in [k for k, e in _entries.items() if e["expires_at"] <= now]:
+            _drop(k)
+        while len(_entries) > CHAT_CACHE_MAX_ENTRIES:
+            _drop(next(iter(_entries)))
+
+
+def prompt_context(message: str, context: Optional[str]) -> Optional[str]:
+    """Context to put in the Gemini prompt: none for general questions, so their answers can be shared."""
+    return context if needs_context(message, context) else None
+
+
+def chat_cache_stats() -> Dict[str, Any]:
+    with _lock:
+        total = _stats["exact_hits"] + _stats["similar_hits"] + _stats["misses"]
+        hits = _stats["exact_hits"] + _stats["similar_hits"]
+        return {**_stats, "entries": len(_entries), "hit_rate": round(hits / total, 3) if total else None}
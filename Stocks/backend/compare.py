@@ -0,0 +1,137 @@
+# backend/compare.py
+from __future__ import annotations
+
+import os
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .history_cache import get_history
+from .quote_cache import fan_out
+
+
+COMPARE_MAX_SYMBOLS = int(os.getenv("COMPARE_MAX_SYMBOLS", "50"))
+COMPARE_BENCHMARK = os.getenv("COMPARE_BENCHMARK", "SPY")
+# Pairs need at least this many overlapping daily returns to get a correlation / beta
+COMPARE_MIN_OVERLAP = 20
+TRADING_DAYS_PER_YEAR = 252
+
+
+def _history_or_none(args):
+    symbol, period = args
+    try:
+        bars = get_history(symbol, period)
+        return bars if len(bars) else None
+    except Exception:
+        return None
+
+
+def _close_matrix(symbols: List[str], period: str) -> pd.DataFrame:
+    """Cached histories fetched concurrently and aligned on date: one column of closes per symbol."""
+    histories = fan_out(_history_or_none, [(s, period) for s in symbols])
+    columns = {}
+    for sym, bars in zip(symbols, histories):
+        if bars is None:
+            continue
+        columns[sym] = pd.Series(np.asarray(bars["close"], dtype="f8"), index=np.asarray(bars["date"]))
+    if not columns:
+        return pd.DataFrame()
+    return pd.DataFrame(columns).sort_index()
+
+
+def _clean(x: Any, digits: int = 4) -> Optional[float]:
+    try:
+        x = float(x)
+    except Exception:
+        return None
+    return None if not np.isfinite(x) else round(x, digits)
+
+
+def compare_analytics(symbols: List[str], period: str = "1y", benchmark: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Correlation matrix, beta vs. `benchmark`, annualized volatility and relative
+    performance for up to COMPARE_MAX_SYMBOLS symbols, from one aligned returns matrix.
+    """
+    benchmark = (benchmark or COMPARE_BENCHMARK).strip().upper()
+    wanted = list(dict.fromkeys(s.upper() for s in symbols if s))
+    closes = _close_matrix(wanted + ([benchmark] if benchmark not in wanted else []), period)
+
+    present = [s for s in wanted if s in closes.columns]
+    missing = [s for s in wanted if s not in closes.columns]
+    if not present:
+        return {"period": period, "benchmark": benchmark, "symbols": [], "missing": missing}
+
+    # Holidays differ across exchanges: carry a price over short gaps, but not across months of missing data
+    closes = closes.ffill(limit=5)
+    returns = closes.pct_change(fill_method=None)
+
+    corr = returns[present].corr(min_periods=COMPARE_MIN_OVERLAP)
+    vol = returns[present].std() * np.sqrt(TRADING_DAYS_PER_YEAR) * 100.0
+
+    # First / last valid close per column, without a per-symbol loop
+    first = closes[present].bfill().iloc[0]
+    last = closes[present].ffill().iloc[-1]
+    total_return = (last / first - 1.0) * 100.0
+
+    beta = pd.Series(np.nan, index=present)
+    bench_return = None
+    if benchmark in closes.columns:
+        cov = returns[present + ([benchmark] if benchmark not in present else [])].cov(min_periods=COMPARE_MIN_OVERLAP)
+        bench_var = cov.loc[benchmark, benchmark]
+        if bench_var and np.isfinite(bench_var):
+            beta = cov.loc[present, benchmark] / bench_var
+        b = closes[benchmark].dropna()
+        if len(b):
+            bench_return = (b.iloc[-1] / b.iloc[0] - 1.0) * 100.0
+
+    stats = []
+    for sym in present:
+        excess = total_return[sym] - bench_return if bench_return is not None else np.nan
+        stats.append(
+            {
+                "symbol": sym,
+                "return_pct": _clean(total_return[sym], 2),
+                "vs_benchmark_pct": _clean(excess, 2),
+                "volatility_pct": _clean(vol[sym], 2),
+                "beta": _clean(beta[sym], 3),
+            }
+        )
+
+    return {
+        "period": period,
+        "benchmark": benchmark,
+        "benchmark_return_pct": _clean(bench_return, 2),
+        "symbols": present,
+        "missing": missing,
+        "stats": stats,
+        "correlation": [[_clean(v, 3) for v in row] for row in corr.to_numpy().tolist()],
+    }
+
+
+def summarize(analytics: Dict[str, Any]) -> str:
+    """One or two plain-English sentences for the compare panel."""
+    stats = analytics.get("stats") or []
+    if len(stats) < 2:
+        return ""
+
+    parts = []
+    ranked = sorted((s for s in stats if s["return_pct"] is not None), key=lambda s: s["return_pct"], reverse=True)
+    if ranked:
+        parts.append(
+            f"Over {analytics['period']}, {ranked[0]['symbol']} did best ({ranked[0]['return_pct']:+.2f}%)"
+            f" and {ranked[-1]['symbol']} worst ({ranked[-1]['return_pct']:+.2f}%)."
+        )
+
+    syms = analytics["symbols"]
+    corr = np.array([[np.nan if v is None else v for v in row] for row in analytics["correlation"]], dtype="f8")
+    np.fill_diagonal(corr, np.nan)
+    if np.isfinite(corr).any():
+        i, j = np.unravel_index(np.nanargmax(corr), corr.shape)
+        parts.append(f"Most correlated: {syms[i]} and {syms[j]} ({corr[i, j]:.2f}).")
+
+    betas = [s for s in stats if s["beta"] is not None]
+    if betas:
+        top = max(betas, key=lambda s: s["beta"])
+        parts.append(f"Highest beta vs {analytics['benchmark']}: {top['symbol']} ({top['beta']:.2f}).")
+    return " ".join(parts)
@@ -1,43 +1,148 @@
-from typing import Any, Dict, List
+from typing import Any, Awaitable, Dict, List, Optional, Tuple
+import asyncio
+import hashlib
+import os
+import re
 import time
+import uuid
 
-import yfinance as yf
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 
+from .json_response import FastJSONResponse
 from .models import WatchlistItem, PriceAlert, ChatMessage, CompareRequest
-from .store import user_watchlist, user_alerts, get_watchlist_symbols
-from .stock_utils import safe_percent_change, looks_like_bad_info, resolve_stock_query
+from .store import get_store, get_watchlist_symbols
+from .stock_utils import safe_percent_change, looks_like_bad_info, resolve_stock_query, resolve_stock_queries
+from .quote_cache import get_quotes
+from .history_cache import VALID_PERIODS, get_history, history_columns, history_records
+from .indicators import compute_indicators
+from .compare import COMPARE_MAX_SYMBOLS, compare_analytics, summarize as summarize_comparison
 from .yahoo import yahoo_search
-from .ai import get_main_explanation, get_metric_explanations, ai_ready, chat_with_ai
-
-from .news import get_company_news
+from . import symbol_index
+from .ai import (
+    fallback_main_explanation,
+    fallback_metric_explanations,
+    get_main_explanation_async,
+    get_metric_explanations_async,
+    chat_with_ai_async,
+    chat_stream_async,
+)
+
+from .news import get_company_news_async
+from .warmup import note_symbol_request
+from . import alerts as alert_engine
+from . import quote_stream
+from .sse import SSE_HEADERS, SSE_HEARTBEAT, format_sse
 
 router = APIRouter()
 
+# Per-stage budgets for /stock/{query}/details (seconds)
+DETAILS_AI_TIMEOUT_SECONDS = float(os.getenv("DETAILS_AI_TIMEOUT_SECONDS", "8"))
+DETAILS_NEWS_TIMEOUT_SECONDS = float(os.getenv("DETAILS_NEWS_TIMEOUT_SECONDS", "6"))
+
+
+async def _timed_stage(name: str, aw: Awaitable[Any], timeout: float, timings: Dict[str, float]) -> Tuple[Any, bool]:
+    """
+    Runs one details stage with a deadline. Returns (result, timed_out).
+    The underlying task is shielded so a slow upstream still finishes and
+    warms its cache for the next request.
+    """
+    start = time.perf_counter()
+    try:
+        return await asyncio.wait_for(asyncio.shield(aw), timeout=timeout), False
+    except asyncio.TimeoutError:
+        return None, True
+    finally:
+        timings[name] = (time.perf_counter() - start) * 1000.0
+
+
+def _server_timing(timings: Dict[str, float]) -> str:
+    return ", ".join(f"{name};dur={ms:.1f}" for name, ms in timings.items())
+
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Weak comparison: W/"x" and "x" are the same entity for conditional GETs
+    ours = etag[2:] if etag.startswith("W/") else etag
+    return any(
+        (tag.strip()[2:] if tag.strip().startswith("W/") else tag.strip()) == ours for tag in if_none_match.split(",")
+    )
+
+
+def _conditional_json(request: Request, payload: Any, headers: Optional[Dict[str, str]] = None) -> Response:
+    """
+    JSON response with a content-hash ETag. A client that sends the same tag back
+    (If-None-Match) gets an empty 304 instead of the full body. The tag is weak
+    because GZipMiddleware may re-encode the bytes.
+    """
+    response = FastJSONResponse(payload, headers=headers)
+    etag = 'W/"' + hashlib.blake2b(response.body, digest_size=12).hexdigest() + '"'
+    extra = {"ETag": etag, "Cache-Control": "no-cache"}  # always revalidate, but reuse on 304
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={**(headers or {}), **extra})
+    response.headers.update(extra)
+    return response
+
+
+_VALID_USER_ID = re.compile(r"^[A-Za-z0-9_\-]{1,64}$")
+
+
+def current_user(
+    x_user_id: Optional[str] = Header(None),
+    user: Optional[str] = Query(None, description="User id for clients that can't set headers (EventSource)"),
+) -> str:
+    """
+    Scopes watchlists/alerts per user via the X-User-Id header (or ?user=).
+
+    This is NOT authentication: the id is whatever the client sends (the frontend
+    makes up a random one per browser, see config.js), so anyone who knows or
+    guesses another id can read and change that user's watchlist and alerts.
+    Put real auth in front of the API before storing anything private.
+    """
+    raw = (x_user_id or user or "").strip()
+    if not _VALID_USER_ID.match(raw):
+        raise HTTPException(status_code=400, detail="X-User-Id (or ?user=) must be 1-64 of A-Z a-z 0-9 _ -")
+    return raw
+
 
 @router.get("/search")
-def search_symbols(q: str = Query(..., min_length=1)):
+def search_symbols(q: str = Query(..., min_length=1), limit: int = Query(8, ge=1, le=25)):
+    # Local index first (microseconds). The bundled list is small, so fewer than `limit`
+    # local hits counts as a miss: Yahoo fills in the rest (and yahoo_search learns them).
+    local = symbol_index.search(q, limit=limit)
+    if len(local) >= limit:
+        return {"query": q, "results": local, "source": "local"}
     try:
-        return {"query": q, "results": yahoo_search(q, max_results=8)}
+        remote = yahoo_search(q, max_results=limit)
     except Exception as e:
+        if local:
+            return {"query": q, "results": local, "source": "local"}
         return {"query": q, "results": [], "error": str(e)}
 
+    seen = {r["symbol"] for r in local}
+    merged = local + [r for r in remote if r["symbol"] not in seen]
+    return {"query": q, "results": merged[:limit], "source": "local+yahoo" if local else "yahoo"}
+
 
 @router.get("/stock/{query}")
-def get_stock(query: str):
-    symbol, resolved_from, info = resolve_stock_query(query)
+async def get_stock(query: str):
+    symbol, resolved_from, info = await asyncio.to_thread(resolve_stock_query, query)
     if not symbol or not info:
         return {
             "error": f"Quote not found for: {query}",
             "tip": "Try a ticker like AAPL, TSLA, MSFT, or search by company name using /search?q=...",
         }
+    note_symbol_request(symbol)
 
     current_price = info.get("currentPrice", info.get("regularMarketPrice", None))
     previous_close = info.get("previousClose", None)
     company_name = info.get("longName", symbol)
 
     change_percent = safe_percent_change(current_price, previous_close)
-    explanation = get_main_explanation(symbol, company_name, current_price, change_percent)
+    explanation = await get_main_explanation_async(symbol, company_name, current_price, change_percent)
 
     return {
         "symbol": symbol,
@@ -50,64 +155,65 @@ def get_stock(query: str):
 
 
 @router.post("/watchlist/add")
-async def add_to_watchlist(item: WatchlistItem):
-    symbol, resolved_from, info = resolve_stock_query(item.symbol)
+async def add_to_watchlist(item: WatchlistItem, user: str = Depends(current_user)):
+    symbol, resolved_from, info = await asyncio.to_thread(resolve_stock_query, item.symbol)
     if not symbol or not info:
         return {"success": False, "error": f"Quote not found for: {item.symbol}"}
 
-    user_watchlist.add(symbol)
+    count = await asyncio.to_thread(get_store().add_symbol, user, symbol)
     return {
         "success": True,
         "message": f"Added {symbol} to watchlist",
         "symbol": symbol,
         "company_name": info.get("longName", symbol),
-        "watchlist_count": len(user_watchlist),
+        "watchlist_count": count,
         "resolved_from": resolved_from,
     }
 
 
 @router.delete("/watchlist/remove/{query}")
-async def remove_from_watchlist(query: str):
+async def remove_from_watchlist(query: str, user: str = Depends(current_user)):
     raw = (query or "").strip()
     if not raw:
         return {"success": False, "error": "Symbol is required"}
 
+    store = get_store()
     symbol = raw.upper()
-    if symbol not in user_watchlist:
-        sym2, _, _ = resolve_stock_query(raw)
+    if not await asyncio.to_thread(store.has_symbol, user, symbol):
+        sym2, _, _ = await asyncio.to_thread(resolve_stock_query, raw)
         if sym2:
             symbol = sym2
 
-    if symbol in user_watchlist:
-        user_watchlist.remove(symbol)
-        global user_alerts
-        user_alerts = [a for a in user_alerts if a.get("symbol") != symbol]
+    if await asyncio.to_thread(store.has_symbol, user, symbol):
+        count = await asyncio.to_thread(store.remove_symbol, user, symbol)
         return {
             "success": True,
             "message": f"Removed {symbol} from watchlist",
-            "watchlist_count": len(user_watchlist),
+            "watchlist_count": count,
         }
 
     return {"success": False, "error": f"{raw} not in watchlist"}
 
 
 @router.get("/watchlist/all")
-async def get_watchlist():
-    symbols = get_watchlist_symbols()
+async def get_watchlist(request: Request, user: str = Depends(current_user)):
+    symbols = await asyncio.to_thread(get_watchlist_symbols, user)
+    quotes = await asyncio.to_thread(get_quotes, symbols)
+    # One grouped read instead of filtering every alert for every symbol
+    alerts_by_symbol = await asyncio.to_thread(get_store().alerts_by_symbol, user)
     results: List[Dict[str, Any]] = []
 
     for sym in symbols:
         try:
-            stock = yf.Ticker(sym)
-            info = stock.info
-            if looks_like_bad_info(info):
+            info = quotes.get(sym.upper())
+            if not info or looks_like_bad_info(info):
                 continue
 
             current_price = info.get("currentPrice", info.get("regularMarketPrice", None))
             previous_close = info.get("previousClose", None)
             change_percent = safe_percent_change(current_price, previous_close)
 
-            stock_alerts = [a for a in user_alerts if a.get("symbol") == sym]
+            stock_alerts = alerts_by_symbol.get(sym, [])
 
             results.append(
                 {
@@ -122,41 +228,129 @@ async def get_watchlist():
         except Exception:
             continue
 
-    return {"watchlist": results, "total": len(results)}
+    # Polled: an unchanged watchlist costs a 304. Per-user, so caches must key on the user header too.
+    return _conditional_json(request, {"watchlist": results, "total": len(results)}, headers={"Vary": "X-User-Id"})
+
+
+@router.get("/watchlist/stream")
+async def stream_watchlist(request: Request, symbols: Optional[str] = None, user: str = Depends(current_user)):
+    """
+    SSE stream of quote changes. One shared poller per symbol feeds every
+    subscribed connection, so N tabs watching AAPL cost one upstream poll.
+    """
+    if symbols:
+        wanted = []
+        for s in symbols.split(","):
+            sym = s.strip().upper()
+            if sym and sym not in wanted:
+                wanted.append(sym)
+    else:
+        wanted = [s.upper() for s in await asyncio.to_thread(get_watchlist_symbols, user)]
+
+    # 400 rather than a 200 JSON body: EventSource can't parse that and would reconnect forever
+    if not wanted:
+        return FastJSONResponse({"error": "No symbols to stream"}, status_code=400)
+    if len(wanted) > quote_stream.QUOTE_STREAM_MAX_SYMBOLS:
+        return FastJSONResponse(
+            {"error": f"At most {quote_stream.QUOTE_STREAM_MAX_SYMBOLS} symbols per stream"}, status_code=400
+        )
+
+    if symbols:
+        # Every symbol gets an upstream poller, so only start them for real tickers:
+        # indexed symbols pass as-is, anything else must resolve (memoized, negatives too)
+        unknown = [s for s in wanted if not symbol_index.is_known_symbol(s)]
+        resolved = dict(zip(unknown, await asyncio.to_thread(resolve_stock_queries, unknown))) if unknown else {}
+        bad = [s for s in unknown if not resolved[s][0] or not resolved[s][2]]
+        if bad:
+            return FastJSONResponse({"error": f"Unknown symbol(s): {', '.join(bad)}"}, status_code=400)
+        wanted = list(dict.fromkeys(resolved[s][0] if s in resolved else s for s in wanted))
+
+    sub = quote_stream.subscribe(wanted)
+
+    async def events():
+        try:
+            while not await request.is_disconnected():
+                batch = await sub.next_batch(timeout=15)
+                if not batch:
+                    yield SSE_HEARTBEAT
+                    continue
+                for update in batch:
+                    yield format_sse(update, event="quote")
+        finally:
+            quote_stream.unsubscribe(sub)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
 
 
 @router.get("/stock/{query}/details")
-async def get_stock_details(query: str):
-    symbol, resolved_from, info = resolve_stock_query(query)
+async def get_stock_details(query: str, request: Request, response: Response):
+    timings: Dict[str, float] = {}
+    start = time.perf_counter()
+    symbol, resolved_from, info = await asyncio.to_thread(resolve_stock_query, query)
+    timings["resolve"] = (time.perf_counter() - start) * 1000.0
+    response.headers["Server-Timing"] = _server_timing(timings)
     if not symbol or not info:
         return {"error": f"Quote not found for symbol: {query}"}
+    note_symbol_request(symbol)
 
     current_price = info.get("currentPrice", info.get("regularMarketPrice", None))
     previous_close = info.get("previousClose", None)
     change_percent = safe_percent_change(current_price, previous_close)
     company_name = info.get("longName", symbol)
 
-    main_explanation = get_main_explanation(symbol, company_name, current_price, change_percent)
-
     pe_ratio = info.get("trailingPE", None)
     market_cap = info.get("marketCap", None)
     week_52_high = info.get("fiftyTwoWeekHigh", None)
     week_52_low = info.get("fiftyTwoWeekLow", None)
 
-    metric_explanations = get_metric_explanations(
-        symbol=symbol,
-        company_name=company_name,
-        current_price=current_price,
-        pe_ratio=pe_ratio,
-        market_cap=market_cap,
-        week_52_high=week_52_high,
-        week_52_low=week_52_low,
+    # Filled with {"stale": bool} when a part was answered from an expired cache entry
+    freshness: Dict[str, Dict[str, Any]] = {"main_explanation": {}, "metric_explanations": {}, "news": {}}
+
+    # Explanation, metrics and news are independent: run them concurrently
+    (main_explanation, main_late), (metric_explanations, metrics_late), (news, news_late) = await asyncio.gather(
+        _timed_stage(
+            "explanation",
+            get_main_explanation_async(
+                symbol, company_name, current_price, change_percent, meta=freshness["main_explanation"]
+            ),
+            DETAILS_AI_TIMEOUT_SECONDS,
+            timings,
+        ),
+        _timed_stage(
+            "metrics",
+            get_metric_explanations_async(
+                symbol=symbol,
+                company_name=company_name,
+                current_price=current_price,
+                pe_ratio=pe_ratio,
+                market_cap=market_cap,
+                week_52_high=week_52_high,
+                week_52_low=week_52_low,
+                meta=freshness["metric_explanations"],
+            ),
+            DETAILS_AI_TIMEOUT_SECONDS,
+            timings,
+        ),
+        # ✅ NEWS: strongly related ticker-filtered news
+        _timed_stage("news", get_company_news_async(symbol, limit=8, meta=freshness["news"]), DETAILS_NEWS_TIMEOUT_SECONDS, timings),
     )
 
-    # ✅ NEWS: strongly related ticker-filtered news
-    news = get_company_news(symbol, limit=8)
+    timed_out: List[str] = []
+    if main_late:
+        main_explanation = fallback_main_explanation(company_name, current_price, change_percent)
+        timed_out.append("main_explanation")
+    if metrics_late:
+        metric_explanations = fallback_metric_explanations(
+            current_price, pe_ratio, market_cap, week_52_high, week_52_low
+        )
+        timed_out.append("metric_explanations")
+    if news_late:
+        news = []
+        timed_out.append("news")
+
+    timings["total"] = (time.perf_counter() - start) * 1000.0
 
-    return {
+    payload = {
         "symbol": symbol,
         "company_name": company_name,
         "price": current_price,
@@ -172,53 +366,71 @@ async def get_stock_details(query: str):
         "main_explanation": main_explanation,
         "metric_explanations": metric_explanations,
         "news": news,
+        "timed_out": timed_out,
+        "stale": [part for part, m in freshness.items() if m.get("stale")],
         "resolved_from": resolved_from,
     }
+    return _conditional_json(request, payload, headers={"Server-Timing": _server_timing(timings)})
 
 
 @router.get("/stock/{query}/news")
 async def get_stock_news(query: str, limit: int = 8):
-    symbol, _, info = resolve_stock_query(query)
+    symbol, _, info = await asyncio.to_thread(resolve_stock_query, query)
     if not symbol or not info:
         return {"error": f"Quote not found for symbol: {query}"}
-    return {"symbol": symbol, "news": get_company_news(symbol, limit=limit)}
+    note_symbol_request(symbol)
+    return {"symbol": symbol, "news": await get_company_news_async(symbol, limit=limit)}
 
 
 @router.get("/stock/{query}/history")
-async def get_stock_history(query: str, period: str = "1mo"):
-    symbol, resolved_from, _ = resolve_stock_query(query)
+async def get_stock_history(
+    query: str,
+    request: Request,
+    period: str = "1mo",
+    format: str = Query("rows", pattern="^(rows|columns)$"),
+):
+    """
+    format=rows: data is a list of {date, open, high, low, close, volume}.
+    format=columns: data is {date: [...], open: [...], ...} (same values, no repeated keys).
+    """
+    symbol, resolved_from, _ = await asyncio.to_thread(resolve_stock_query, query)
     if not symbol:
         return {"error": f"Quote not found for: {query}"}
 
-    stock = yf.Ticker(symbol)
-
     try:
-        hist = stock.history(period=period)
-        history_data = []
-        for date, row in hist.iterrows():
-            history_data.append(
-                {
-                    "date": date.strftime("%Y-%m-%d"),
-                    "open": float(row["Open"]),
-                    "high": float(row["High"]),
-                    "low": float(row["Low"]),
-                    "close": float(row["Close"]),
-                    "volume": int(row["Volume"]),
-                }
-            )
+        bars = await asyncio.to_thread(get_history, symbol, period)
+        history_data = history_columns(bars) if format == "columns" else history_records(bars)
+
+        payload = {"symbol": symbol, "period": period, "format": format, "data": history_data, "resolved_from": resolved_from}
+        return _conditional_json(request, payload)
+    except Exception as e:
+        return {"error": str(e), "symbol": symbol, "period": period}
+
+
+@router.get("/stock/{query}/indicators")
+async def get_stock_indicators(query: str, request: Request, period: str = "6mo", names: Optional[str] = None):
+    """
+    names: comma-separated, optional params after ':' joined with '-',
+    e.g. "sma:20,sma:50,ema:12,rsi:14,macd:12-26-9,bbands:20-2,volatility:20,drawdown"
+    """
+    symbol, resolved_from, _ = await asyncio.to_thread(resolve_stock_query, query)
+    if not symbol:
+        return {"error": f"Quote not found for: {query}"}
 
-        return {"symbol": symbol, "period": period, "data": history_data, "resolved_from": resolved_from}
+    try:
+        result = await asyncio.to_thread(compute_indicators, symbol, period, names)
+        return _conditional_json(request, {"symbol": symbol, "period": period, **result, "resolved_from": resolved_from})
     except Exception as e:
         return {"error": str(e), "symbol": symbol, "period": period}
 
 
 @router.post("/alerts/add")
-async def add_price_alert(alert: PriceAlert):
+async def add_price_alert(alert: PriceAlert, user: str = Depends(current_user)):
     raw = (alert.symbol or "").strip()
     if not raw:
         return {"success": False, "error": "Symbol is required"}
 
-    symbol, resolved_from, info = resolve_stock_query(raw)
+    symbol, resolved_from, info = await asyncio.to_thread(resolve_stock_query, raw)
     if not symbol or not info:
         return {"success": False, "error": f"Quote not found for: {raw}"}
 
@@ -226,6 +438,7 @@ async def add_price_alert(alert: PriceAlert):
         return {"success": False, "error": "direction must be 'above' or 'below'"}
 
     alert_data = {
+        "id": uuid.uuid4().hex[:12],
         "symbol": symbol,
         "target_price": float(alert.target_price),
         "direction": alert.direction,
@@ -233,7 +446,7 @@ async def add_price_alert(alert: PriceAlert):
         "resolved_from": resolved_from,
     }
 
-    user_alerts.append(alert_data)
+    await asyncio.to_thread(get_store().add_alert, user, alert_data)
     return {
         "success": True,
         "message": f"Alert set for {symbol} {alert.direction} ${alert.target_price}",
@@ -242,12 +455,12 @@ async def add_price_alert(alert: PriceAlert):
 
 
 @router.get("/alerts/check/{query}")
-async def check_alerts(query: str):
+async def check_alerts(query: str, user: str = Depends(current_user)):
     raw = (query or "").strip()
     if not raw:
         return {"error": "Symbol required"}
 
-    symbol, resolved_from, info = resolve_stock_query(raw)
+    symbol, resolved_from, info = await asyncio.to_thread(resolve_stock_query, raw)
     if not symbol or not info:
         return {"error": f"Quote not found for: {raw}"}
 
@@ -255,10 +468,9 @@ async def check_alerts(query: str):
     if current_price is None:
         return {"error": f"Could not fetch price for {symbol}"}
 
+    symbol_alerts = await asyncio.to_thread(get_store().alerts, user, symbol)
     triggered = []
-    for a in user_alerts:
-        if a.get("symbol") != symbol:
-            continue
+    for a in symbol_alerts:
         if a["direction"] == "below" and current_price <= a["target_price"]:
             triggered.append(a)
         if a["direction"] == "above" and current_price >= a["target_price"]:
@@ -268,34 +480,73 @@ async def check_alerts(query: str):
         "symbol": symbol,
         "current_price": current_price,
         "triggered_alerts": triggered,
-        "total_alerts": len([a for a in user_alerts if a.get("symbol") == symbol]),
+        "total_alerts": len(symbol_alerts),
         "resolved_from": resolved_from,
     }
 
 
+@router.get("/alerts/triggered")
+async def get_triggered_alerts(symbol: Optional[str] = None, limit: int = 50, user: str = Depends(current_user)):
+    sym = symbol.strip().upper() if symbol else None
+    return {
+        "triggered": alert_engine.recent_triggers(user, sym, limit=limit),
+        "engine": alert_engine.alert_engine_stats(),
+    }
+
+
+@router.get("/alerts/stream")
+async def stream_alerts(request: Request, user: str = Depends(current_user)):
+    """SSE stream of this user's alerts fired by the background engine."""
+    queue = alert_engine.subscribe()
+
+    async def events():
+        try:
+            while not await request.is_disconnected():
+                try:
+                    trigger = await asyncio.wait_for(queue.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    yield SSE_HEARTBEAT
+                    continue
+                if trigger["alert"].get("user_id") == user:
+                    yield format_sse(trigger, event="alert")
+        finally:
+            alert_engine.unsubscribe(queue)
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
+
+
 @router.post("/chat")
 async def chat_endpoint(chat: ChatMessage):
-    if not ai_ready():
-        if chat.context:
-            return {
-                "success": True,
-                "response": (
-                    f"I can help! You’re asking about {chat.context.upper()}. "
-                    "Right now AI responses are limited, but you can still check price, change %, and metrics."
-                ),
+    # Cached answers and the "AI unavailable" fallback are handled inside chat_with_ai_async
+    answer = await chat_with_ai_async(chat.message, chat.context)
+    return {"success": True, "response": answer, "context": chat.context}
+
+
+@router.post("/chat/stream")
+async def chat_stream_endpoint(chat: ChatMessage):
+    """
+    Same as /chat, streamed as SSE: "token" events ({"text": ...}) as Gemini produces them,
+    then one "done" event with ttft_ms / total_ms.
+    """
+
+    async def events():
+        start = time.perf_counter()
+        ttft_ms: Optional[float] = None
+        async for text in chat_stream_async(chat.message, chat.context):
+            if ttft_ms is None:
+                ttft_ms = (time.perf_counter() - start) * 1000.0
+            yield format_sse({"text": text}, event="token")
+
+        yield format_sse(
+            {
                 "context": chat.context,
-            }
-        return {
-            "success": True,
-            "response": (
-                "I can help! Try asking “What is a stock?” or “What does P/E mean?” "
-                "Open a stock first for more context."
-            ),
-            "context": None,
-        }
+                "ttft_ms": round(ttft_ms or 0.0, 1),
+                "total_ms": round((time.perf_counter() - start) * 1000.0, 1),
+            },
+            event="done",
+        )
 
-    answer = chat_with_ai(chat.message, chat.context)
-    return {"success": True, "response": answer, "context": chat.context}
+    return StreamingResponse(events(), media_type="text/event-stream", headers=SSE_HEADERS)
 
 
 @router.post("/chat/compare")
@@ -303,12 +554,14 @@ async def compare_stocks(req: CompareRequest):
     symbols = req.symbols
     if len(symbols) < 2:
         return {"success": False, "error": "Please provide at least 2 stocks to compare"}
-    if len(symbols) > 3:
-        return {"success": False, "error": "Maximum 3 stocks can be compared at once"}
+    if len(symbols) > COMPARE_MAX_SYMBOLS:
+        return {"success": False, "error": f"Maximum {COMPARE_MAX_SYMBOLS} stocks can be compared at once"}
+    if req.period not in VALID_PERIODS:
+        # Caught here: a bad period would otherwise read as "no history" for every symbol
+        return {"success": False, "error": f"Invalid period '{req.period}'. Valid: {', '.join(sorted(VALID_PERIODS))}"}
 
     stock_data = []
-    for s in symbols:
-        sym, resolved_from, info = resolve_stock_query(s)
+    for sym, resolved_from, info in await asyncio.to_thread(resolve_stock_queries, symbols):
         if not sym or not info:
             continue
 
@@ -331,8 +584,16 @@ async def compare_stocks(req: CompareRequest):
     if len(stock_data) < 2:
         return {"success": False, "error": "Could not fetch data for enough stocks"}
 
+    try:
+        analytics = await asyncio.to_thread(
+            compare_analytics, [s["symbol"] for s in stock_data], req.period, req.benchmark
+        )
+    except Exception as e:
+        analytics = {"error": str(e)}
+
     return {
         "success": True,
         "stocks": stock_data,
-        "comparison": "Basic compare is enabled. (You can re-add Gemini compare later.)",
+        "analytics": analytics,
+        "comparison": summarize_comparison(analytics) if "error" not in analytics else "",
     }
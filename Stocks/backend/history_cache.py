@@ -0,0 +1,247 @@
+# backend/history_cache.py
+from __future__ import annotations
+
+import json
+import os
+import threading
+import time
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from .metrics import track_upstream
+from .replay import ticker
+
+
+# Daily OHLCV per symbol, stored as a memory-mappable .npy structured array + a small .json meta file.
+HISTORY_CACHE_DIR = os.getenv("HISTORY_CACHE_DIR", os.path.join(".cache", "history"))
+# How long stored bars are trusted before we ask Yahoo for anything newer
+HISTORY_REFRESH_SECONDS = float(os.getenv("HISTORY_REFRESH_SECONDS", "300"))
+# Relative difference in a stored (final) close that counts as a re-adjusted series
+ADJUSTMENT_TOLERANCE = 1e-4
+
+BAR_DTYPE = np.dtype(
+    [
+        ("date", "M8[D]"),
+        ("open", "f8"),
+        ("high", "f8"),
+        ("low", "f8"),
+        ("close", "f8"),
+        ("volume", "i8"),
+    ]
+)
+
+# Trailing-bar periods (trading days) vs calendar periods
+_BAR_PERIODS = {"1d": 1, "5d": 5}
+_CALENDAR_PERIODS = {
+    "1mo": pd.DateOffset(months=1),
+    "3mo": pd.DateOffset(months=3),
+    "6mo": pd.DateOffset(months=6),
+    "1y": pd.DateOffset(years=1),
+    "2y": pd.DateOffset(years=2),
+    "5y": pd.DateOffset(years=5),
+    "10y": pd.DateOffset(years=10),
+}
+VALID_PERIODS = set(_BAR_PERIODS) | set(_CALENDAR_PERIODS) | {"ytd", "max"}
+
+# Oldest date we ever ask for when the period is bar-based ("5d" -> a couple of weeks back)
+_BAR_LOOKBACK_DAYS = 14
+
+_locks: Dict[str, threading.Lock] = {}
+_locks_guard = threading.Lock()
+
+_stats = {"served": 0, "full_fetches": 0, "incremental_fetches": 0, "disk_hits": 0, "readjusted": 0}
+
+
+def _lock_for(symbol: str) -> threading.Lock:
+    with _locks_guard:
+        if symbol not in _locks:
+            _locks[symbol] = threading.Lock()
+        return _locks[symbol]
+
+
+def _paths(symbol: str):
+    safe = "".join(ch if ch.isalnum() or ch in "-_." else "_" for ch in symbol)
+    base = os.path.join(HISTORY_CACHE_DIR, safe)
+    return base + ".npy", base + ".json"
+
+
+def _period_start(period: str, today: date) -> Optional[date]:
+    """First calendar date a period needs (None = everything)."""
+    if period == "max":
+        return None
+    if period == "ytd":
+        return date(today.year, 1, 1)
+    if period in _BAR_PERIODS:
+        return today - timedelta(days=_BAR_LOOKBACK_DAYS)
+    return (pd.Timestamp(today) - _CALENDAR_PERIODS[period]).date()
+
+
+def _frame_to_bars(hist: pd.DataFrame) -> np.ndarray:
+    """Vectorized DataFrame -> structured array (no per-row work)."""
+    if hist is None or hist.empty:
+        return np.empty(0, dtype=BAR_DTYPE)
+    idx = hist.index
+    if getattr(idx, "tz", None) is not None:
+        idx = idx.tz_localize(None)
+
+    bars = np.empty(len(hist), dtype=BAR_DTYPE)
+    bars["date"] = idx.values.astype("M8[D]")
+    bars["open"] = hist["Open"].to_numpy(dtype="f8")
+    bars["high"] = hist["High"].to_numpy(dtype="f8")
+    bars["low"] = hist["Low"].to_numpy(dtype="f8")
+    bars["close"] = hist["Close"].to_numpy(dtype="f8")
+    bars["volume"] = hist["Volume"].fillna(0).to_numpy(dtype="i8")
+    return bars
+
+
+def _load(symbol: str) -> tuple:
+    npy, meta_path = _paths(symbol)
+    try:
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        bars = np.load(npy, mmap_mode="r")
+        return bars, meta
+    except Exception:
+        return None, None
+
+
+def _save(symbol: str, bars: np.ndarray, meta: Dict[str, Any]) -> None:
+    os.makedirs(HISTORY_CACHE_DIR, exist_ok=True)
+    npy, meta_path = _paths(symbol)
+    # Write to temp files then rename, so readers never see a half-written cache
+    tmp_npy = f"{npy}.{os.getpid()}.tmp.npy"
+    np.save(tmp_npy, np.ascontiguousarray(bars))
+    os.replace(tmp_npy, npy)
+    tmp_meta = f"{meta_path}.{os.getpid()}.tmp"
+    with open(tmp_meta, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(tmp_meta, meta_path)
+
+
+def _fetch(symbol: str, start: Optional[date]) -> np.ndarray:
+    stock = ticker(symbol)
+    with track_upstream("yfinance", "history"):
+        if start is None:
+            hist = stock.history(period="max", auto_adjust=True)
+        else:
+            hist = stock.history(start=start.isoformat(), auto_adjust=True)
+    return _frame_to_bars(hist)
+
+
+def _refresh(symbol: str, period: str) -> np.ndarray:
+    """Make sure the stored bars cover `period` and are recent; returns the full stored array."""
+    today = date.today()
+    need_from = _period_start(period, today)
+    bars, meta = _load(symbol)
+    now = time.time()
+
+    covered_from = None
+    if meta is not None:
+        covered_from = meta.get("covered_from")
+        covered_from = date.fromisoformat(covered_from) if covered_from else None
+
+    has_coverage = bars is not None and len(bars) > 0 and (
+        meta.get("covered_from") is None or (need_from is not None and covered_from <= need_from)
+    )
+
+    if not has_coverage:
+        # First fetch, or asked for further back than we have (or an empty cache): fetch the whole range
+        return _full_fetch(symbol, need_from, now)
+
+    if now - float(meta.get("fetched_at", 0)) < HISTORY_REFRESH_SECONDS:
+        _stats["disk_hits"] += 1
+        return bars
+
+    # Incremental: refetch from the bar before the last one. The last bar may have been a
+    # partial day; the one before it is final, so a changed close there means Yahoo has
+    # re-adjusted the series (split/dividend) and everything stored is on the old basis.
+    anchor = bars["date"][-2] if len(bars) > 1 else bars["date"][-1]
+    anchor_close = float(bars["close"][-2] if len(bars) > 1 else bars["close"][-1])
+    try:
+        newer = _fetch(symbol, anchor.astype(object))
+    except Exception:
+        return bars  # Yahoo hiccup: serve what we have, try again next request
+    if not len(newer):
+        return bars
+
+    overlap = newer["close"][newer["date"] == anchor]
+    if len(overlap) and not np.isclose(overlap[0], anchor_close, rtol=ADJUSTMENT_TOLERANCE):
+        _stats["readjusted"] += 1
+        covered = meta.get("covered_from")
+        return _full_fetch(symbol, date.fromisoformat(covered) if covered else None, now)
+
+    _stats["incremental_fetches"] += 1
+    keep = np.asarray(bars[bars["date"] < anchor])
+    merged = np.concatenate([keep, newer])
+    meta = dict(meta, fetched_at=now)
+    _save(symbol, merged, meta)
+    return merged
+
+
+def _full_fetch(symbol: str, need_from: Optional[date], now: float) -> np.ndarray:
+    fresh = _fetch(symbol, need_from)
+    _stats["full_fetches"] += 1
+    # yfinance returns an empty frame (not an error) when Yahoo fails: don't cache that
+    if len(fresh):
+        _save(symbol, fresh, {"covered_from": need_from.isoformat() if need_from else None, "fetched_at": now})
+    return fresh
+
+
+def get_history(symbol: str, period: str = "1mo") -> np.ndarray:
+    """
+    Daily OHLCV bars for `period`, served as a slice of the on-disk cache.
+    Only bars newer than the last stored date are fetched from Yahoo.
+    """
+    if period not in VALID_PERIODS:
+        raise ValueError(f"Invalid period '{period}'. Valid: {', '.join(sorted(VALID_PERIODS))}")
+
+    sym = (symbol or "").strip().upper()
+    with _lock_for(sym):
+        bars = _refresh(sym, period)
+
+    _stats["served"] += 1
+    if period in _BAR_PERIODS:
+        return bars[-_BAR_PERIODS[period]:]
+    start = _period_start(period, date.today())
+    if start is None:
+        return bars
+    i = int(np.searchsorted(bars["date"], np.datetime64(start, "D"), side="left"))
+    return bars[i:]
+
+
+def history_columns(bars: np.ndarray) -> Dict[str, Any]:
+    """
+    Bars -> one array per field (columnar JSON: no per-bar dicts or repeated keys).
+    Numeric columns stay NumPy arrays; json_response encodes them without per-cell work.
+    """
+    return {
+        "date": np.datetime_as_string(bars["date"], unit="D").tolist(),
+        "open": np.ascontiguousarray(bars["open"]),
+        "high": np.ascontiguousarray(bars["high"]),
+        "low": np.ascontiguousarray(bars["low"]),
+        "close": np.ascontiguousarray(bars["close"]),
+        "volume": np.ascontiguousarray(bars["volume"]),
+    }
+
+
+def history_records(bars: np.ndarray) -> List[Dict[str, Any]]:
+    """Bars -> list of dicts for the JSON response, built column-wise (no iterrows)."""
+    dates = np.datetime_as_string(bars["date"], unit="D").tolist()
+    return [
+        {"date": d, "open": o, "high": h, "low": l, "close": c, "volume": v}
+        for d, o, h, l, c, v in zip(
+            dates,
+            bars["open"].tolist(),
+            bars["high"].tolist(),
+            bars["low"].tolist(),
+            bars["close"].tolist(),
+            bars["volume"].tolist(),
+        )
+    ]
+
+
+def history_cache_stats() -> Dict[str, Any]:
+    return {**_stats, "dir": HISTORY_CACHE_DIR, "refresh_seconds": HISTORY_REFRESH_SECONDS}
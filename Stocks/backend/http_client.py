@@ -0,0 +1,277 @@
+# backend/http_client.py
+from __future__ import annotations
+
+import asyncio
+import os
+import random
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional
+
+import httpx
+import requests
+
+from .metrics import track_upstream
+from .replay import async_transport, http_adapter
+
+
+HTTP_TIMEOUT_SECONDS = float(os.getenv("HTTP_TIMEOUT_SECONDS", "12"))
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "50"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+
+# Retry / backoff
+HTTP_MAX_RETRIES = int(os.getenv("HTTP_MAX_RETRIES", "2"))
+HTTP_BACKOFF_BASE_SECONDS = 0.25
+HTTP_BACKOFF_MAX_SECONDS = 4.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Circuit breaker: after N consecutive failures, stop calling the upstream for a while
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "5"))
+BREAKER_COOLDOWN_SECONDS = float(os.getenv("BREAKER_COOLDOWN_SECONDS", "30"))
+
+DEFAULT_HEADERS = {"User-Agent": "Mozilla/5.0"}
+
+# Known upstreams and how many requests we allow in flight to each at once
+UPSTREAMS: Dict[str, Dict[str, Any]] = {
+    "yahoo_search": {"max_concurrency": 8},
+    "alphavantage": {"max_concurrency": 2},
+}
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose circuit breaker is open."""
+
+
+# One pooled client per process; created lazily on the running event loop.
+_async_client: Optional[httpx.AsyncClient] = None
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+
+_sync_limits: Dict[str, threading.BoundedSemaphore] = {}
+_async_limits: Dict[str, asyncio.Semaphore] = {}
+
+# upstream -> {"failures": int, "opened_at": float | None, "trial": bool}
+_breakers: Dict[str, Dict[str, Any]] = {}
+_breaker_lock = threading.Lock()
+
+
+def get_async_client() -> httpx.AsyncClient:
+    global _async_client
+    if _async_client is None or _async_client.is_closed:
+        limits = httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+        )
+        _async_client = httpx.AsyncClient(
+            headers=DEFAULT_HEADERS,
+            timeout=HTTP_TIMEOUT_SECONDS,
+            limits=limits,
+            transport=async_transport(limits),  # replay / record (UPSTREAM_MODE); None = default
+        )
+    return _async_client
+
+
+async def close_async_client() -> None:
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+
+
+def get_session() -> requests.Session:
+    """Shared keep-alive requests.Session for the sync code paths."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            s = requests.Session()
+            adapter = http_adapter(pool_connections=len(UPSTREAMS) + 2, pool_maxsize=HTTP_MAX_KEEPALIVE)
+            s.mount("https://", adapter)
+            s.mount("http://", adapter)
+            s.headers.update(DEFAULT_HEADERS)
+            _session = s
+        return _session
+
+
+def _max_concurrency(upstream: str) -> int:
+    return int(UPSTREAMS.get(upstream, {}).get("max_concurrency", 4))
+
+
+def _sync_limit(upstream: str) -> threading.BoundedSemaphore:
+    with _session_lock:
+        if upstream not in _sync_limits:
+            _sync_limits[upstream] = threading.BoundedSemaphore(_max_concurrency(upstream))
+        return _sync_limits[upstream]
+
+
+def _async_limit(upstream: str) -> asyncio.Semaphore:
+    if upstream not in _async_limits:
+        _async_limits[upstream] = asyncio.Semaphore(_max_concurrency(upstream))
+    return _async_limits[upstream]
+
+
+# ---------------------------- circuit breaker ---------------------------------
+
+def _breaker_allow(upstream: str) -> bool:
+    """Closed -> allow. Open -> deny until cooldown passes, then allow one trial call."""
+    with _breaker_lock:
+        b = _breakers.setdefault(upstream, {"failures": 0, "opened_at": None, "trial": False})
+        if b["opened_at"] is None:
+            return True
+        if time.time() - b["opened_at"] < BREAKER_COOLDOWN_SECONDS or b["trial"]:
+            return False
+        b["trial"] = True  # half-open
+        return True
+
+
+def _release_trial(upstream: str) -> None:
+    """A half-open trial call ended without a result (cancelled): let the next call try instead."""
+    with _breaker_lock:
+        b = _breakers.get(upstream)
+        if b is not None:
+            b["trial"] = False
+
+
+def record_upstream_result(upstream: str, ok: bool) -> None:
+    """
+    Feed the breaker. Also used by callers for "soft" failures the transport
+    can't see (e.g. AlphaVantage answering 200 with a rate-limit note).
+    """
+    with _breaker_lock:
+        b = _breakers.setdefault(upstream, {"failures": 0, "opened_at": None, "trial": False})
+        if ok:
+            b.update(failures=0, opened_at=None, trial=False)
+            return
+        b["failures"] += 1
+        b["trial"] = False
+        if b["failures"] >= BREAKER_FAILURE_THRESHOLD or b["opened_at"] is not None:
+            b["opened_at"] = time.time()
+
+
+def breaker_stats() -> Dict[str, Any]:
+    now = time.time()
+    with _breaker_lock:
+        out: Dict[str, Any] = {}
+        for name, b in _breakers.items():
+            if b["opened_at"] is None:
+                state = "closed"
+            elif now - b["opened_at"] < BREAKER_COOLDOWN_SECONDS:
+                state = "open"
+            else:
+                state = "half_open"
+            out[name] = {"state": state, "consecutive_failures": b["failures"]}
+        return out
+
+
+# ------------------------------- backoff --------------------------------------
+
+def _retry_after_seconds(headers: Any) -> Optional[float]:
+    raw = headers.get("Retry-After") if headers is not None else None
+    if not raw:
+        return None
+    try:
+        return max(0.0, float(raw))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(raw).timestamp() - time.time())
+    except Exception:
+        return None
+
+
+def _backoff_delay(attempt: int, retry_after: Optional[float]) -> float:
+    if retry_after is not None:
+        return min(retry_after, HTTP_BACKOFF_MAX_SECONDS * 4)
+    # Full jitter: uniform in [0, base * 2^attempt], capped
+    return random.uniform(0, min(HTTP_BACKOFF_MAX_SECONDS, HTTP_BACKOFF_BASE_SECONDS * (2 ** attempt)))
+
+
+# ------------------------------- requests -------------------------------------
+
+def get_json(
+    upstream: str,
+    url: str,
+    params: Optional[Dict[str, Any]] = None,
+    timeout: float = HTTP_TIMEOUT_SECONDS,
+) -> Any:
+    """
+    GET url on the shared session and return the decoded JSON body.
+    Retries transient failures with jittered exponential backoff (honoring Retry-After),
+    caps in-flight requests per upstream, and fails fast with CircuitOpenError
+    while the upstream's breaker is open.
+    """
+    if not _breaker_allow(upstream):
+        raise CircuitOpenError(f"{upstream} circuit is open")
+
+    limit = _sync_limit(upstream)
+    attempt = 0
+    while True:
+        retry_after = None
+        try:
+            with limit, track_upstream(upstream, "http"):
+                r = get_session().get(url, params=params, timeout=timeout)
+            if r.status_code in RETRY_STATUSES and attempt < HTTP_MAX_RETRIES:
+                retry_after = _retry_after_seconds(r.headers)
+                raise requests.HTTPError(f"{r.status_code} from {upstream}", response=r)
+            r.raise_for_status()
+            payload = r.json()
+            record_upstream_result(upstream, True)
+            return payload
+        except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as e:
+            status = getattr(getattr(e, "response", None), "status_code", None)
+            retryable = status is None or status in RETRY_STATUSES
+            if not retryable or attempt >= HTTP_MAX_RETRIES:
+                # A plain 4xx means the upstream is up and answered; don't trip the breaker
+                record_upstream_result(upstream, not retryable)
+                raise
+            time.sleep(_backoff_delay(attempt, retry_after))
+            attempt += 1
+        except Exception:
+            record_upstream_result(upstream, False)
+            raise
+
+
+async def get_json_async(
+    upstream: str,
+    url: str,
+    params: Optional[Dict[str, Any]] = None,
+    timeout: float = HTTP_TIMEOUT_SECONDS,
+) -> Any:
+    """Async twin of get_json on the pooled httpx client."""
+    if not _breaker_allow(upstream):
+        raise CircuitOpenError(f"{upstream} circuit is open")
+
+    limit = _async_limit(upstream)
+    attempt = 0
+    try:
+        while True:
+            retry_after = None
+            try:
+                async with limit:
+                    with track_upstream(upstream, "http"):
+                        r = await get_async_client().get(url, params=params, timeout=timeout)
+                if r.status_code in RETRY_STATUSES and attempt < HTTP_MAX_RETRIES:
+                    retry_after = _retry_after_seconds(r.headers)
+                r.raise_for_status()
+                payload = r.json()
+                record_upstream_result(upstream, True)
+                return payload
+            except (httpx.TransportError, httpx.HTTPStatusError) as e:
+                status = e.response.status_code if isinstance(e, httpx.HTTPStatusError) else None
+                retryable = status is None or status in RETRY_STATUSES
+                if not retryable or attempt >= HTTP_MAX_RETRIES:
+                    # A plain 4xx means the upstream is up and answered; don't trip the breaker
+                    record_upstream_result(upstream, not retryable)
+                    raise
+                await asyncio.sleep(_backoff_delay(attempt, retry_after))
+                attempt += 1
+            except Exception:
+                record_upstream_result(upstream, False)
+                raise
+    except BaseException as e:
+        # CancelledError skips the handlers above; without this a cancelled
+        # half-open trial would leave the breaker denying every call
+        if not isinstance(e, Exception):
+            _release_trial(upstream)
+        raise
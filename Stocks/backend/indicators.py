@@ -0,0 +1,206 @@
+# backend/indicators.py
+from __future__ import annotations
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from .history_cache import get_history
+
+
+INDICATOR_MEMO_MAX_ENTRIES = int(os.getenv("INDICATOR_MEMO_MAX_ENTRIES", "256"))
+MAX_INDICATORS_PER_REQUEST = 12
+TRADING_DAYS_PER_YEAR = 252
+
+DEFAULT_INDICATORS = "sma:20,sma:50,rsi,macd"
+
+# Indicators are computed over a longer window than requested so EMAs/RSI have warmed up
+# by the first bar the chart shows.
+_WARMUP_PERIOD = {
+    "1d": "6mo",
+    "5d": "6mo",
+    "1mo": "1y",
+    "3mo": "1y",
+    "6mo": "2y",
+    "ytd": "2y",
+    "1y": "2y",
+    "2y": "5y",
+    "5y": "10y",
+    "10y": "max",
+    "max": "max",
+}
+
+# (symbol, warmup period, bar count, last bar date, last close, spec) -> {indicator key: ndarray or dict of ndarrays}
+_memo: "OrderedDict[Tuple[Any, ...], Dict[str, Any]]" = OrderedDict()
+_memo_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0}
+
+
+# ---- kernels (all vectorized, NaN where there isn't enough data yet) ----
+
+def sma(close: np.ndarray, window: int = 20) -> np.ndarray:
+    return pd.Series(close).rolling(window, min_periods=window).mean().to_numpy()
+
+
+def ema(close: np.ndarray, span: int = 20) -> np.ndarray:
+    return pd.Series(close).ewm(span=span, adjust=False, min_periods=span).mean().to_numpy()
+
+
+def rsi(close: np.ndarray, window: int = 14) -> np.ndarray:
+    """Wilder's RSI (smoothing alpha = 1/window)."""
+    delta = pd.Series(close).diff()
+    avg_gain = delta.clip(lower=0).ewm(alpha=1.0 / window, adjust=False, min_periods=window).mean()
+    avg_loss = (-delta.clip(upper=0)).ewm(alpha=1.0 / window, adjust=False, min_periods=window).mean()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        out = 100.0 - 100.0 / (1.0 + avg_gain.to_numpy() / avg_loss.to_numpy())
+    # Only gains -> x/0 = inf -> 100 already; a completely flat window is 0/0, call it neutral
+    out[(avg_loss.to_numpy() == 0) & (avg_gain.to_numpy() == 0)] = 50.0
+    return out
+
+
+def macd(close: np.ndarray, fast: int = 12, slow: int = 26, signal: int = 9) -> Dict[str, np.ndarray]:
+    line = ema(close, fast) - ema(close, slow)
+    sig = pd.Series(line).ewm(span=signal, adjust=False, min_periods=signal).mean().to_numpy()
+    return {"macd": line, "signal": sig, "histogram": line - sig}
+
+
+def bollinger(close: np.ndarray, window: int = 20, k: float = 2.0) -> Dict[str, np.ndarray]:
+    rolling = pd.Series(close).rolling(window, min_periods=window)
+    mid = rolling.mean().to_numpy()
+    std = rolling.std(ddof=0).to_numpy()
+    return {"upper": mid + k * std, "middle": mid, "lower": mid - k * std}
+
+
+def volatility(close: np.ndarray, window: int = 20) -> np.ndarray:
+    """Annualized rolling volatility of daily log returns, in percent."""
+    with np.errstate(divide="ignore", invalid="ignore"):
+        log_ret = np.diff(np.log(close), prepend=np.nan)
+    std = pd.Series(log_ret).rolling(window, min_periods=window).std().to_numpy()
+    return std * np.sqrt(TRADING_DAYS_PER_YEAR) * 100.0
+
+
+def drawdown(close: np.ndarray) -> np.ndarray:
+    """Percent below the running peak (0 at a new high)."""
+    peak = np.maximum.accumulate(np.where(np.isnan(close), -np.inf, close))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return (close / peak - 1.0) * 100.0
+
+
+# name -> (kernel, default params, param types)
+_INDICATORS: Dict[str, Tuple[Callable[..., Any], Tuple[Any, ...], Tuple[type, ...]]] = {
+    "sma": (sma, (20,), (int,)),
+    "ema": (ema, (20,), (int,)),
+    "rsi": (rsi, (14,), (int,)),
+    "macd": (macd, (12, 26, 9), (int, int, int)),
+    "bbands": (bollinger, (20, 2.0), (int, float)),
+    "volatility": (volatility, (20,), (int,)),
+    "drawdown": (drawdown, (), ()),
+}
+
+
+def parse_spec(names: Optional[str]) -> List[Tuple[str, Tuple[Any, ...]]]:
+    """
+    "sma:50,ema:12,rsi,macd:12-26-9,bbands:20-2" -> [("sma", (50,)), ...]
+    Missing params fall back to the defaults. Raises ValueError on anything unknown.
+    """
+    spec: List[Tuple[str, Tuple[Any, ...]]] = []
+    for part in (names or DEFAULT_INDICATORS).split(","):
+        part = part.strip().lower()
+        if not part:
+            continue
+        name, _, raw = part.partition(":")
+        if name not in _INDICATORS:
+            raise ValueError(f"Unknown indicator '{name}'. Valid: {', '.join(sorted(_INDICATORS))}")
+        _, defaults, types = _INDICATORS[name]
+        values = [v for v in raw.split("-") if v] if raw else []
+        if len(values) > len(defaults):
+            raise ValueError(f"Too many parameters for '{name}'")
+        try:
+            params = tuple(t(v) for t, v in zip(types, values)) + defaults[len(values):]
+        except ValueError:
+            raise ValueError(f"Bad parameters for '{name}': {raw}")
+        if any(p <= 0 for p in params) or any(p > 1000 for p in params):
+            raise ValueError(f"Parameters for '{name}' must be between 1 and 1000")
+        if (name, params) not in spec:
+            spec.append((name, params))
+
+    if not spec:
+        raise ValueError("No indicators requested")
+    if len(spec) > MAX_INDICATORS_PER_REQUEST:
+        raise ValueError(f"At most {MAX_INDICATORS_PER_REQUEST} indicators per request")
+    return spec
+
+
+def _key(name: str, params: Tuple[Any, ...]) -> str:
+    return "_".join([name] + [f"{p:g}" if isinstance(p, float) else str(p) for p in params])
+
+
+def _compute(close: np.ndarray, spec: List[Tuple[str, Tuple[Any, ...]]]) -> Dict[str, Any]:
+    out: Dict[str, Any] = {}
+    for name, params in spec:
+        kernel = _INDICATORS[name][0]
+        out[_key(name, params)] = kernel(close, *params)
+    return out
+
+
+def _rounded(arr: np.ndarray) -> np.ndarray:
+    """Left as an array: the JSON response class encodes it directly (NaN -> null)."""
+    return np.round(np.asarray(arr, dtype="f8"), 4)
+
+
+def compute_indicators(symbol: str, period: str = "6mo", names: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Indicators for the bars of `period`, computed over a longer warm-up window.
+    Memoized per (symbol, last bar, params), so repeat chart loads skip the math entirely.
+    """
+    spec = parse_spec(names)
+    shown = get_history(symbol, period)  # validates period
+    warm_period = _WARMUP_PERIOD.get(period, period)
+    bars = get_history(symbol, warm_period)
+
+    if len(bars):
+        last = (str(bars["date"][-1]), float(bars["close"][-1]))
+    else:
+        last = (None, None)
+    key = (symbol.upper(), warm_period, len(bars)) + last + (tuple(spec),)
+
+    with _memo_lock:
+        cached = _memo.get(key)
+        if cached is not None:
+            _memo.move_to_end(key)
+            _stats["hits"] += 1
+
+    if cached is None:
+        _stats["misses"] += 1
+        close = np.asarray(bars["close"], dtype="f8")
+        cached = _compute(close, spec)
+        with _memo_lock:
+            _memo[key] = cached
+            _memo.move_to_end(key)
+            while len(_memo) > INDICATOR_MEMO_MAX_ENTRIES:
+                _memo.popitem(last=False)
+
+    # The requested period is always a suffix of the warm-up window
+    n = min(len(shown), len(bars))
+    start = len(bars) - n
+    out: Dict[str, Any] = {}
+    for key_name, value in cached.items():
+        if isinstance(value, dict):
+            out[key_name] = {k: _rounded(v[start:]) for k, v in value.items()}
+        else:
+            out[key_name] = _rounded(value[start:])
+
+    return {
+        "dates": np.datetime_as_string(bars["date"][start:], unit="D").tolist(),
+        "close": _rounded(bars["close"][start:]),
+        "indicators": out,
+    }
+
+
+def indicator_memo_stats() -> Dict[str, Any]:
+    with _memo_lock:
+        return {**_stats, "entries": len(_memo)}
@@ -0,0 +1,69 @@
+# backend/json_response.py
+from __future__ import annotations
+
+import json
+import math
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any
+
+import numpy as np
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+
+# orjson is optional: much faster, and encodes NumPy arrays/scalars natively
+try:
+    import orjson  # type: ignore
+except Exception:
+    orjson = None
+
+
+def _default(obj: Any) -> Any:
+    """Types neither encoder handles on its own."""
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, (datetime, date)):
+        return obj.isoformat()  # pandas.Timestamp too
+    if isinstance(obj, Decimal):
+        return float(obj)
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    return jsonable_encoder(obj)  # pydantic models, enums, ...
+
+
+def dumps(content: Any) -> bytes:
+    """
+    JSON bytes for an API payload. NumPy arrays can be passed as-is (no per-cell
+    float()/int()), and NaN / inf come out as null instead of failing the response.
+    """
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+    return _dumps_stdlib(content)
+
+
+def _dumps_stdlib(content: Any) -> bytes:
+    return json.dumps(_finite(content), default=_default, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+
+def _finite(obj: Any) -> Any:
+    """NaN / inf -> None (like orjson), recursing through containers and arrays."""
+    if isinstance(obj, float):
+        return obj if math.isfinite(obj) else None
+    if isinstance(obj, dict):
+        return {k: _finite(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple)):
+        return [_finite(v) for v in obj]
+    if isinstance(obj, np.ndarray):
+        return _finite(obj.tolist())
+    if isinstance(obj, np.floating):
+        return _finite(float(obj))
+    return obj
+
+
+class FastJSONResponse(JSONResponse):
+    """App-wide default response class (orjson when installed, stdlib json otherwise)."""
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,186 @@
+# backend/loadtest.py
+"""
+Pure-asyncio load test for the Stocks API.
+
+    # in-process, no network: upstreams answered by backend/replay.py (UPSTREAM_MODE=replay)
+    python -m backend.loadtest --concurrency 32 --requests 400
+
+    # against a running server
+    python -m backend.loadtest --url http://127.0.0.1:8000 --scenarios stock,details
+
+Reports p50 / p95 / p99 latency and requests/second per scenario. With --max-p95-ms /
+--min-rps it exits non-zero when a scenario misses the budget, so CI can catch regressions.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+
+DEFAULT_SYMBOLS = ["AAPL", "MSFT", "GOOGL", "AMZN", "TSLA", "NVDA", "META", "JPM", "V", "KO"]
+CHAT_QUESTIONS = [
+    "What is P/E?",
+    "What does market cap mean?",
+    "What is a dividend?",
+    "Should I buy it?",
+    "What is the 52 week range?",
+    "How do ETFs work?",
+]
+LOADTEST_USER = "loadtest"
+
+# scenario -> (method, path, json body) for the i-th request
+Request = Tuple[str, str, Optional[Dict[str, Any]]]
+SCENARIOS: Dict[str, Callable[[int, List[str]], Request]] = {
+    "stock": lambda i, syms: ("GET", f"/stock/{syms[i % len(syms)]}", None),
+    "details": lambda i, syms: ("GET", f"/stock/{syms[i % len(syms)]}/details", None),
+    "watchlist": lambda i, syms: ("GET", "/watchlist/all", None),
+    "chat": lambda i, syms: (
+        "POST",
+        "/chat",
+        {"message": CHAT_QUESTIONS[i % len(CHAT_QUESTIONS)], "context": syms[i % len(syms)]},
+    ),
+}
+
+
+def _percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * pct))], 1)
+
+
+async def run_scenario(
+    client: httpx.AsyncClient, name: str, symbols: List[str], total: int, concurrency: int
+) -> Dict[str, Any]:
+    make = SCENARIOS[name]
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    errors = 0
+    counter = iter(range(total))
+
+    async def worker() -> None:
+        nonlocal errors
+        for i in counter:
+            method, path, body = make(i, symbols)
+            start = time.perf_counter()
+            try:
+                r = await client.request(method, path, json=body, headers={"X-User-Id": LOADTEST_USER})
+                statuses[r.status_code] = statuses.get(r.status_code, 0) + 1
+                payload = r.json() if r.status_code == 200 else None
+                if r.status_code != 200 or (isinstance(payload, dict) and payload.get("error")):
+                    errors += 1
+            except Exception:
+                errors += 1
+            latencies.append((time.perf_counter() - start) * 1000.0)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    elapsed = time.perf_counter() - started
+
+    return {
+        "scenario": name,
+        "requests": len(latencies),
+        "errors": errors,
+        "statuses": statuses,
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else None,
+        "p50_ms": _percentile(latencies, 0.50),
+        "p95_ms": _percentile(latencies, 0.95),
+        "p99_ms": _percentile(latencies, 0.99),
+        "max_ms": round(max(latencies), 1) if latencies else None,
+    }
+
+
+async def _seed_watchlist(client: httpx.AsyncClient, symbols: List[str]) -> None:
+    for sym in symbols:
+        await client.post("/watchlist/add", json={"symbol": sym}, headers={"X-User-Id": LOADTEST_USER})
+
+
+def _client(url: Optional[str], concurrency: int) -> httpx.AsyncClient:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    if url:
+        return httpx.AsyncClient(base_url=url, timeout=60, limits=limits)
+
+    # In-process: default to replayed upstreams and a throwaway store so runs need no network or state
+    os.environ.setdefault("UPSTREAM_MODE", "replay")
+    os.environ.setdefault("STOCKS_STORE", "memory")
+    from .main import app
+
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://loadtest", timeout=60)
+
+
+async def main_async(args: argparse.Namespace) -> List[Dict[str, Any]]:
+    symbols = [s.strip().upper() for s in args.symbols.split(",") if s.strip()]
+    names = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        raise SystemExit(f"unknown scenario(s): {', '.join(unknown)} (choose from {', '.join(SCENARIOS)})")
+
+    results = []
+    async with _client(args.url, args.concurrency) as client:
+        if "watchlist" in names:
+            await _seed_watchlist(client, symbols)
+        for name in names:
+            if args.warmup:
+                await run_scenario(client, name, symbols, args.warmup, args.concurrency)
+            results.append(await run_scenario(client, name, symbols, args.requests, args.concurrency))
+    return results
+
+
+def _report(results: List[Dict[str, Any]]) -> str:
+    header = f"{'scenario':<10} {'reqs':>6} {'errors':>6} {'rps':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}"
+    lines = [header, "-" * len(header)]
+    for r in results:
+        lines.append(
+            f"{r['scenario']:<10} {r['requests']:>6} {r['errors']:>6} {r['rps'] or 0:>8} "
+            f"{r['p50_ms'] or 0:>8} {r['p95_ms'] or 0:>8} {r['p99_ms'] or 0:>8} {r['max_ms'] or 0:>8}"
+        )
+    return "\n".join(lines)
+
+
+def _budget_failures(results: List[Dict[str, Any]], args: argparse.Namespace) -> List[str]:
+    failures = []
+    for r in results:
+        if args.max_p95_ms is not None and (r["p95_ms"] or 0) > args.max_p95_ms:
+            failures.append(f"{r['scenario']}: p95 {r['p95_ms']}ms > {args.max_p95_ms}ms")
+        if args.min_rps is not None and (r["rps"] or 0) < args.min_rps:
+            failures.append(f"{r['scenario']}: {r['rps']} rps < {args.min_rps}")
+        if args.max_error_rate is not None and r["requests"] and r["errors"] / r["requests"] > args.max_error_rate:
+            failures.append(f"{r['scenario']}: error rate {r['errors'] / r['requests']:.2%} > {args.max_error_rate:.2%}")
+    return failures
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Base URL of a running server (default: in-process app with replayed upstreams)")
+    parser.add_argument("--scenarios", default="stock,details,watchlist,chat")
+    parser.add_argument("--symbols", default=",".join(DEFAULT_SYMBOLS))
+    parser.add_argument("--requests", type=int, default=200, help="Measured requests per scenario")
+    parser.add_argument("--warmup", type=int, default=0, help="Unmeasured requests per scenario first (warm caches)")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--json", help="Also write the results to this file")
+    parser.add_argument("--max-p95-ms", type=float)
+    parser.add_argument("--min-rps", type=float)
+    parser.add_argument("--max-error-rate", type=float)
+    args = parser.parse_args(argv)
+
+    results = asyncio.run(main_async(args))
+    print(_report(results))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+    failures = _budget_failures(results, args)
+    for failure in failures:
+        print(f"FAIL {failure}", file=sys.stderr)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
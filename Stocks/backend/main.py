@@ -1,24 +1,74 @@
 """
 Stock Explainer API (Beginner-friendly)
 
-Key idea:
-- Gemini is ONLY called when you request it using `?explain=true`
-- Otherwise you always get reliable fallback text.
+Where Gemini is called (only when GEMINI_API_KEY is set; otherwise every one of
+these answers with rule-based fallback text):
+- /stock/{query} and /stock/{query}/details: move + metric explanations, cached,
+  coalesced per symbol and micro-batched across symbols (ai.py)
+- /chat and /chat/stream: tutor answers (streamed token by token on /chat/stream),
+  with repeated questions answered from chat_cache
+- the warmup job, only with WARMUP_ENABLED=1 and WARMUP_EXPLANATIONS=1
+All calls share one rate limiter (rate_limit.py), chat ahead of explanations ahead of
+background refreshes. /chat/compare and the indicator endpoints never call it.
 """
 
+import asyncio
 import os
+from contextlib import asynccontextmanager
+
 from dotenv import load_dotenv
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, PlainTextResponse
 
 from .endpoints import router
+from .quote_cache import quote_cache_stats
+from .http_client import breaker_stats, close_async_client
+from .symbol_index import symbol_index_stats
+from .stock_utils import resolve_memo_stats
+from .alerts import ALERT_ENGINE_ENABLED, alert_engine_stats, run_alert_engine
+from .quote_stream import quote_stream_stats
+from .history_cache import history_cache_stats
+from .indicators import indicator_memo_stats
+from .ai import ai_stats
+from .chat_cache import chat_cache_stats
+from .replay import replay_stats
+from .metrics import MetricsMiddleware, render as render_metrics
+from .json_response import FastJSONResponse
+from .ttl_cache import ttl_cache_stats
+from .news import ALPHAVANTAGE_API_KEY, NEWS_INGEST_ENABLED, news_index_stats, run_news_ingest
+from .warmup import WARMUP_ENABLED, run_warmup, warmup_stats
 
 load_dotenv()
 
-app = FastAPI(title="Stock Explainer API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    tasks = []
+    if ALERT_ENGINE_ENABLED:
+        tasks.append(asyncio.create_task(run_alert_engine()))
+    if NEWS_INGEST_ENABLED and ALPHAVANTAGE_API_KEY:
+        tasks.append(asyncio.create_task(run_news_ingest()))
+    if WARMUP_ENABLED:
+        tasks.append(asyncio.create_task(run_warmup()))
+
+    yield
+
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    # Release pooled upstream connections on shutdown
+    await close_async_client()
+
+
+# orjson-backed (when installed) and NumPy-aware for every route
+app = FastAPI(title="Stock Explainer API", lifespan=lifespan, default_response_class=FastJSONResponse)
+
+GZIP_MIN_BYTES = int(os.getenv("GZIP_MIN_BYTES", "1024"))
+GZIP_LEVEL = int(os.getenv("GZIP_LEVEL", "5"))
 
 origins_env = os.getenv("FRONTEND_ORIGINS", "").strip()
 if origins_env:
@@ -32,7 +82,12 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Request-ID", "ETag", "Server-Timing"],
 )
+# Compress JSON bodies (history/details are large and repetitive); SSE responses are left alone
+app.add_middleware(GZipMiddleware, minimum_size=GZIP_MIN_BYTES, compresslevel=GZIP_LEVEL)
+# Request ids, per-route latency histograms (GET /metrics), optional JSON request log
+app.add_middleware(MetricsMiddleware)
 
 
 # Static frontend 
@@ -50,7 +105,48 @@ def serve_index():
 # Health endpoint
 @app.get("/health", tags=["health"])
 def health():
-    return {"status": "ok"}
+    return {
+        "status": "ok",
+        "quote_cache": quote_cache_stats(),
+        "upstreams": breaker_stats(),
+        "symbol_index": symbol_index_stats(),
+        "resolve_memo": resolve_memo_stats(),
+        "alert_engine": alert_engine_stats(),
+        "quote_stream": quote_stream_stats(),
+        "history_cache": history_cache_stats(),
+        "indicators": indicator_memo_stats(),
+        "ai": ai_stats(),
+        "caches": ttl_cache_stats(),
+        "news_index": news_index_stats(),
+        "chat_cache": chat_cache_stats(),
+        "replay": replay_stats(),
+        "warmup": warmup_stats(),
+    }
+
+
+def _cache_counts():
+    """cache name -> (hits, misses) from each cache's own stats."""
+    quote = quote_cache_stats()
+    history = history_cache_stats()
+    memo = indicator_memo_stats()
+    resolve = resolve_memo_stats()
+    chat = chat_cache_stats()
+    counts = {
+        "quote": (quote["hits"], quote["misses"] + quote["price_refreshes"]),
+        "history": (history["disk_hits"], history["full_fetches"] + history["incremental_fetches"]),
+        "indicators": (memo["hits"], memo["misses"]),
+        "resolve_memo": (resolve["hits"] + resolve["negative_hits"], resolve["misses"]),
+        "chat_answers": (chat["exact_hits"] + chat["similar_hits"], chat["misses"]),
+    }
+    for name, stats in ttl_cache_stats().items():
+        counts[name] = (stats["hits"] + stats["stale_hits"], stats["misses"])
+    return counts
+
+
+# Prometheus scrape endpoint
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    return PlainTextResponse(render_metrics(_cache_counts()), media_type="text/plain; version=0.0.4")
 
 # API routes
 app.include_router(router)
@@ -0,0 +1,256 @@
+# backend/metrics.py
+from __future__ import annotations
+
+import contextvars
+import functools
+import inspect
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+
+# One JSON line per request (request id, route, status, duration, upstream time breakdown)
+REQUEST_LOG_ENABLED = os.getenv("REQUEST_LOG_ENABLED", "0").strip().lower() in ("1", "true", "yes")
+REQUEST_ID_HEADER = "X-Request-ID"
+
+# Histogram bucket upper bounds, seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+_log = logging.getLogger("stocks.requests")
+
+# Current request id and {upstream: [calls, seconds]} for the request being served.
+# asyncio.to_thread copies the context, so upstream calls made in worker threads are counted too.
+_request_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("request_id", default=None)
+_request_upstreams: contextvars.ContextVar[Optional[Dict[str, List[float]]]] = contextvars.ContextVar(
+    "request_upstreams", default=None
+)
+
+_lock = threading.Lock()
+# metric name -> labels -> [bucket counts..., +Inf count, sum]
+_histograms: Dict[str, Dict[Tuple[Tuple[str, str], ...], List[float]]] = {}
+_gauges: Dict[str, Dict[Tuple[Tuple[str, str], ...], float]] = {}
+_HELP = {
+    "stocks_http_request_duration_seconds": "API request latency by route template, method and status.",
+    "stocks_http_requests_in_flight": "API requests currently being served (open SSE streams included).",
+    "stocks_upstream_request_duration_seconds": "Latency of calls to Yahoo / yfinance / Alpha Vantage / Gemini.",
+    "stocks_upstream_requests_in_flight": "Upstream calls currently in progress.",
+    "stocks_call_duration_seconds": "Latency of instrumented backend functions (cache hits included).",
+    "stocks_cache_hits_total": "Cache hits, by cache.",
+    "stocks_cache_misses_total": "Cache misses, by cache.",
+    "stocks_cache_hit_ratio": "hits / (hits + misses), by cache.",
+}
+
+
+def _key(labels: Dict[str, str]) -> Tuple[Tuple[str, str], ...]:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def observe(name: str, seconds: float, **labels: str) -> None:
+    key = _key(labels)
+    with _lock:
+        series = _histograms.setdefault(name, {})
+        values = series.get(key)
+        if values is None:
+            values = series[key] = [0.0] * (len(LATENCY_BUCKETS) + 2)
+        for i, bound in enumerate(LATENCY_BUCKETS):
+            if seconds <= bound:
+                values[i] += 1
+        values[-2] += 1
+        values[-1] += seconds
+
+
+def _gauge_add(name: str, delta: float, **labels: str) -> None:
+    key = _key(labels)
+    with _lock:
+        series = _gauges.setdefault(name, {})
+        series[key] = series.get(key, 0.0) + delta
+
+
+# ---- upstream / function instrumentation ----
+
+@contextmanager
+def track_upstream(upstream: str, op: str) -> Iterator[None]:
+    """Time one upstream call (and count it against the current request)."""
+    _gauge_add("stocks_upstream_requests_in_flight", 1, upstream=upstream)
+    start = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        elapsed = time.perf_counter() - start
+        _gauge_add("stocks_upstream_requests_in_flight", -1, upstream=upstream)
+        observe("stocks_upstream_request_duration_seconds", elapsed, upstream=upstream, op=op, outcome=outcome)
+        per_request = _request_upstreams.get()
+        if per_request is not None:
+            totals = per_request.setdefault(upstream, [0, 0.0])
+            totals[0] += 1
+            totals[1] += elapsed
+
+
+def _timed_call(name: str, start: float, outcome: str) -> None:
+    observe("stocks_call_duration_seconds", time.perf_counter() - start, call=name, outcome=outcome)
+
+
+def timed(name: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """Decorator: record a function's latency as stocks_call_duration_seconds{call=name} (sync or async)."""
+
+    def decorator(fn: Callable[..., Any]) -> Callable[..., Any]:
+        if inspect.iscoroutinefunction(fn):
+
+            @functools.wraps(fn)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                start = time.perf_counter()
+                try:
+                    result = await fn(*args, **kwargs)
+                except BaseException:
+                    _timed_call(name, start, "error")
+                    raise
+                _timed_call(name, start, "ok")
+                return result
+
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            start = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException:
+                _timed_call(name, start, "error")
+                raise
+            _timed_call(name, start, "ok")
+            return result
+
+        return wrapper
+
+    return decorator
+
+
+def current_request_id() -> Optional[str]:
+    return _request_id.get()
+
+
+# ---- ASGI middleware ----
+
+_VALID_REQUEST_ID = re.compile(r"^[A-Za-z0-9._\-]{1,64}$")
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware (safe for streaming/SSE responses): request id in and out
+    (X-Request-ID), per-route latency histogram, in-flight gauge, optional JSON log line.
+    Routes are labelled by their template (/stock/{query}), not the raw path.
+    """
+
+    def __init__(self, app: Any):
+        self.app = app
+
+    async def __call__(self, scope: Dict[str, Any], receive: Callable, send: Callable) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        incoming = dict(scope.get("headers") or []).get(REQUEST_ID_HEADER.lower().encode())
+        request_id = incoming.decode("latin-1") if incoming else ""
+        if not _VALID_REQUEST_ID.match(request_id):
+            request_id = uuid.uuid4().hex[:16]
+        id_token = _request_id.set(request_id)
+        upstreams: Dict[str, List[float]] = {}
+        up_token = _request_upstreams.set(upstreams)
+
+        start = time.perf_counter()
+        status = {"code": 500}
+        method = scope.get("method", "GET")
+        # The route template isn't known until routing has run, so in-flight is per method only
+        _gauge_add("stocks_http_requests_in_flight", 1, method=method)
+
+        async def send_wrapper(message: Dict[str, Any]) -> None:
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+                headers = list(message.get("headers") or [])
+                headers.append((REQUEST_ID_HEADER.lower().encode(), request_id.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            _gauge_add("stocks_http_requests_in_flight", -1, method=method)
+            route = getattr(scope.get("route"), "path", None) or "unmatched"
+            observe("stocks_http_request_duration_seconds", elapsed, route=route, method=method, status=str(status["code"]))
+            if REQUEST_LOG_ENABLED:
+                _log.info(
+                    json.dumps(
+                        {
+                            "request_id": request_id,
+                            "method": method,
+                            "route": route,
+                            "path": scope.get("path"),
+                            "status": status["code"],
+                            "duration_ms": round(elapsed * 1000.0, 1),
+                            "upstreams": {
+                                name: {"calls": int(calls), "ms": round(secs * 1000.0, 1)}
+                                for name, (calls, secs) in upstreams.items()
+                            },
+                        }
+                    )
+                )
+            _request_upstreams.reset(up_token)
+            _request_id.reset(id_token)
+
+
+# ---- Prometheus text exposition ----
+
+def _fmt_labels(key: Tuple[Tuple[str, str], ...], extra: Optional[Tuple[str, str]] = None) -> str:
+    items = list(key) + ([extra] if extra else [])
+    if not items:
+        return ""
+    escaped = (v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in items)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(items, escaped)) + "}"
+
+
+def _fmt_value(v: float) -> str:
+    return str(int(v)) if float(v).is_integer() else repr(float(v))
+
+
+def render(cache_counts: Optional[Dict[str, Tuple[float, float]]] = None) -> str:
+    """All metrics in Prometheus text format. cache_counts: cache name -> (hits, misses)."""
+    lines: List[str] = []
+    with _lock:
+        for name in sorted(_histograms):
+            lines.append(f"# HELP {name} {_HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} histogram")
+            for key, values in sorted(_histograms[name].items()):
+                for bound, count in zip(LATENCY_BUCKETS, values):
+                    lines.append(f"{name}_bucket{_fmt_labels(key, ('le', repr(bound)))} {_fmt_value(count)}")
+                lines.append(f"{name}_bucket{_fmt_labels(key, ('le', '+Inf'))} {_fmt_value(values[-2])}")
+                lines.append(f"{name}_sum{_fmt_labels(key)} {values[-1]:.6f}")
+                lines.append(f"{name}_count{_fmt_labels(key)} {_fmt_value(values[-2])}")
+        for name in sorted(_gauges):
+            lines.append(f"# HELP {name} {_HELP.get(name, name)}")
+            lines.append(f"# TYPE {name} gauge")
+            for key, value in sorted(_gauges[name].items()):
+                lines.append(f"{name}{_fmt_labels(key)} {_fmt_value(value)}")
+
+    if cache_counts:
+        rows = sorted(cache_counts.items())
+        for name, kind, pick in (
+            ("stocks_cache_hits_total", "counter", lambda h, m: h),
+            ("stocks_cache_misses_total", "counter", lambda h, m: m),
+            ("stocks_cache_hit_ratio", "gauge", lambda h, m: round(h / (h + m), 4) if h + m else 0.0),
+        ):
+            lines.append(f"# HELP {name} {_HELP[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+            for cache, (hits, misses) in rows:
+                lines.append(f"{name}{_fmt_labels((('cache', cache),))} {_fmt_value(pick(hits, misses))}")
+    return "\n".join(lines) + "\n"
@@ -19,3 +19,5 @@ class ChatMessage(BaseModel):
 
 class CompareRequest(BaseModel):
     symbols: List[str]
+    period: str = "1y"
+    benchmark: Optional[str] = None  # defaults to COMPARE_BENCHMARK (SPY)
@@ -1,22 +1,57 @@
 # backend/news.py
 from __future__ import annotations
 
+import asyncio
 import os
+import threading
 import time
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Set
 
-import requests
-import yfinance as yf
+from .http_client import get_json_async, record_upstream_result
+from .metrics import timed, track_upstream
+from .replay import ticker
+from .ttl_cache import TTLCache, shared_backing
+from .store import DEFAULT_SYMBOLS, get_store
 
 
 # Alpha Vantage (free key)
 ALPHAVANTAGE_API_KEY = os.getenv("ALPHAVANTAGE_API_KEY")
 ALPHAVANTAGE_BASE = "https://www.alphavantage.co/query"
 
+# Cross-ticker ingest: one general-feed call per cycle serves every watchlist symbol
+NEWS_INGEST_ENABLED = os.getenv("NEWS_INGEST_ENABLED", "1") == "1"
+# Every 6h: 4 cycles x (1 feed + NEWS_INGEST_MAX_TICKER_CALLS) = 12 calls/day, about half the
+# free tier's ~25/day, leaving the rest for on-demand per-ticker lookups
+NEWS_INGEST_SECONDS = float(os.getenv("NEWS_INGEST_SECONDS", str(6 * 60 * 60)))
+NEWS_INGEST_FEED_LIMIT = 1000
+# Extra per-ticker calls per cycle for watchlist symbols the general feed missed
+NEWS_INGEST_MAX_TICKER_CALLS = int(os.getenv("NEWS_INGEST_MAX_TICKER_CALLS", "2"))
+NEWS_INDEX_MAX_AGE_HOURS = float(os.getenv("NEWS_INDEX_MAX_AGE_HOURS", "72"))
+
+# url -> article; ticker -> {url: relevance}; symbols the last ingest was run for
+_index_articles: Dict[str, Dict[str, Any]] = {}
+_index_by_ticker: Dict[str, Dict[str, float]] = {}
+_index_covered: Set[str] = set()
+_index_lock = threading.Lock()
+_index_updated_at = 0.0
+_ingest_stats: Dict[str, Any] = {"cycles": 0, "api_calls": 0, "served": 0, "last_cycle_at": None}
+
 # Cache news to avoid hitting limits
-_NEWS_CACHE: Dict[str, Dict[str, Any]] = {}
 NEWS_CACHE_TTL_SECONDS = 10 * 60  # 10 minutes
+NEWS_CACHE_MAX_ENTRIES = int(os.getenv("NEWS_CACHE_MAX_ENTRIES", "500"))
+NEWS_CACHE_MAX_BYTES = int(os.getenv("NEWS_CACHE_MAX_BYTES", str(8 * 1024 * 1024)))
+# Expired news is still served (and refreshed in the background) for this long
+NEWS_MAX_STALE_SECONDS = float(os.getenv("NEWS_MAX_STALE_SECONDS", "3600"))
+# "SYM:limit:min_relevance" -> list of articles
+_NEWS_CACHE = TTLCache(
+    "news",
+    default_ttl=NEWS_CACHE_TTL_SECONDS,
+    max_entries=NEWS_CACHE_MAX_ENTRIES,
+    max_bytes=NEWS_CACHE_MAX_BYTES,
+    backing=shared_backing(),
+    max_stale=NEWS_MAX_STALE_SECONDS,
+)
 
 
 def _parse_av_time(ts: Optional[str]) -> Optional[str]:
@@ -48,7 +83,8 @@ def _fallback_yfinance_news(symbol: str, limit: int) -> List[Dict[str, Any]]:
     """
     out: List[Dict[str, Any]] = []
     try:
-        items = yf.Ticker(symbol).news or []
+        with track_upstream("yfinance", "news"):
+            items = ticker(symbol).news or []
         for it in items[: max(0, limit)]:
             title = it.get("title")
             url = it.get("link")
@@ -79,41 +115,10 @@ def _fallback_yfinance_news(symbol: str, limit: int) -> List[Dict[str, Any]]:
     return out
 
 
-def get_company_news(
-    symbol: str,
-    limit: int = 8,
-    min_relevance: float = 0.15,
-) -> List[Dict[str, Any]]:
-    """
-    Returns news articles that are strongly related to a ticker.
-
-    How we keep it "actually related":
-      1) AlphaVantage filters by tickers={symbol}
-      2) We request sort=RELEVANCE
-      3) We ALSO filter each article by checking ticker_sentiment includes symbol
-         with relevance_score >= min_relevance
-    """
-    sym = (symbol or "").strip().upper()
-    if not sym:
-        return []
-
-    # Cache
-    now = time.time()
-    cache_key = f"{sym}:{limit}:{min_relevance}"
-    cached = _NEWS_CACHE.get(cache_key)
-    if cached and (now - cached["ts"] < NEWS_CACHE_TTL_SECONDS):
-        return cached["data"]
-
-    # If no key, fallback immediately
-    if not ALPHAVANTAGE_API_KEY:
-        data = _fallback_yfinance_news(sym, limit=limit)
-        _NEWS_CACHE[cache_key] = {"ts": now, "data": data}
-        return data
-
+def _news_params(sym: str, limit: int) -> Dict[str, Any]:
     # Pull more than needed, then filter down
     fetch_limit = min(50, max(20, limit * 5))
-
-    params = {
+    return {
         "function": "NEWS_SENTIMENT",
         "tickers": sym,            # important: only articles that mention the ticker
         "sort": "RELEVANCE",       # important: return most relevant first
@@ -121,66 +126,271 @@ def get_company_news(
         "apikey": ALPHAVANTAGE_API_KEY,
     }
 
-    try:
-        r = requests.get(ALPHAVANTAGE_BASE, params=params, timeout=12)
-        r.raise_for_status()
-        payload = r.json()
 
-        # AlphaVantage sometimes returns {"Information": "..."} on rate limit
-        if not isinstance(payload, dict) or "feed" not in payload:
-            data = _fallback_yfinance_news(sym, limit=limit)
-            _NEWS_CACHE[cache_key] = {"ts": now, "data": data}
-            return data
+def _filter_feed(payload: Any, sym: str, limit: int, min_relevance: float) -> Optional[List[Dict[str, Any]]]:
+    """
+    Turns a NEWS_SENTIMENT payload into our article list.
+    Returns None when the payload is unusable (rate limit / error) so callers can fall back.
+    """
+    # AlphaVantage sometimes returns {"Information": "..."} on rate limit
+    if not isinstance(payload, dict) or "feed" not in payload:
+        record_upstream_result("alphavantage", False)
+        return None
 
-        feed = payload.get("feed") or []
-        results: List[Dict[str, Any]] = []
+    feed = payload.get("feed") or []
+    results: List[Dict[str, Any]] = []
+
+    for item in feed:
+        title = item.get("title")
+        url = item.get("url")
+        source = item.get("source") or item.get("source_domain") or "Unknown"
+        published_at = _parse_av_time(item.get("time_published"))
+        summary = item.get("summary")
+
+        # ✅ Hard relevance check: article must explicitly include our ticker in ticker_sentiment
+        best_rel = 0.0
+        ts_list = item.get("ticker_sentiment") or []
+        for ts in ts_list:
+            if (ts.get("ticker") or "").upper() == sym:
+                best_rel = max(best_rel, _safe_float(ts.get("relevance_score"), 0.0))
+
+        if best_rel < float(min_relevance):
+            continue
+
+        if title and url:
+            results.append(
+                {
+                    "title": title,
+                    "url": url,
+                    "source": source,
+                    "published_at": published_at,
+                    "summary": summary,
+                    "relevance": round(best_rel, 3),
+                }
+            )
+
+    results.sort(key=_sort_key, reverse=True)
+    return results[: max(0, limit)]
+
+
+# Sort by relevance then by published time (best effort)
+def _sort_key(a: Dict[str, Any]):
+    rel = a.get("relevance") or 0.0
+    ts = a.get("published_at") or ""
+    return (rel, ts)
+
+
+# ---- cross-ticker feed index ----
+#
+# One NEWS_SENTIMENT call returns articles tagged with many tickers (ticker_sentiment).
+# The ingest job pulls the general feed once per cycle and indexes every article under
+# every ticker it mentions, so per-symbol lookups for the watchlist cost no API calls.
+# (Passing several symbols in tickers= would only return articles mentioning ALL of them.)
+
+def _index_payload(payload: Any) -> Optional[int]:
+    """Adds a NEWS_SENTIMENT payload to the index; returns #articles, or None if the payload is unusable."""
+    if not isinstance(payload, dict) or "feed" not in payload:
+        record_upstream_result("alphavantage", False)
+        return None
 
-        for item in feed:
+    added = 0
+    with _index_lock:
+        for item in payload.get("feed") or []:
             title = item.get("title")
             url = item.get("url")
-            source = item.get("source") or item.get("source_domain") or "Unknown"
-            published_at = _parse_av_time(item.get("time_published"))
-            summary = item.get("summary")
-
-            # ✅ Hard relevance check: article must explicitly include our ticker in ticker_sentiment
-            best_rel = 0.0
-            ts_list = item.get("ticker_sentiment") or []
-            for ts in ts_list:
-                if (ts.get("ticker") or "").upper() == sym:
-                    best_rel = max(best_rel, _safe_float(ts.get("relevance_score"), 0.0))
-
-            if best_rel < float(min_relevance):
+            if not title or not url:
                 continue
+            _index_articles[url] = {
+                "title": title,
+                "url": url,
+                "source": item.get("source") or item.get("source_domain") or "Unknown",
+                "published_at": _parse_av_time(item.get("time_published")),
+                "summary": item.get("summary"),
+            }
+            added += 1
+            for ts in item.get("ticker_sentiment") or []:
+                ticker = (ts.get("ticker") or "").upper()
+                if not ticker:
+                    continue
+                postings = _index_by_ticker.setdefault(ticker, {})
+                postings[url] = max(postings.get(url, 0.0), _safe_float(ts.get("relevance_score"), 0.0))
+    return added
+
+
+def _prune_index(now: float) -> None:
+    cutoff = datetime.fromtimestamp(now - NEWS_INDEX_MAX_AGE_HOURS * 3600).strftime("%Y-%m-%d %H:%M")
+    with _index_lock:
+        old = {u for u, a in _index_articles.items() if (a.get("published_at") or "") < cutoff}
+        for u in old:
+            _index_articles.pop(u, None)
+        for ticker in list(_index_by_ticker):
+            postings = _index_by_ticker[ticker]
+            for u in old & postings.keys():
+                postings.pop(u, None)
+            if not postings:
+                _index_by_ticker.pop(ticker, None)
+
+
+def _from_index(sym: str, limit: int, min_relevance: float) -> Optional[List[Dict[str, Any]]]:
+    """
+    Articles for sym from the ingested feed. None means "ask Alpha Vantage directly":
+    the index is stale, or sym wasn't part of the last ingest and has no articles.
+    """
+    if time.time() - _index_updated_at > 2 * NEWS_INGEST_SECONDS:
+        return None
+    with _index_lock:
+        postings = _index_by_ticker.get(sym) or {}
+        results = [
+            dict(_index_articles[u], relevance=round(rel, 3))
+            for u, rel in postings.items()
+            if rel >= float(min_relevance) and u in _index_articles
+        ]
+        covered = sym in _index_covered
+    if not results and not covered:
+        return None
+    _ingest_stats["served"] += 1
+    results.sort(key=_sort_key, reverse=True)
+    return results[: max(0, limit)]
 
-            if title and url:
-                results.append(
-                    {
-                        "title": title,
-                        "url": url,
-                        "source": source,
-                        "published_at": published_at,
-                        "summary": summary,
-                        "relevance": round(best_rel, 3),
-                    }
-                )
 
-        # Sort by relevance then by published time (best effort)
-        def sort_key(a: Dict[str, Any]):
-            rel = a.get("relevance") or 0.0
-            ts = a.get("published_at") or ""
-            return (rel, ts)
+def _has_articles(sym: str) -> bool:
+    with _index_lock:
+        return bool(_index_by_ticker.get(sym.upper()))
+
 
-        results.sort(key=sort_key, reverse=True)
-        results = results[: max(0, limit)]
+def _feed_params() -> Dict[str, Any]:
+    return {
+        "function": "NEWS_SENTIMENT",
+        "sort": "LATEST",
+        "limit": NEWS_INGEST_FEED_LIMIT,
+        "apikey": ALPHAVANTAGE_API_KEY,
+    }
 
-        # If we filtered too hard and got nothing, relax to fallback
-        if not results:
-            results = _fallback_yfinance_news(sym, limit=limit)
 
-        _NEWS_CACHE[cache_key] = {"ts": now, "data": results}
-        return results
+async def ingest_news_once(symbols: List[str]) -> Dict[str, Any]:
+    """
+    One ingest cycle: the general feed (1 call), then a few per-ticker calls for
+    watchlist symbols the feed didn't cover.
+    """
+    global _index_updated_at
+    now = time.time()
+    calls = 0
+    ok = False
 
+    try:
+        payload = await get_json_async("alphavantage", ALPHAVANTAGE_BASE, params=_feed_params(), timeout=20)
+        calls += 1
+        ok = _index_payload(payload) is not None
     except Exception:
-        data = _fallback_yfinance_news(sym, limit=limit)
-        _NEWS_CACHE[cache_key] = {"ts": now, "data": data}
-        return data
+        pass
+
+    missing = [s for s in symbols if not _has_articles(s)]
+    asked: Set[str] = set()
+    for sym in missing[:NEWS_INGEST_MAX_TICKER_CALLS]:
+        try:
+            payload = await get_json_async("alphavantage", ALPHAVANTAGE_BASE, params=_news_params(sym, 8), timeout=12)
+            calls += 1
+            if _index_payload(payload) is not None:
+                asked.add(sym)
+                ok = True
+        except Exception:
+            pass
+
+    _prune_index(now)
+    if ok:
+        with _index_lock:
+            _index_covered.clear()
+            # Only symbols we actually have an answer for: the rest still go to Alpha Vantage on demand
+            _index_covered.update(s for s in symbols if s in asked or _index_by_ticker.get(s.upper()))
+        _index_updated_at = now
+
+    _ingest_stats["cycles"] += 1
+    _ingest_stats["api_calls"] += calls
+    _ingest_stats["last_cycle_at"] = now
+    return {"api_calls": calls, "ok": ok, "symbols": len(symbols)}
+
+
+async def run_news_ingest() -> None:
+    """Background loop started from the app lifespan (only with an Alpha Vantage key)."""
+    while True:
+        try:
+            symbols = await asyncio.to_thread(get_store().all_watchlist_symbols)
+            await ingest_news_once(symbols or list(DEFAULT_SYMBOLS))
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            pass  # a bad cycle shouldn't kill the job
+        await asyncio.sleep(NEWS_INGEST_SECONDS)
+
+
+def news_index_stats() -> Dict[str, Any]:
+    with _index_lock:
+        return {
+            **_ingest_stats,
+            "enabled": NEWS_INGEST_ENABLED and bool(ALPHAVANTAGE_API_KEY),
+            "articles": len(_index_articles),
+            "tickers": len(_index_by_ticker),
+            "covered": len(_index_covered),
+            "updated_at": _index_updated_at or None,
+        }
+
+
+async def _fetch_news_async(
+    sym: str,
+    limit: int,
+    min_relevance: float,
+    cache_key: str,
+    keep_stale: bool = False,
+) -> List[Dict[str, Any]]:
+    results = _from_index(sym, limit, min_relevance)
+    if results is None and ALPHAVANTAGE_API_KEY:
+        try:
+            payload = await get_json_async(
+                "alphavantage", ALPHAVANTAGE_BASE, params=_news_params(sym, limit), timeout=12
+            )
+            results = _filter_feed(payload, sym, limit, min_relevance)
+        except Exception:
+            results = None
+
+    if not results:
+        results = await asyncio.to_thread(_fallback_yfinance_news, sym, limit)
+    if not results and keep_stale:
+        raise RuntimeError("news refresh came back empty")  # keep serving the stale articles
+
+    _NEWS_CACHE.set(cache_key, results)
+    return results
+
+
+@timed("get_company_news")
+async def get_company_news_async(
+    symbol: str,
+    limit: int = 8,
+    min_relevance: float = 0.15,
+    meta: Optional[Dict[str, Any]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    News articles strongly related to a ticker: Alpha Vantage filtered by tickers={symbol},
+    sorted by relevance, and each article's ticker_sentiment must list symbol with
+    relevance_score >= min_relevance (yfinance news when that leaves nothing).
+
+    Alpha Vantage goes through the pooled httpx client and the yfinance fallback runs
+    in a worker thread. Expired entries (within NEWS_MAX_STALE_SECONDS) are returned immediately and
+    refreshed in the background; meta["stale"] says which one the caller got.
+    """
+    sym = (symbol or "").strip().upper()
+    if not sym:
+        return []
+
+    cache_key = f"{sym}:{limit}:{min_relevance}"
+    hit = _NEWS_CACHE.get_stale(cache_key)
+    if hit is not None:
+        cached, stale = hit
+        if stale:
+            _NEWS_CACHE.refresh_in_background(
+                cache_key, lambda: _fetch_news_async(sym, limit, min_relevance, cache_key, keep_stale=True)
+            )
+        if meta is not None:
+            meta["stale"] = stale
+        return cached
+
+    return await _fetch_news_async(sym, limit, min_relevance, cache_key)
@@ -0,0 +1,208 @@
+# backend/quote_cache.py
+from __future__ import annotations
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, TypeVar
+
+from .metrics import track_upstream
+from .replay import ticker
+
+
+# Price-like fields go stale in seconds, fundamentals (name, P/E, market cap...) in hours.
+PRICE_TTL_SECONDS = float(os.getenv("QUOTE_PRICE_TTL_SECONDS", "15"))
+FUNDAMENTALS_TTL_SECONDS = float(os.getenv("QUOTE_FUNDAMENTALS_TTL_SECONDS", str(6 * 60 * 60)))
+QUOTE_CACHE_MAX_ENTRIES = int(os.getenv("QUOTE_CACHE_MAX_ENTRIES", "512"))
+# Upper bound on simultaneous upstream quote fetches for bulk lookups
+QUOTE_FETCH_WORKERS = int(os.getenv("QUOTE_FETCH_WORKERS", "8"))
+
+# info key -> yfinance fast_info key (cheap price-only refresh)
+PRICE_FIELDS = {
+    "currentPrice": "last_price",
+    "regularMarketPrice": "last_price",
+    "previousClose": "previous_close",
+    "dayHigh": "day_high",
+    "dayLow": "day_low",
+    "volume": "last_volume",
+}
+
+# symbol -> {"info": dict, "price_ts": float, "fund_ts": float}
+_CACHE: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+# symbol -> {"event": threading.Event, "info": dict | None, "error": Exception | None}
+_IN_FLIGHT: Dict[str, Dict[str, Any]] = {}
+_LOCK = threading.Lock()
+_POOL = ThreadPoolExecutor(max_workers=QUOTE_FETCH_WORKERS, thread_name_prefix="quotes")
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+_STATS = {
+    "hits": 0,
+    "misses": 0,
+    "price_refreshes": 0,
+    "coalesced": 0,
+    "evictions": 0,
+    "errors": 0,
+}
+
+
+def _has_price(info: Dict[str, Any]) -> bool:
+    return bool(info) and (info.get("currentPrice") is not None or info.get("regularMarketPrice") is not None)
+
+
+def _fetch_full(symbol: str) -> Dict[str, Any]:
+    with track_upstream("yfinance", "info"):
+        return ticker(symbol).info or {}
+
+
+def _fetch_price(symbol: str, info: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Refresh only the price fields on top of cached fundamentals.
+    Falls back to a full .info fetch if fast_info is unavailable.
+    """
+    try:
+        with track_upstream("yfinance", "fast_info"):
+            fast = ticker(symbol).fast_info
+            fresh = dict(info)
+            for info_key, fast_key in PRICE_FIELDS.items():
+                val = fast.get(fast_key)
+                if val is not None:
+                    fresh[info_key] = val
+        return fresh
+    except Exception:
+        return _fetch_full(symbol)
+
+
+def _store(symbol: str, info: Dict[str, Any], now: float, full: bool) -> None:
+    entry = _CACHE.get(symbol)
+    fund_ts = now if full or entry is None else entry["fund_ts"]
+    _CACHE[symbol] = {"info": info, "price_ts": now, "fund_ts": fund_ts}
+    _CACHE.move_to_end(symbol)
+
+    while len(_CACHE) > QUOTE_CACHE_MAX_ENTRIES:
+        _CACHE.popitem(last=False)
+        _STATS["evictions"] += 1
+
+
+def get_info(symbol: str) -> Dict[str, Any]:
+    """
+    Cached replacement for yf.Ticker(symbol).info.
+
+    - fresh entry: returned without touching Yahoo
+    - stale price, fresh fundamentals: cheap fast_info refresh merged into the cached info
+    - stale fundamentals / unknown symbol: full .info fetch
+    Concurrent callers for the same symbol share one upstream fetch.
+    """
+    sym = (symbol or "").strip().upper()
+    if not sym:
+        return {}
+
+    with _LOCK:
+        now = time.time()
+        entry = _CACHE.get(sym)
+        if entry is not None:
+            price_fresh = now - entry["price_ts"] < PRICE_TTL_SECONDS
+            fund_fresh = now - entry["fund_ts"] < FUNDAMENTALS_TTL_SECONDS
+            if price_fresh and fund_fresh:
+                _CACHE.move_to_end(sym)
+                _STATS["hits"] += 1
+                return entry["info"]
+
+        flight = _IN_FLIGHT.get(sym)
+        if flight is not None:
+            _STATS["coalesced"] += 1
+            leader = False
+        else:
+            flight = {"event": threading.Event(), "info": None, "error": None}
+            _IN_FLIGHT[sym] = flight
+            leader = True
+
+            price_only = entry is not None and fund_fresh and _has_price(entry["info"])
+            cached_info = entry["info"] if price_only else None
+            if price_only:
+                _STATS["price_refreshes"] += 1
+            else:
+                _STATS["misses"] += 1
+
+    if not leader:
+        flight["event"].wait()
+        if flight["error"] is not None:
+            raise flight["error"]
+        return flight["info"]
+
+    try:
+        if cached_info is not None:
+            info = _fetch_price(sym, cached_info)
+        else:
+            info = _fetch_full(sym)
+        with _LOCK:
+            _store(sym, info, time.time(), full=cached_info is None)
+        flight["info"] = info
+        return info
+    except Exception as e:
+        with _LOCK:
+            _STATS["errors"] += 1
+        flight["error"] = e
+        raise
+    finally:
+        with _LOCK:
+            _IN_FLIGHT.pop(sym, None)
+        flight["event"].set()
+
+
+def fan_out(fn: Callable[[T], R], items: Iterable[T]) -> List[R]:
+    """Run fn over items on the bounded quote pool; results keep input order."""
+    return list(_POOL.map(fn, items))
+
+
+def _info_or_none(symbol: str) -> Optional[Dict[str, Any]]:
+    try:
+        return get_info(symbol)
+    except Exception:
+        return None
+
+
+def get_quotes(symbols: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+    """
+    Bulk version of get_info: one call, N symbols -> {symbol: info}.
+    Cache hits return immediately; misses are fetched concurrently on a bounded pool,
+    so wall time is roughly one upstream round trip instead of N.
+    Symbols that fail to fetch are left out of the map.
+    """
+    syms: List[str] = []
+    for s in symbols:
+        sym = (s or "").strip().upper()
+        if sym and sym not in syms:
+            syms.append(sym)
+
+    out: Dict[str, Dict[str, Any]] = {}
+    for sym, info in zip(syms, fan_out(_info_or_none, syms)):
+        if info is not None:
+            out[sym] = info
+    return out
+
+
+def peek_info(symbol: str) -> Optional[Dict[str, Any]]:
+    """Cached info regardless of age (no upstream call), or None."""
+    with _LOCK:
+        entry = _CACHE.get((symbol or "").strip().upper())
+        return entry["info"] if entry else None
+
+
+def quote_cache_stats() -> Dict[str, Any]:
+    with _LOCK:
+        lookups = _STATS["hits"] + _STATS["misses"] + _STATS["price_refreshes"]
+        return {
+            **_STATS,
+            "size": len(_CACHE),
+            "max_entries": QUOTE_CACHE_MAX_ENTRIES,
+            "hit_ratio": round(_STATS["hits"] / lookups, 3) if lookups else 0.0,
+        }
+
+
+def clear_quote_cache() -> None:
+    with _LOCK:
+        _CACHE.clear()
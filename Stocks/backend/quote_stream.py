@@ -0,0 +1,114 @@
+# backend/quote_stream.py
+from __future__ import annotations
+
+import asyncio
+import os
+from typing import Any, Dict, List, Optional, Set
+
+from .quote_cache import get_info
+from .stock_utils import looks_like_bad_info, safe_percent_change
+
+
+QUOTE_STREAM_POLL_SECONDS = float(os.getenv("QUOTE_STREAM_POLL_SECONDS", "10"))
+QUOTE_STREAM_MAX_SYMBOLS = int(os.getenv("QUOTE_STREAM_MAX_SYMBOLS", "25"))
+
+
+class Subscriber:
+    """
+    One streaming connection. Holds only the LATEST pending update per symbol,
+    so a slow client gets coalesced updates instead of an ever-growing backlog.
+    """
+
+    def __init__(self, symbols: List[str]):
+        self.symbols = symbols
+        self.pending: Dict[str, Dict[str, Any]] = {}
+        self.ready = asyncio.Event()
+        self.coalesced = 0
+
+    def push(self, update: Dict[str, Any]) -> None:
+        if update["symbol"] in self.pending:
+            self.coalesced += 1
+        self.pending[update["symbol"]] = update
+        self.ready.set()
+
+    async def next_batch(self, timeout: float) -> List[Dict[str, Any]]:
+        try:
+            await asyncio.wait_for(self.ready.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return []
+        self.ready.clear()
+        batch = list(self.pending.values())
+        self.pending.clear()
+        return batch
+
+
+# symbol -> subscribers / poller task / last pushed snapshot
+_subs: Dict[str, Set[Subscriber]] = {}
+_pollers: Dict[str, asyncio.Task] = {}
+_last: Dict[str, Dict[str, Any]] = {}
+
+_stats = {"polls": 0, "updates_pushed": 0, "connections": 0}
+
+
+def _snapshot(symbol: str, info: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    if not info or looks_like_bad_info(info):
+        return None
+    price = info.get("currentPrice", info.get("regularMarketPrice", None))
+    change = safe_percent_change(price, info.get("previousClose", None))
+    return {"symbol": symbol, "price": price, "change_percent": round(change, 2)}
+
+
+async def _poll(symbol: str) -> None:
+    """Single shared poller per symbol; pushes only when the quote changed."""
+    while _subs.get(symbol):
+        try:
+            info = await asyncio.to_thread(get_info, symbol)
+            _stats["polls"] += 1
+            snap = _snapshot(symbol, info)
+            if snap is not None and snap != _last.get(symbol):
+                _last[symbol] = snap
+                for sub in list(_subs.get(symbol, ())):
+                    sub.push(snap)
+                    _stats["updates_pushed"] += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            pass
+        await asyncio.sleep(QUOTE_STREAM_POLL_SECONDS)
+
+
+def subscribe(symbols: List[str]) -> Subscriber:
+    sub = Subscriber(symbols)
+    _stats["connections"] += 1
+    for sym in symbols:
+        _subs.setdefault(sym, set()).add(sub)
+        if sym in _last:
+            sub.push(_last[sym])  # late joiners get the current quote right away
+        task = _pollers.get(sym)
+        if task is None or task.done():
+            _pollers[sym] = asyncio.create_task(_poll(sym))
+    return sub
+
+
+def unsubscribe(sub: Subscriber) -> None:
+    _stats["connections"] -= 1
+    for sym in sub.symbols:
+        subs = _subs.get(sym)
+        if subs is None:
+            continue
+        subs.discard(sub)
+        if not subs:
+            _subs.pop(sym, None)
+            task = _pollers.pop(sym, None)
+            if task is not None:
+                task.cancel()
+            _last.pop(sym, None)  # nobody left to send it to; a new poller refetches anyway
+
+
+def quote_stream_stats() -> Dict[str, Any]:
+    return {
+        **_stats,
+        "symbols": len(_subs),
+        "pollers": len(_pollers),
+        "poll_seconds": QUOTE_STREAM_POLL_SECONDS,
+    }
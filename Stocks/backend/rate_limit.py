@@ -0,0 +1,165 @@
+# backend/rate_limit.py
+from __future__ import annotations
+
+import asyncio
+import bisect
+import itertools
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+
+# Priority classes: lower number = served first
+PRIORITY_INTERACTIVE = 0  # chat the user is waiting on
+PRIORITY_EXPLAIN = 1      # explanations on a page load
+PRIORITY_BACKGROUND = 2   # stale-while-revalidate refreshes, warmups
+
+# Longest single sleep while queued, so deadlines and newly freed capacity are noticed promptly
+_MAX_POLL_SECONDS = 0.25
+
+
+class RateLimited(Exception):
+    """The request could not get capacity before its deadline."""
+
+
+class TokenBucketLimiter:
+    """
+    Two token buckets (requests per minute, tokens per minute) refilled continuously,
+    with a priority queue in front of them. A caller queues behind everything of the
+    same or higher priority; if the estimated wait would pass its deadline it gives up
+    straight away (RateLimited) so it can answer with fallback text instead.
+    Usable from threads (acquire) and the event loop (acquire_async).
+    """
+
+    def __init__(self, name: str, rpm: int, tpm: int):
+        self.name = name
+        self.rpm = max(1, rpm)
+        self.tpm = max(1, tpm)
+        self._requests = float(self.rpm)
+        self._tokens = float(self.tpm)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+        # Sorted waiters: (priority, seq, token_cost)
+        self._waiting: List[Tuple[int, int, int]] = []
+        self._stats = {"granted": 0, "queued": 0, "rejected": 0, "wait_ms_total": 0.0, "throttled": 0}
+
+    # ---- internals (caller holds _lock) ----
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        self._requests = min(float(self.rpm), self._requests + elapsed * self.rpm / 60.0)
+        self._tokens = min(float(self.tpm), self._tokens + elapsed * self.tpm / 60.0)
+
+    def _estimated_wait(self, entry: Tuple[int, int, int]) -> float:
+        """Seconds until everything queued up to and including `entry` fits in both buckets."""
+        idx = bisect.bisect_right(self._waiting, entry)
+        ahead = self._waiting[:idx]
+        need_requests = len(ahead) - self._requests
+        need_tokens = sum(w[2] for w in ahead) - self._tokens
+        return max(0.0, need_requests * 60.0 / self.rpm, need_tokens * 60.0 / self.tpm)
+
+    def _try_take(self, entry: Tuple[int, int, int]) -> bool:
+        if self._waiting[0] != entry:
+            return False
+        if self._requests < 1.0 or self._tokens < entry[2]:
+            return False
+        self._requests -= 1.0
+        self._tokens -= entry[2]
+        self._waiting.pop(0)
+        return True
+
+    def _enter(self, priority: int, cost: int) -> Tuple[int, int, int]:
+        # A prompt bigger than the whole budget still gets through once the bucket is full
+        entry = (priority, next(self._seq), min(max(0, cost), self.tpm))
+        bisect.insort(self._waiting, entry)
+        return entry
+
+    def _step(self, entry: Tuple[int, int, int], deadline: float) -> float:
+        """One attempt: 0.0 = granted, >0 = sleep this long and retry. Raises RateLimited past the deadline."""
+        with self._lock:
+            self._refill()
+            if self._try_take(entry):
+                return 0.0
+            wait = self._estimated_wait(entry)
+            if time.monotonic() + wait > deadline:
+                self._waiting.remove(entry)
+                self._stats["rejected"] += 1
+                raise RateLimited(f"{self.name}: no capacity within deadline (needs ~{wait:.1f}s)")
+            return min(max(wait, 0.01), _MAX_POLL_SECONDS)
+
+    def _granted(self, started: float, queued: bool) -> None:
+        with self._lock:
+            self._stats["granted"] += 1
+            self._stats["queued"] += int(queued)
+            self._stats["wait_ms_total"] += (time.monotonic() - started) * 1000.0
+
+    # ---- public API ----
+
+    def acquire(self, cost: int, priority: int = PRIORITY_EXPLAIN, timeout: float = 10.0) -> None:
+        """Block the calling thread until one request + `cost` tokens are available (or raise RateLimited)."""
+        started = time.monotonic()
+        deadline = started + timeout
+        with self._lock:
+            entry = self._enter(priority, cost)
+        queued = False
+        while True:
+            delay = self._step(entry, deadline)
+            if not delay:
+                self._granted(started, queued)
+                return
+            queued = True
+            time.sleep(delay)
+
+    async def acquire_async(self, cost: int, priority: int = PRIORITY_EXPLAIN, timeout: float = 10.0) -> None:
+        """Awaitable acquire for async routes."""
+        started = time.monotonic()
+        deadline = started + timeout
+        with self._lock:
+            entry = self._enter(priority, cost)
+        queued = False
+        try:
+            while True:
+                delay = self._step(entry, deadline)
+                if not delay:
+                    self._granted(started, queued)
+                    return
+                queued = True
+                await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            with self._lock:
+                if entry in self._waiting:
+                    self._waiting.remove(entry)
+            raise
+
+    def settle(self, estimated: int, actual: Optional[int]) -> None:
+        """Correct the token bucket once the real usage is known (may go negative)."""
+        if actual is None:
+            return
+        with self._lock:
+            self._refill()
+            self._tokens -= actual - estimated
+
+    def throttle(self) -> None:
+        """Upstream said we're over quota anyway: empty both buckets so queued work waits."""
+        with self._lock:
+            self._refill()
+            self._requests = min(self._requests, 0.0)
+            self._tokens = min(self._tokens, 0.0)
+            self._stats["throttled"] += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._refill()
+            granted = self._stats["granted"]
+            return {
+                **{k: v for k, v in self._stats.items() if k != "wait_ms_total"},
+                "rpm": self.rpm,
+                "tpm": self.tpm,
+                "requests_available": round(self._requests, 2),
+                "tokens_available": int(self._tokens),
+                "waiting": len(self._waiting),
+                "avg_wait_ms": round(self._stats["wait_ms_total"] / granted, 1) if granted else None,
+            }
@@ -0,0 +1,580 @@
+# backend/replay.py
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from datetime import date, timedelta
+from typing import Any, AsyncIterator, Dict, List, Optional
+from urllib.parse import parse_qsl, urlsplit
+
+import httpx
+import numpy as np
+import pandas as pd
+import requests
+import yfinance as yf
+from requests.adapters import BaseAdapter, HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+
+# live:   talk to Yahoo / Alpha Vantage / Gemini as usual
+# record: same, and write every upstream response to REPLAY_DIR
+# replay: never touch the network; answer from REPLAY_DIR (synthetic data on a miss)
+UPSTREAM_MODE = os.getenv("UPSTREAM_MODE", "live").strip().lower()
+REPLAY_DIR = os.getenv("REPLAY_DIR", os.path.join(os.path.dirname(__file__), "data", "replay"))
+# Deterministic made-up quotes/history/answers for anything not recorded (replay mode only)
+REPLAY_SYNTHETIC = os.getenv("REPLAY_SYNTHETIC", "1").strip().lower() in ("1", "true", "yes")
+
+# Injected per call in replay mode. Either one number for every upstream or per-upstream
+# values, e.g. REPLAY_LATENCY_MS="yfinance=80,http=150,gemini=700" ("*" sets the default).
+REPLAY_LATENCY_MS = os.getenv("REPLAY_LATENCY_MS", "0")
+REPLAY_ERROR_RATE = os.getenv("REPLAY_ERROR_RATE", "0")
+
+# Query params never written to fixtures (and ignored when matching)
+_SECRET_PARAMS = {"apikey", "api_key", "key", "token"}
+# fast_info fields quote_cache reads
+_FAST_INFO_KEYS = ("last_price", "previous_close", "day_high", "day_low", "last_volume")
+
+_write_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "synthetic": 0, "recorded": 0, "injected_errors": 0}
+_stats_lock = threading.Lock()  # bumped from worker threads (yfinance calls run via to_thread)
+
+
+def _count(name: str) -> None:
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def _per_upstream(raw: str) -> Dict[str, float]:
+    out = {"*": 0.0}
+    for part in raw.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        name, _, value = part.rpartition("=")
+        try:
+            out[name.strip() or "*"] = float(value)
+        except ValueError:
+            continue
+    return out
+
+
+_LATENCY_MS = _per_upstream(REPLAY_LATENCY_MS)
+_ERROR_RATE = _per_upstream(REPLAY_ERROR_RATE)
+
+
+def replaying() -> bool:
+    return UPSTREAM_MODE == "replay"
+
+
+def recording() -> bool:
+    return UPSTREAM_MODE == "record"
+
+
+# ---- fixture files: REPLAY_DIR/<kind>/<label>-<hash>.json ----
+
+def _fixture_path(kind: str, key: Any, label: str = "") -> str:
+    digest = hashlib.sha1(json.dumps(key, sort_keys=True, default=str).encode("utf-8")).hexdigest()[:16]
+    safe = "".join(c if c.isalnum() or c in "-_." else "_" for c in label)[:40]
+    return os.path.join(REPLAY_DIR, kind, f"{safe}-{digest}.json" if safe else f"{digest}.json")
+
+
+def _load(kind: str, key: Any, label: str = "") -> Optional[Any]:
+    try:
+        with open(_fixture_path(kind, key, label), encoding="utf-8") as f:
+            value = json.load(f)["response"]
+    except Exception:
+        _count("misses")
+        return None
+    _count("hits")
+    return value
+
+
+def _save(kind: str, key: Any, value: Any, label: str = "") -> None:
+    path = _fixture_path(kind, key, label)
+    try:
+        with _write_lock:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump({"key": key, "response": value}, f, default=str, indent=1)
+            os.replace(tmp, path)
+        _count("recorded")
+    except Exception:
+        pass  # recording must never break a live request
+
+
+# ---- injected latency / errors ----
+
+class InjectedError(Exception):
+    """Simulated upstream failure (REPLAY_ERROR_RATE)."""
+
+
+def _delay(upstream: str) -> float:
+    ms = _LATENCY_MS.get(upstream, _LATENCY_MS["*"])
+    # +-25% jitter so concurrent requests don't move in lockstep
+    return max(0.0, ms * random.uniform(0.75, 1.25) / 1000.0) if ms else 0.0
+
+
+def _should_fail(upstream: str) -> bool:
+    rate = _ERROR_RATE.get(upstream, _ERROR_RATE["*"])
+    if rate and random.random() < rate:
+        _count("injected_errors")
+        return True
+    return False
+
+
+def _inject(upstream: str) -> None:
+    delay = _delay(upstream)
+    if delay:
+        time.sleep(delay)
+    if _should_fail(upstream):
+        raise InjectedError(f"injected {upstream} failure")
+
+
+async def _inject_async(upstream: str) -> None:
+    delay = _delay(upstream)
+    if delay:
+        await asyncio.sleep(delay)
+    if _should_fail(upstream):
+        raise InjectedError(f"injected {upstream} failure")
+
+
+# ---- synthetic data (stable per symbol, so runs are comparable) ----
+
+def _rng(*parts: Any) -> np.random.Generator:
+    seed = int(hashlib.sha1("|".join(map(str, parts)).encode("utf-8")).hexdigest()[:8], 16)
+    return np.random.default_rng(seed)
+
+
+def _synthetic_history(symbol: str) -> pd.DataFrame:
+    end = date.today()
+    idx = pd.bdate_range(end - timedelta(days=5 * 365), end)
+    rng = _rng("history", symbol)
+    close = 20.0 + 180.0 * rng.random()
+    closes = close * np.exp(np.cumsum(rng.normal(0.0003, 0.018, len(idx))))
+    opens = closes * (1 + rng.normal(0, 0.004, len(idx)))
+    spread = np.abs(rng.normal(0, 0.01, len(idx))) * closes
+    return pd.DataFrame(
+        {
+            "Open": opens,
+            "High": np.maximum(opens, closes) + spread,
+            "Low": np.minimum(opens, closes) - spread,
+            "Close": closes,
+            "Volume": rng.integers(1_000_000, 50_000_000, len(idx)),
+        },
+        index=idx,
+    )
+
+
+def _synthetic_info(symbol: str) -> Dict[str, Any]:
+    hist = _synthetic_history(symbol)
+    rng = _rng("info", symbol)
+    last, prev = float(hist["Close"].iloc[-1]), float(hist["Close"].iloc[-2])
+    year = hist.iloc[-252:]
+    return {
+        "symbol": symbol,
+        "quoteType": "EQUITY",
+        "longName": f"{symbol} Holdings Inc.",
+        "shortName": symbol,
+        "currentPrice": round(last, 2),
+        "regularMarketPrice": round(last, 2),
+        "previousClose": round(prev, 2),
+        "dayHigh": round(float(hist["High"].iloc[-1]), 2),
+        "dayLow": round(float(hist["Low"].iloc[-1]), 2),
+        "volume": int(hist["Volume"].iloc[-1]),
+        "fiftyTwoWeekHigh": round(float(year["High"].max()), 2),
+        "fiftyTwoWeekLow": round(float(year["Low"].min()), 2),
+        "trailingPE": round(float(8 + 40 * rng.random()), 2),
+        "marketCap": int(last * rng.integers(100_000_000, 5_000_000_000)),
+        "currency": "USD",
+    }
+
+
+def _synthetic_news(symbol: str) -> List[Dict[str, Any]]:
+    now = int(time.time())
+    return [
+        {
+            "title": f"{symbol} shares in focus ({i + 1})",
+            "link": f"https://example.com/replay/{symbol.lower()}/{i + 1}",
+            "publisher": "Replay Wire",
+            "providerPublishTime": now - 3600 * (i + 1),
+        }
+        for i in range(5)
+    ]
+
+
+def _synthetic_answer(prompt: str) -> str:
+    topic = " ".join(prompt.split()[:12])
+    return f"(replay) Here is a short, beginner-friendly answer. {topic}..."
+
+
+# ---- yfinance ----
+
+def _frame_to_json(frame: pd.DataFrame) -> Dict[str, Any]:
+    frame = frame[[c for c in ("Open", "High", "Low", "Close", "Volume") if c in frame.columns]]
+    idx = frame.index.tz_localize(None) if getattr(frame.index, "tz", None) is not None else frame.index
+    return {
+        "index": [d.strftime("%Y-%m-%d") for d in idx],
+        "columns": list(frame.columns),
+        "data": frame.to_numpy().tolist(),
+    }
+
+
+def _frame_from_json(payload: Dict[str, Any]) -> pd.DataFrame:
+    return pd.DataFrame(payload["data"], index=pd.to_datetime(payload["index"]), columns=payload["columns"])
+
+
+def _slice_history(frame: pd.DataFrame, period: Optional[str], start: Optional[str]) -> pd.DataFrame:
+    if start:
+        return frame[frame.index >= pd.Timestamp(start)]
+    units = {"d": "days", "wk": "weeks", "mo": "months", "y": "years"}
+    for suffix, unit in units.items():
+        if period and period.endswith(suffix) and period[: -len(suffix)].isdigit():
+            cutoff = pd.Timestamp(date.today()) - pd.DateOffset(**{unit: int(period[: -len(suffix)])})
+            return frame[frame.index >= cutoff]
+    return frame  # "max" / None
+
+
+class ReplayTicker:
+    """Stands in for yf.Ticker: info / fast_info / history() / news from fixtures."""
+
+    def __init__(self, symbol: str):
+        self.ticker = symbol.upper()
+
+    def _info(self) -> Dict[str, Any]:
+        recorded = _load("yf_info", [self.ticker], self.ticker)
+        if recorded is not None:
+            return recorded
+        if not REPLAY_SYNTHETIC or not self.ticker.replace(".", "").replace("-", "").isalnum():
+            return {}
+        _count("synthetic")
+        return _synthetic_info(self.ticker)
+
+    @property
+    def info(self) -> Dict[str, Any]:
+        _inject("yfinance")
+        return self._info()
+
+    @property
+    def fast_info(self) -> Dict[str, Any]:
+        _inject("yfinance")
+        recorded = _load("yf_fast_info", [self.ticker], self.ticker)
+        if recorded is not None:
+            return recorded
+        info = self._info()
+        return {
+            "last_price": info.get("currentPrice"),
+            "previous_close": info.get("previousClose"),
+            "day_high": info.get("dayHigh"),
+            "day_low": info.get("dayLow"),
+            "last_volume": info.get("volume"),
+        }
+
+    def history(self, period: Optional[str] = None, start: Optional[str] = None, **_: Any) -> pd.DataFrame:
+        _inject("yfinance")
+        recorded = _load("yf_history", [self.ticker], self.ticker)
+        if recorded is not None:
+            frame = _frame_from_json(recorded)
+        elif REPLAY_SYNTHETIC:
+            _count("synthetic")
+            frame = _synthetic_history(self.ticker)
+        else:
+            return pd.DataFrame()
+        return _slice_history(frame, period, start)
+
+    @property
+    def news(self) -> List[Dict[str, Any]]:
+        _inject("yfinance")
+        recorded = _load("yf_news", [self.ticker], self.ticker)
+        if recorded is not None:
+            return recorded
+        return _synthetic_news(self.ticker) if REPLAY_SYNTHETIC else []
+
+
+class RecordingTicker:
+    """Wraps a real yf.Ticker and writes what it returns to REPLAY_DIR."""
+
+    def __init__(self, symbol: str):
+        self.ticker = symbol.upper()
+        self._real = yf.Ticker(symbol)
+
+    @property
+    def info(self) -> Dict[str, Any]:
+        info = self._real.info or {}
+        if info:
+            _save("yf_info", [self.ticker], info, self.ticker)
+        return info
+
+    @property
+    def fast_info(self) -> Any:
+        fast = self._real.fast_info
+        try:
+            _save("yf_fast_info", [self.ticker], {k: fast.get(k) for k in _FAST_INFO_KEYS}, self.ticker)
+        except Exception:
+            pass
+        return fast
+
+    def history(self, *args: Any, **kwargs: Any) -> pd.DataFrame:
+        frame = self._real.history(*args, **kwargs)
+        if frame is not None and not frame.empty:
+            # One fixture per symbol: merge, so incremental fetches extend the full recording
+            previous = _load("yf_history", [self.ticker], self.ticker)
+            merged = frame.copy()
+            if getattr(merged.index, "tz", None) is not None:
+                merged.index = merged.index.tz_localize(None)
+            if previous is not None:
+                merged = merged.combine_first(_frame_from_json(previous))
+            _save("yf_history", [self.ticker], _frame_to_json(merged.sort_index()), self.ticker)
+        return frame
+
+    @property
+    def news(self) -> List[Dict[str, Any]]:
+        items = self._real.news or []
+        _save("yf_news", [self.ticker], items, self.ticker)
+        return items
+
+
+def ticker(symbol: str) -> Any:
+    """yf.Ticker(symbol), or its recording / replaying stand-in depending on UPSTREAM_MODE."""
+    if replaying():
+        return ReplayTicker(symbol)
+    if recording():
+        return RecordingTicker(symbol)
+    return yf.Ticker(symbol)
+
+
+# ---- HTTP (yahoo_search, Alpha Vantage): transports under http_client's session / httpx client ----
+
+def _http_key(method: str, url: str) -> List[Any]:
+    parts = urlsplit(url)
+    params = sorted((k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True) if k.lower() not in _SECRET_PARAMS)
+    return [method.upper(), f"{parts.netloc}{parts.path}", params]
+
+
+def _http_label(url: str) -> str:
+    parts = urlsplit(url)
+    params = dict(parse_qsl(parts.query))
+    return "_".join(filter(None, [parts.netloc.split(".")[-2] if "." in parts.netloc else parts.netloc,
+                                  params.get("function"), params.get("tickers") or params.get("q")]))
+
+
+def _replayed_http(method: str, url: str) -> Dict[str, Any]:
+    """{"status", "headers", "body"} for a request in replay mode (404 when not recorded, 503 when injected)."""
+    if _should_fail("http"):
+        return {"status": 503, "headers": {"Content-Type": "application/json"}, "body": {"error": "injected"}}
+    recorded = _load("http", _http_key(method, url), _http_label(url))
+    if recorded is not None:
+        return recorded
+    return {"status": 404, "headers": {"Content-Type": "application/json"}, "body": {"error": "not recorded"}}
+
+
+def _recorded_http(method: str, url: str, status: int, headers: Any, content: bytes) -> None:
+    if status >= 500:
+        return
+    try:
+        body = json.loads(content or b"null")
+    except ValueError:
+        return
+    kept = {k: v for k, v in dict(headers).items() if k.lower() in ("content-type", "retry-after")}
+    _save("http", _http_key(method, url), {"status": status, "headers": kept, "body": body}, _http_label(url))
+
+
+class ReplayAdapter(BaseAdapter):
+    """requests adapter that answers from fixtures."""
+
+    def send(self, request: requests.PreparedRequest, **kwargs: Any) -> requests.Response:
+        delay = _delay("http")
+        if delay:
+            time.sleep(delay)
+        replayed = _replayed_http(request.method or "GET", request.url or "")
+        resp = requests.Response()
+        resp.status_code = replayed["status"]
+        resp.headers = CaseInsensitiveDict(replayed.get("headers") or {})
+        resp._content = json.dumps(replayed["body"]).encode("utf-8")
+        resp.encoding = "utf-8"
+        resp.url = request.url or ""
+        resp.request = request
+        return resp
+
+    def close(self) -> None:
+        pass
+
+
+class RecordingAdapter(HTTPAdapter):
+    """Normal pooled adapter that also writes JSON responses to fixtures."""
+
+    def send(self, request: requests.PreparedRequest, **kwargs: Any) -> requests.Response:
+        resp = super().send(request, **kwargs)
+        _recorded_http(request.method or "GET", request.url or "", resp.status_code, resp.headers, resp.content)
+        return resp
+
+
+class ReplayAsyncTransport(httpx.AsyncBaseTransport):
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        delay = _delay("http")
+        if delay:
+            await asyncio.sleep(delay)
+        replayed = _replayed_http(request.method, str(request.url))
+        return httpx.Response(
+            replayed["status"],
+            headers=replayed.get("headers") or {},
+            content=json.dumps(replayed["body"]).encode("utf-8"),
+            request=request,
+        )
+
+
+class RecordingAsyncTransport(httpx.AsyncBaseTransport):
+    def __init__(self, inner: httpx.AsyncBaseTransport):
+        self._inner = inner
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        resp = await self._inner.handle_async_request(request)
+        content = await resp.aread()
+        await resp.aclose()
+        _recorded_http(request.method, str(request.url), resp.status_code, resp.headers, content)
+        # Body is already decoded, so drop content-encoding / length
+        headers = {k: v for k, v in resp.headers.items() if k.lower() not in ("content-encoding", "content-length")}
+        return httpx.Response(resp.status_code, headers=headers, content=content, request=request)
+
+    async def aclose(self) -> None:
+        await self._inner.aclose()
+
+
+def http_adapter(pool_connections: int, pool_maxsize: int) -> BaseAdapter:
+    """Adapter for http_client's requests.Session."""
+    if replaying():
+        return ReplayAdapter()
+    if recording():
+        return RecordingAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+    return HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+
+
+def async_transport(limits: httpx.Limits) -> Optional[httpx.AsyncBaseTransport]:
+    """Transport for http_client's httpx.AsyncClient (None = httpx default)."""
+    if replaying():
+        return ReplayAsyncTransport()
+    if recording():
+        return RecordingAsyncTransport(httpx.AsyncHTTPTransport(limits=limits))
+    return None
+
+
+# ---- Gemini ----
+
+class _Usage:
+    def __init__(self, total: Optional[int]):
+        self.total_token_count = total
+
+
+class _Response:
+    def __init__(self, text: str, total_tokens: Optional[int] = None):
+        self.text = text
+        self.usage_metadata = _Usage(total_tokens)
+
+
+def _gemini_key(contents: Any, config: Any) -> List[Any]:
+    return [contents, config]
+
+
+def _replayed_answer(contents: Any, config: Any) -> Dict[str, Any]:
+    recorded = _load("gemini", _gemini_key(contents, config))
+    if recorded is not None:
+        return recorded
+    _count("synthetic")
+    wants_json = isinstance(config, dict) and config.get("response_mime_type") == "application/json"
+    return {"text": "{}" if wants_json else _synthetic_answer(str(contents)), "total_tokens": None}
+
+
+def _tokens(resp: Any) -> Optional[int]:
+    return getattr(getattr(resp, "usage_metadata", None), "total_token_count", None)
+
+
+class _ReplayModels:
+    def generate_content(self, model: str, contents: Any, config: Any = None) -> _Response:
+        _inject("gemini")
+        answer = _replayed_answer(contents, config)
+        return _Response(answer["text"], answer.get("total_tokens"))
+
+
+class _ReplayAsyncModels:
+    async def generate_content(self, model: str, contents: Any, config: Any = None) -> _Response:
+        await _inject_async("gemini")
+        answer = _replayed_answer(contents, config)
+        return _Response(answer["text"], answer.get("total_tokens"))
+
+    async def generate_content_stream(self, model: str, contents: Any, config: Any = None) -> AsyncIterator[_Response]:
+        await _inject_async("gemini")
+        recorded = _load("gemini_stream", _gemini_key(contents, config))
+        if recorded is None:
+            _count("synthetic")
+            words = _synthetic_answer(str(contents)).split(" ")
+            recorded = {"chunks": [" ".join(words[i : i + 4]) + " " for i in range(0, len(words), 4)]}
+
+        async def chunks() -> AsyncIterator[_Response]:
+            for text in recorded["chunks"]:
+                await asyncio.sleep(0)
+                yield _Response(text)
+
+        return chunks()
+
+
+class _Namespace:
+    def __init__(self, **attrs: Any):
+        self.__dict__.update(attrs)
+
+
+class _RecordingModels:
+    def __init__(self, real: Any):
+        self._real = real
+
+    def generate_content(self, model: str, contents: Any, config: Any = None) -> Any:
+        resp = self._real.generate_content(model=model, contents=contents, config=config)
+        _save("gemini", _gemini_key(contents, config), {"text": resp.text or "", "total_tokens": _tokens(resp)})
+        return resp
+
+
+class _RecordingAsyncModels:
+    def __init__(self, real: Any):
+        self._real = real
+
+    async def generate_content(self, model: str, contents: Any, config: Any = None) -> Any:
+        resp = await self._real.generate_content(model=model, contents=contents, config=config)
+        _save("gemini", _gemini_key(contents, config), {"text": resp.text or "", "total_tokens": _tokens(resp)})
+        return resp
+
+    async def generate_content_stream(self, model: str, contents: Any, config: Any = None) -> AsyncIterator[Any]:
+        stream = await self._real.generate_content_stream(model=model, contents=contents, config=config)
+
+        async def chunks() -> AsyncIterator[Any]:
+            seen: List[str] = []
+            async for chunk in stream:
+                seen.append(chunk.text or "")
+                yield chunk
+            _save("gemini_stream", _gemini_key(contents, config), {"chunks": [t for t in seen if t]})
+
+        return chunks()
+
+
+def gemini_client(real: Any) -> Any:
+    """The genai client ai.py should use: a replaying stand-in, a recording wrapper, or `real`."""
+    if replaying():
+        return _Namespace(models=_ReplayModels(), aio=_Namespace(models=_ReplayAsyncModels()))
+    if recording() and real is not None:
+        return _Namespace(models=_RecordingModels(real.models), aio=_Namespace(models=_RecordingAsyncModels(real.aio.models)))
+    return real
+
+
+def replay_stats() -> Dict[str, Any]:
+    with _stats_lock:
+        counts = dict(_stats)
+    return {
+        "mode": UPSTREAM_MODE,
+        "dir": REPLAY_DIR if UPSTREAM_MODE != "live" else None,
+        "latency_ms": _LATENCY_MS,
+        "error_rate": _ERROR_RATE,
+        **counts,
+    }
@@ -0,0 +1,17 @@
+# backend/sse.py
+import json
+from typing import Any, Optional
+
+# Sent periodically on idle streams so proxies don't close the connection
+SSE_HEARTBEAT = ": keep-alive\n\n"
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    "X-Accel-Buffering": "no",  # disable proxy buffering (nginx / Render)
+}
+
+
+def format_sse(data: Any, event: Optional[str] = None) -> str:
+    """One Server-Sent Events frame with a JSON payload."""
+    out = f"event: {event}\n" if event else ""
+    return out + f"data: {json.dumps(data, default=str)}\n\n"
@@ -1,9 +1,26 @@
-from typing import Any, Dict, Optional, Tuple
-import yfinance as yf
+import os
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
 
+from .metrics import timed
+from .quote_cache import fan_out, get_info
+from . import symbol_index
 from .yahoo import resolve_to_ticker
 
 
+# Memo of raw input -> resolved ticker for inputs that are NOT tickers themselves
+# ("apple" -> AAPL), plus negative entries for inputs that resolve to nothing.
+RESOLVE_MEMO_TTL_SECONDS = float(os.getenv("RESOLVE_MEMO_TTL_SECONDS", str(6 * 60 * 60)))
+RESOLVE_NEGATIVE_TTL_SECONDS = float(os.getenv("RESOLVE_NEGATIVE_TTL_SECONDS", "300"))
+RESOLVE_MEMO_MAX_ENTRIES = int(os.getenv("RESOLVE_MEMO_MAX_ENTRIES", "2048"))
+
+# RAW INPUT -> {"symbol": str | None, "ts": float, "saves": upstream calls a hit avoids}
+_resolve_memo: Dict[str, Dict[str, Any]] = {}
+_resolve_lock = threading.Lock()
+_resolve_stats = {"hits": 0, "negative_hits": 0, "misses": 0, "upstream_calls_saved": 0}
+
+
 def safe_percent_change(current_price: Any, previous_close: Any) -> float:
     try:
         if current_price is None or previous_close is None:
@@ -29,6 +46,44 @@ def looks_like_bad_info(info: Dict[str, Any]) -> bool:
     return False
 
 
+def _memo_get(key: str) -> Optional[Dict[str, Any]]:
+    with _resolve_lock:
+        entry = _resolve_memo.get(key)
+        if entry is None:
+            _resolve_stats["misses"] += 1
+            return None
+        ttl = RESOLVE_MEMO_TTL_SECONDS if entry["symbol"] else RESOLVE_NEGATIVE_TTL_SECONDS
+        if time.time() - entry["ts"] >= ttl:
+            _resolve_memo.pop(key, None)
+            _resolve_stats["misses"] += 1
+            return None
+        return entry
+
+
+def _memo_put(key: str, symbol: Optional[str], calls: int) -> None:
+    """calls: upstream calls (ticker fetches + searches) it took to resolve key this time."""
+    # A positive hit still fetches the resolved symbol's info, so that one isn't saved
+    saves = max(0, calls - (1 if symbol else 0))
+    with _resolve_lock:
+        _resolve_memo.pop(key, None)
+        _resolve_memo[key] = {"symbol": symbol, "ts": time.time(), "saves": saves}
+        # dicts keep insertion order: drop the oldest entries past the cap
+        while len(_resolve_memo) > RESOLVE_MEMO_MAX_ENTRIES:
+            _resolve_memo.pop(next(iter(_resolve_memo)))
+
+
+def _memo_saved(calls: int, negative: bool) -> None:
+    with _resolve_lock:
+        _resolve_stats["negative_hits" if negative else "hits"] += 1
+        _resolve_stats["upstream_calls_saved"] += calls
+
+
+def resolve_memo_stats() -> Dict[str, Any]:
+    with _resolve_lock:
+        return {**_resolve_stats, "size": len(_resolve_memo)}
+
+
+@timed("resolve_stock_query")
 def resolve_stock_query(raw: str) -> Tuple[Optional[str], Optional[str], Optional[Dict[str, Any]]]:
     """
     Returns: (symbol, resolved_from, info)
@@ -42,20 +97,57 @@ def resolve_stock_query(raw: str) -> Tuple[Optional[str], Optional[str], Optiona
 
     symbol = original.upper()
 
+    # Seen this input before and it wasn't a ticker: skip the doomed ticker fetch + search
+    memo = _memo_get(symbol)
+    if memo is not None:
+        if memo["symbol"] is None:
+            _memo_saved(memo["saves"], negative=True)
+            return None, None, None
+        info = get_info(memo["symbol"])
+        if not looks_like_bad_info(info):
+            _memo_saved(memo["saves"], negative=False)
+            return memo["symbol"], symbol, info
+
+    known = symbol_index.is_known_symbol(symbol)
+    calls = 0
+
+    # 0) Known company name that isn't itself a ticker ("apple"): skip the doomed ticker fetch
+    if not known:
+        named = symbol_index.lookup_name(original)
+        if named:
+            info = get_info(named)
+            if not looks_like_bad_info(info):
+                _memo_put(symbol, named, calls=1)
+                return named, symbol, info
+
     # 1) Try as ticker
-    stock = yf.Ticker(symbol)
-    info = stock.info
+    info = get_info(symbol)
+    calls += 1
     if not looks_like_bad_info(info):
         return symbol, None, info
 
     # 2) Try resolving from company name / wrong symbol
-    resolved = resolve_to_ticker(original)
+    resolved, searched = resolve_to_ticker(original)
+    calls += 1 if searched else 0
     if not resolved:
+        # Only a real "no match" from Yahoo is remembered; a failed search, an empty
+        # info blip or a known ticker may well resolve on the next try
+        if searched and not known:
+            _memo_put(symbol, None, calls)
         return None, None, None
 
-    stock = yf.Ticker(resolved)
-    info = stock.info
+    info = get_info(resolved)
+    calls += 1
     if looks_like_bad_info(info):
         return None, None, None
 
-    return resolved, original.upper(), info
+    _memo_put(symbol, resolved, calls)
+    return resolved, symbol, info
+
+
+def resolve_stock_queries(raws: List[str]) -> List[Tuple[Optional[str], Optional[str], Optional[Dict[str, Any]]]]:
+    """
+    Bulk resolve_stock_query: all inputs are resolved concurrently on the
+    bounded quote pool. Results are in the same order as the inputs.
+    """
+    return fan_out(resolve_stock_query, list(raws))
@@ -1,10 +1,310 @@
-from typing import Any, Dict, List, Set
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Set
 
-# Simple in-memory storage (demo-friendly)
-user_watchlist: Set[str] = set()
-user_alerts: List[Dict[str, Any]] = []
+# Which backend to use: "sqlite" (durable, shared across workers) or "memory" (tests / demos)
+STORE_BACKEND = os.getenv("STOCKS_STORE", "sqlite").strip().lower()
+STORE_DB_PATH = os.getenv("STOCKS_DB_PATH", "stocks.db")
 
+DEFAULT_USER = "default"
+# Demo defaults if a user's watchlist is empty
+DEFAULT_SYMBOLS = ["AAPL", "TSLA", "MSFT", "GOOGL"]
 
-def get_watchlist_symbols() -> List[str]:
+_ALERT_FIELDS = ("id", "symbol", "target_price", "direction", "created_at", "resolved_from", "triggered_at")
+
+
+class Store(ABC):
+    """
+    Watchlist + alert storage, scoped per user.
+    alerts_version() changes whenever any alert changes, so the background
+    alert engine only rebuilds its index when needed.
+    """
+
+    @abstractmethod
+    def watchlist(self, user: str) -> List[str]:
+        ...
+
+    @abstractmethod
+    def has_symbol(self, user: str, symbol: str) -> bool:
+        ...
+
+    @abstractmethod
+    def add_symbol(self, user: str, symbol: str) -> int:
+        """Adds symbol; returns the new watchlist size."""
+        ...
+
+    @abstractmethod
+    def remove_symbol(self, user: str, symbol: str) -> int:
+        """Removes symbol and its alerts; returns the new watchlist size."""
+        ...
+
+    @abstractmethod
+    def all_watchlist_symbols(self) -> List[str]:
+        """Union of every user's watchlist."""
+        ...
+
+    @abstractmethod
+    def alerts(self, user: str, symbol: Optional[str] = None) -> List[Dict[str, Any]]:
+        ...
+
+    def alerts_by_symbol(self, user: str) -> Dict[str, List[Dict[str, Any]]]:
+        grouped: Dict[str, List[Dict[str, Any]]] = {}
+        for a in self.alerts(user):
+            grouped.setdefault(a["symbol"], []).append(a)
+        return grouped
+
+    @abstractmethod
+    def add_alert(self, user: str, alert: Dict[str, Any]) -> None:
+        ...
+
+    @abstractmethod
+    def all_alerts(self) -> List[Dict[str, Any]]:
+        """Every user's alerts, each tagged with "user_id" (for the alert engine)."""
+        ...
+
+    @abstractmethod
+    def mark_alert_triggered(self, alert_id: str, ts: float) -> bool:
+        """Marks an untriggered alert as fired. False if it was already fired (e.g. by another worker)."""
+        ...
+
+    @abstractmethod
+    def alerts_version(self) -> int:
+        ...
+
+
+class MemoryStore(Store):
+    """Process-local store; contents are lost on restart."""
+
+    def __init__(self):
+        self._watchlists: Dict[str, Set[str]] = {}
+        self._alerts: Dict[str, List[Dict[str, Any]]] = {}
+        self._version = 0
+        self._lock = threading.Lock()
+
+    def watchlist(self, user: str) -> List[str]:
+        with self._lock:
+            return sorted(self._watchlists.get(user, ()))
+
+    def has_symbol(self, user: str, symbol: str) -> bool:
+        with self._lock:
+            return symbol in self._watchlists.get(user, ())
+
+    def add_symbol(self, user: str, symbol: str) -> int:
+        with self._lock:
+            wl = self._watchlists.setdefault(user, set())
+            wl.add(symbol)
+            return len(wl)
+
+    def remove_symbol(self, user: str, symbol: str) -> int:
+        with self._lock:
+            wl = self._watchlists.setdefault(user, set())
+            wl.discard(symbol)
+            alerts = self._alerts.get(user, [])
+            self._alerts[user] = [a for a in alerts if a["symbol"] != symbol]
+            self._version += 1
+            return len(wl)
+
+    def all_watchlist_symbols(self) -> List[str]:
+        with self._lock:
+            out: Set[str] = set()
+            for wl in self._watchlists.values():
+                out.update(wl)
+            return sorted(out)
+
+    def alerts(self, user: str, symbol: Optional[str] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [dict(a) for a in self._alerts.get(user, []) if symbol is None or a["symbol"] == symbol]
+
+    def add_alert(self, user: str, alert: Dict[str, Any]) -> None:
+        with self._lock:
+            self._alerts.setdefault(user, []).append(dict(alert, triggered_at=alert.get("triggered_at")))
+            self._version += 1
+
+    def all_alerts(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [dict(a, user_id=user) for user, items in self._alerts.items() for a in items]
+
+    def mark_alert_triggered(self, alert_id: str, ts: float) -> bool:
+        with self._lock:
+            for items in self._alerts.values():
+                for a in items:
+                    if a.get("id") == alert_id and a.get("triggered_at") is None:
+                        a["triggered_at"] = ts
+                        self._version += 1
+                        return True
+            return False
+
+    def alerts_version(self) -> int:
+        return self._version
+
+
+class SQLiteStore(Store):
+    """
+    Durable store in a single SQLite file (WAL mode), safe to share between
+    uvicorn/gunicorn workers. One connection per thread.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        self._init_schema()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _init_schema(self) -> None:
+        conn = self._conn()
+        with conn:
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS watchlist (
+                    user_id  TEXT NOT NULL,
+                    symbol   TEXT NOT NULL,
+                    added_at REAL NOT NULL,
+                    PRIMARY KEY (user_id, symbol)
+                );
+                CREATE INDEX IF NOT EXISTS idx_watchlist_symbol ON watchlist(symbol);
+
+                CREATE TABLE IF NOT EXISTS alerts (
+                    id            TEXT PRIMARY KEY,
+                    user_id       TEXT NOT NULL,
+                    symbol        TEXT NOT NULL,
+                    target_price  REAL NOT NULL,
+                    direction     TEXT NOT NULL,
+                    created_at    REAL NOT NULL,
+                    resolved_from TEXT,
+                    triggered_at  REAL
+                );
+                CREATE INDEX IF NOT EXISTS idx_alerts_user_symbol ON alerts(user_id, symbol);
+                CREATE INDEX IF NOT EXISTS idx_alerts_symbol ON alerts(symbol);
+
+                CREATE TABLE IF NOT EXISTS meta (
+                    key   TEXT PRIMARY KEY,
+                    value INTEGER NOT NULL
+                );
+                INSERT OR IGNORE INTO meta (key, value) VALUES ('alerts_version', 0);
+                """
+            )
+
+    def _bump_version(self, conn: sqlite3.Connection) -> None:
+        conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'alerts_version'")
+
+    def _count(self, conn: sqlite3.Connection, user: str) -> int:
+        return conn.execute("SELECT COUNT(*) FROM watchlist WHERE user_id = ?", (user,)).fetchone()[0]
+
+    def watchlist(self, user: str) -> List[str]:
+        rows = self._conn().execute(
+            "SELECT symbol FROM watchlist WHERE user_id = ? ORDER BY symbol", (user,)
+        ).fetchall()
+        return [r["symbol"] for r in rows]
+
+    def has_symbol(self, user: str, symbol: str) -> bool:
+        row = self._conn().execute(
+            "SELECT 1 FROM watchlist WHERE user_id = ? AND symbol = ?", (user, symbol)
+        ).fetchone()
+        return row is not None
+
+    def add_symbol(self, user: str, symbol: str) -> int:
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT OR IGNORE INTO watchlist (user_id, symbol, added_at) VALUES (?, ?, ?)",
+                (user, symbol, time.time()),
+            )
+            return self._count(conn, user)
+
+    def remove_symbol(self, user: str, symbol: str) -> int:
+        conn = self._conn()
+        with conn:
+            conn.execute("DELETE FROM watchlist WHERE user_id = ? AND symbol = ?", (user, symbol))
+            conn.execute("DELETE FROM alerts WHERE user_id = ? AND symbol = ?", (user, symbol))
+            self._bump_version(conn)
+            return self._count(conn, user)
+
+    def all_watchlist_symbols(self) -> List[str]:
+        rows = self._conn().execute("SELECT DISTINCT symbol FROM watchlist ORDER BY symbol").fetchall()
+        return [r["symbol"] for r in rows]
+
+    def alerts(self, user: str, symbol: Optional[str] = None) -> List[Dict[str, Any]]:
+        cols = ", ".join(_ALERT_FIELDS)
+        if symbol is None:
+            rows = self._conn().execute(
+                f"SELECT {cols} FROM alerts WHERE user_id = ? ORDER BY created_at", (user,)
+            ).fetchall()
+        else:
+            rows = self._conn().execute(
+                f"SELECT {cols} FROM alerts WHERE user_id = ? AND symbol = ? ORDER BY created_at", (user, symbol)
+            ).fetchall()
+        return [dict(r) for r in rows]
+
+    def add_alert(self, user: str, alert: Dict[str, Any]) -> None:
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT INTO alerts (id, user_id, symbol, target_price, direction, created_at, resolved_from, triggered_at)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    alert["id"],
+                    user,
+                    alert["symbol"],
+                    float(alert["target_price"]),
+                    alert["direction"],
+                    alert["created_at"],
+                    alert.get("resolved_from"),
+                    alert.get("triggered_at"),
+                ),
+            )
+            self._bump_version(conn)
+
+    def all_alerts(self) -> List[Dict[str, Any]]:
+        cols = ", ".join(_ALERT_FIELDS)
+        rows = self._conn().execute(f"SELECT {cols}, user_id FROM alerts").fetchall()
+        return [dict(r) for r in rows]
+
+    def mark_alert_triggered(self, alert_id: str, ts: float) -> bool:
+        conn = self._conn()
+        with conn:
+            cur = conn.execute(
+                "UPDATE alerts SET triggered_at = ? WHERE id = ? AND triggered_at IS NULL", (ts, alert_id)
+            )
+            if cur.rowcount:
+                self._bump_version(conn)
+            return cur.rowcount > 0
+
+    def alerts_version(self) -> int:
+        row = self._conn().execute("SELECT value FROM meta WHERE key = 'alerts_version'").fetchone()
+        return int(row[0]) if row else 0
+
+
+_store: Optional[Store] = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> Store:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = SQLiteStore(STORE_DB_PATH) if STORE_BACKEND == "sqlite" else MemoryStore()
+        return _store
+
+
+def set_store(store: Store) -> None:
+    """Swap the backend (e.g. MemoryStore() in tests)."""
+    global _store
+    with _store_lock:
+        _store = store
+
+
+def get_watchlist_symbols(user: str = DEFAULT_USER) -> List[str]:
     # Demo defaults if empty
-    return list(user_watchlist) if user_watchlist else ["AAPL", "TSLA", "MSFT", "GOOGL"]
+    return get_store().watchlist(user) or list(DEFAULT_SYMBOLS)
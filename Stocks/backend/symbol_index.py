@@ -0,0 +1,208 @@
+# backend/symbol_index.py
+from __future__ import annotations
+
+import csv
+import difflib
+import os
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+# Bundled list of popular tickers; point SYMBOL_LIST_PATH at a bigger/fresher CSV
+# (same columns) and it is picked up on the next refresh check.
+SYMBOL_LIST_PATH = os.getenv(
+    "SYMBOL_LIST_PATH", os.path.join(os.path.dirname(__file__), "data", "symbols.csv")
+)
+SYMBOL_LIST_REFRESH_SECONDS = float(os.getenv("SYMBOL_LIST_REFRESH_SECONDS", "300"))
+SYMBOL_INDEX_MAX_LEARNED = int(os.getenv("SYMBOL_INDEX_MAX_LEARNED", "5000"))
+FUZZY_CUTOFF = 0.8
+
+# Key kinds, in ranking order (lower = better match)
+_SYMBOL, _NAME, _WORD = 0, 1, 2
+
+_SUFFIXES = {
+    "inc", "incorporated", "corp", "corporation", "co", "company", "ltd", "limited",
+    "plc", "holdings", "holding", "group", "sa", "se", "nv", "ag", "the",
+}
+
+_entries: Dict[str, Dict[str, Any]] = {}        # symbol -> {"symbol", "name", "exchange", "type"}
+_keys: List[Tuple[str, int, str]] = []          # sorted (key, kind, symbol) for prefix search
+_exact_names: Dict[str, str] = {}               # normalized full name / alias -> symbol
+_learned: List[str] = []                        # symbols added from Yahoo results (oldest first)
+_lock = threading.Lock()
+
+_loaded_mtime: Optional[float] = None
+_last_refresh_check = 0.0
+
+_stats = {"local_hits": 0, "fuzzy_hits": 0, "misses": 0, "learned": 0}
+
+
+def normalize(text: str) -> str:
+    """
+    Lowercase, drop punctuation and corporate suffixes: 'Tesla, Inc.' -> 'tesla'.
+    A dot inside a word is a share-class separator, same as '-': 'BRK.B' -> 'brk-b'.
+    """
+    t = (text or "").lower().replace(".com", " ")
+    t = re.sub(r"(?<=[a-z0-9])\.(?=[a-z0-9])", "-", t)
+    t = re.sub(r"[^a-z0-9&\-\s]", " ", t)
+    words = [w for w in t.split() if w]
+    while len(words) > 1 and words[-1] in _SUFFIXES:
+        words.pop()
+    if len(words) > 1 and words[0] == "the":
+        words.pop(0)
+    return " ".join(words)
+
+
+def _add(entry: Dict[str, Any], aliases: Iterable[str] = ()) -> None:
+    sym = entry["symbol"]
+    _entries[sym] = entry
+
+    insort(_keys, (sym.lower(), _SYMBOL, sym))
+    names = [normalize(entry.get("name") or "")] + [normalize(a) for a in aliases]
+    for name in names:
+        if not name:
+            continue
+        _exact_names.setdefault(name, sym)
+        insort(_keys, (name, _NAME, sym))
+        for word in name.split()[1:]:
+            insort(_keys, (word, _WORD, sym))
+
+
+def _load_file(path: str) -> None:
+    with open(path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            sym = (row.get("symbol") or "").strip().upper()
+            if not sym:
+                continue
+            entry = {
+                "symbol": sym,
+                "name": (row.get("name") or sym).strip(),
+                "exchange": (row.get("exchange") or "").strip() or None,
+                "type": (row.get("type") or "EQUITY").strip(),
+            }
+            aliases = [a for a in (row.get("aliases") or "").split("|") if a.strip()]
+            _add(entry, aliases)
+
+
+def _rebuild() -> None:
+    """(Re)load the symbol list, keeping everything learned from Yahoo. Caller holds _lock."""
+    global _loaded_mtime
+    learned = [_entries[s] for s in _learned if s in _entries]
+
+    _entries.clear()
+    _keys.clear()
+    _exact_names.clear()
+
+    try:
+        _loaded_mtime = os.path.getmtime(SYMBOL_LIST_PATH)
+        _load_file(SYMBOL_LIST_PATH)
+    except Exception:
+        _loaded_mtime = None
+
+    for entry in learned:
+        if entry["symbol"] not in _entries:
+            _add(entry)
+
+
+def _ensure_fresh() -> None:
+    """Lazy load on first use, then re-read the list if the file changed. Caller holds _lock."""
+    global _last_refresh_check
+    now = time.time()
+    first = _last_refresh_check == 0.0
+    if not first and now - _last_refresh_check < SYMBOL_LIST_REFRESH_SECONDS:
+        return
+    _last_refresh_check = now
+    try:
+        mtime = os.path.getmtime(SYMBOL_LIST_PATH)
+    except Exception:
+        mtime = None
+    if first or mtime != _loaded_mtime:
+        _rebuild()
+
+
+def search(query: str, limit: int = 8) -> List[Dict[str, Any]]:
+    """
+    In-process prefix search over tickers, company names, aliases and name words,
+    with a difflib fuzzy pass when nothing matches by prefix.
+    Returns the same shape as yahoo_search.
+    """
+    q = normalize(query)
+    if not q:
+        return []
+
+    with _lock:
+        _ensure_fresh()
+
+        best: Dict[str, int] = {}
+        i = bisect_left(_keys, (q,))
+        while i < len(_keys) and _keys[i][0].startswith(q):
+            key, kind, sym = _keys[i]
+            rank = kind * 2 + (0 if key == q else 1)
+            if rank < best.get(sym, 99):
+                best[sym] = rank
+            i += 1
+
+        if best:
+            _stats["local_hits"] += 1
+            ordered = sorted(best, key=lambda s: (best[s], len(s), s))
+            return [dict(_entries[s]) for s in ordered[:limit]]
+
+        close = difflib.get_close_matches(q, list(_exact_names), n=limit, cutoff=FUZZY_CUTOFF)
+        if close:
+            _stats["fuzzy_hits"] += 1
+            out: List[Dict[str, Any]] = []
+            for name in close:
+                sym = _exact_names[name]
+                if all(o["symbol"] != sym for o in out):
+                    out.append(dict(_entries[sym]))
+            return out
+
+        _stats["misses"] += 1
+        return []
+
+
+def lookup_name(query: str) -> Optional[str]:
+    """Ticker for an exact company name or alias ('apple' -> 'AAPL'), else None."""
+    q = normalize(query)
+    with _lock:
+        _ensure_fresh()
+        return _exact_names.get(q)
+
+
+def is_known_symbol(symbol: str) -> bool:
+    with _lock:
+        _ensure_fresh()
+        return (symbol or "").strip().upper() in _entries
+
+
+def learn(results: Iterable[Dict[str, Any]]) -> None:
+    """Remember symbols Yahoo returned so the same query is answered locally next time."""
+    with _lock:
+        _ensure_fresh()
+        for r in results:
+            sym = (r.get("symbol") or "").strip().upper()
+            if not sym or sym in _entries:
+                continue
+            _add(
+                {
+                    "symbol": sym,
+                    "name": r.get("name") or sym,
+                    "exchange": r.get("exchange"),
+                    "type": r.get("type") or "EQUITY",
+                }
+            )
+            _learned.append(sym)
+            _stats["learned"] += 1
+
+        if len(_learned) > SYMBOL_INDEX_MAX_LEARNED:
+            # Drop the oldest 10% in one go so the rebuild cost is amortized
+            del _learned[: len(_learned) - int(SYMBOL_INDEX_MAX_LEARNED * 0.9)]
+            _rebuild()
+
+
+def symbol_index_stats() -> Dict[str, Any]:
+    with _lock:
+        return {**_stats, "symbols": len(_entries), "keys": len(_keys)}
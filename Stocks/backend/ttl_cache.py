@@ -0,0 +1,348 @@
+# backend/ttl_cache.py
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+
+# How often the background thread drops expired entries from every cache
+TTL_CACHE_SWEEP_SECONDS = float(os.getenv("TTL_CACHE_SWEEP_SECONDS", "60"))
+# Optional SQLite file shared by all workers on the box (empty = process-local only)
+SHARED_CACHE_DB = os.getenv("SHARED_CACHE_DB", "").strip()
+
+_MISSING = object()
+
+
+def _sizeof(value: Any) -> int:
+    """Rough payload size: JSON length for JSON-able values, getsizeof otherwise."""
+    try:
+        return len(json.dumps(value, default=str))
+    except Exception:
+        return sys.getsizeof(value)
+
+
+class SQLiteBacking:
+    """
+    Cross-process second level for TTLCache: one SQLite file (WAL mode),
+    values stored as JSON with an absolute expiry. One connection per thread.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        conn = self._conn()
+        with conn:
+            cols = [r[1] for r in conn.execute("PRAGMA table_info(cache)").fetchall()]
+            if cols and "fresh_until" not in cols:
+                conn.execute("DROP TABLE cache")  # older layout; it's only a cache
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS cache (
+                    namespace   TEXT NOT NULL,
+                    key         TEXT NOT NULL,
+                    value       TEXT NOT NULL,
+                    fresh_until REAL NOT NULL,
+                    expires_at  REAL NOT NULL,
+                    PRIMARY KEY (namespace, key)
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_cache_expires ON cache(expires_at)")
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, namespace: str, key: str) -> Optional[Tuple[Any, float, float]]:
+        row = self._conn().execute(
+            "SELECT value, fresh_until, expires_at FROM cache WHERE namespace = ? AND key = ? AND expires_at > ?",
+            (namespace, key, time.time()),
+        ).fetchone()
+        if row is None:
+            return None
+        return json.loads(row[0]), float(row[1]), float(row[2])
+
+    def set(self, namespace: str, key: str, value: Any, fresh_until: float, expires_at: float) -> None:
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO cache (namespace, key, value, fresh_until, expires_at) VALUES (?, ?, ?, ?, ?)",
+                (namespace, key, json.dumps(value, default=str), fresh_until, expires_at),
+            )
+
+    def delete(self, namespace: str, key: Optional[str] = None) -> None:
+        conn = self._conn()
+        with conn:
+            if key is None:
+                conn.execute("DELETE FROM cache WHERE namespace = ?", (namespace,))
+            else:
+                conn.execute("DELETE FROM cache WHERE namespace = ? AND key = ?", (namespace, key))
+
+    def sweep(self) -> int:
+        conn = self._conn()
+        with conn:
+            return conn.execute("DELETE FROM cache WHERE expires_at <= ?", (time.time(),)).rowcount
+
+
+class TTLCache:
+    """
+    Thread-safe TTL + LRU cache, bounded by entry count and (approximate) bytes.
+    Entries carry their own TTL; expired ones are dropped on read and by a shared
+    background sweep. With a backing store, local misses fall through to it and
+    writes go to both, so several workers share warm entries.
+
+    With max_stale > 0 an entry stays around that much longer after its TTL:
+    get() ignores it, but get_stale() returns it flagged as stale so callers can
+    answer immediately and refresh_in_background() (stale-while-revalidate).
+    """
+
+    def __init__(
+        self,
+        name: str,
+        default_ttl: float,
+        max_entries: int = 1024,
+        max_bytes: Optional[int] = None,
+        backing: Optional[SQLiteBacking] = None,
+        max_stale: float = 0.0,
+    ):
+        self.name = name
+        self.default_ttl = default_ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.backing = backing
+        self.max_stale = max_stale
+
+        # key -> (value, fresh_until, expires_at, size); expires_at = fresh_until + max_stale
+        self._data: "OrderedDict[str, Tuple[Any, float, float, int]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        # key -> background refresh task (one at a time per key)
+        self._refreshing: Dict[str, "asyncio.Future[Any]"] = {}
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "shared_hits": 0,
+            "stale_hits": 0,
+            "refreshes": 0,
+            "refresh_errors": 0,
+            "expired": 0,
+            "evictions": 0,
+            "sets": 0,
+        }
+
+        _register(self)
+
+    # ---- internals (_drop/_put: caller holds _lock) ----
+
+    def _drop(self, key: str) -> None:
+        size = self._data.pop(key)[3]
+        self._bytes -= size
+
+    def _put(self, key: str, value: Any, fresh_until: float, expires_at: float) -> None:
+        if key in self._data:
+            self._drop(key)
+        size = _sizeof(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return  # would flush everything else and still not fit
+        self._data[key] = (value, fresh_until, expires_at, size)
+        self._bytes += size
+        while self._data and (
+            len(self._data) > self.max_entries or (self.max_bytes is not None and self._bytes > self.max_bytes)
+        ):
+            oldest = next(iter(self._data))
+            self._drop(oldest)
+            self._stats["evictions"] += 1
+
+    def _lookup(self, key: str) -> Optional[Tuple[Any, float]]:
+        """(value, fresh_until) from memory or the backing store; None if missing or past max-stale."""
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                if entry[2] > now:
+                    self._data.move_to_end(key)
+                    return entry[0], entry[1]
+                self._drop(key)
+                self._stats["expired"] += 1
+
+        if self.backing is not None:
+            try:
+                shared = self.backing.get(self.name, key)
+            except Exception:
+                shared = None
+            if shared is not None:
+                value, fresh_until, expires_at = shared
+                with self._lock:
+                    self._put(key, value, fresh_until, expires_at)
+                    self._stats["shared_hits"] += 1
+                return value, fresh_until
+        return None
+
+    # ---- public API ----
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Fresh value only."""
+        found = self._lookup(key)
+        with self._lock:
+            if found is not None and found[1] > time.time():
+                self._stats["hits"] += 1
+                return found[0]
+            self._stats["misses"] += 1
+        return default
+
+    def get_stale(self, key: str) -> Optional[Tuple[Any, bool]]:
+        """(value, is_stale) while within the max-stale bound, else None."""
+        found = self._lookup(key)
+        with self._lock:
+            if found is None:
+                self._stats["misses"] += 1
+                return None
+            stale = found[1] <= time.time()
+            self._stats["stale_hits" if stale else "hits"] += 1
+        return found[0], stale
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        fresh_until = time.time() + (self.default_ttl if ttl is None else ttl)
+        expires_at = fresh_until + self.max_stale
+        with self._lock:
+            self._put(key, value, fresh_until, expires_at)
+            self._stats["sets"] += 1
+        if self.backing is not None:
+            try:
+                self.backing.set(self.name, key, value, fresh_until, expires_at)
+            except Exception:
+                pass  # the local copy is still good
+
+    def refresh_in_background(self, key: str, refresh: Callable[[], Awaitable[Any]]) -> None:
+        """
+        Schedule refresh() on the running loop unless one is already going for this key.
+        refresh() is expected to set() the new value itself.
+        """
+        task = self._refreshing.get(key)
+        if task is not None and not task.done():
+            return
+
+        async def _run() -> None:
+            try:
+                await refresh()
+                self._stats["refreshes"] += 1
+            except Exception:
+                self._stats["refresh_errors"] += 1  # keep serving the stale value until max-stale
+            finally:
+                if self._refreshing.get(key) is task:
+                    self._refreshing.pop(key, None)
+
+        task = asyncio.ensure_future(_run())
+        self._refreshing[key] = task
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            if key in self._data:
+                self._drop(key)
+        if self.backing is not None:
+            try:
+                self.backing.delete(self.name, key)
+            except Exception:
+                pass
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+        if self.backing is not None:
+            try:
+                self.backing.delete(self.name)
+            except Exception:
+                pass
+
+    def sweep(self) -> int:
+        """Drop entries past their max-stale bound; returns how many were removed."""
+        now = time.time()
+        with self._lock:
+            expired = [k for k, entry in self._data.items() if entry[2] <= now]
+            for k in expired:
+                self._drop(k)
+            self._stats["expired"] += len(expired)
+        return len(expired)
+
+    def __contains__(self, key: str) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._stats,
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "max_entries": self.max_entries,
+                "max_bytes": self.max_bytes,
+                "max_stale": self.max_stale,
+                "refreshing": len(self._refreshing),
+                "shared": self.backing is not None,
+            }
+
+
+# ---- shared backing + background sweep ----
+
+_caches: "weakref.WeakSet[TTLCache]" = weakref.WeakSet()
+_sweeper: Optional[threading.Thread] = None
+_sweeper_lock = threading.Lock()
+_shared_backing: Optional[SQLiteBacking] = None
+
+
+def shared_backing() -> Optional[SQLiteBacking]:
+    """The SHARED_CACHE_DB backing, or None when sharing is off (or the file can't be opened)."""
+    global _shared_backing
+    if not SHARED_CACHE_DB:
+        return None
+    with _sweeper_lock:
+        if _shared_backing is None:
+            try:
+                _shared_backing = SQLiteBacking(SHARED_CACHE_DB)
+            except Exception:
+                return None
+        return _shared_backing
+
+
+def _sweep_loop() -> None:
+    while True:
+        time.sleep(TTL_CACHE_SWEEP_SECONDS)
+        for cache in list(_caches):
+            try:
+                cache.sweep()
+            except Exception:
+                pass
+        if _shared_backing is not None:
+            try:
+                _shared_backing.sweep()
+            except Exception:
+                pass
+
+
+def _register(cache: TTLCache) -> None:
+    global _sweeper
+    with _sweeper_lock:
+        _caches.add(cache)
+        if _sweeper is None:
+            _sweeper = threading.Thread(target=_sweep_loop, name="ttl-cache-sweep", daemon=True)
+            _sweeper.start()
+
+
+def ttl_cache_stats() -> Dict[str, Any]:
+    return {cache.name: cache.stats() for cache in sorted(list(_caches), key=lambda c: c.name)}
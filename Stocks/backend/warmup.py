@@ -0,0 +1,261 @@
+# backend/warmup.py
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    from zoneinfo import ZoneInfo
+except Exception:  # pragma: no cover
+    ZoneInfo = None  # type: ignore
+
+from .ai import get_metric_explanations_async
+from .history_cache import get_history
+from .news import get_company_news_async
+from .quote_cache import get_quotes
+from .stock_utils import resolve_stock_query
+from .store import DEFAULT_SYMBOLS, get_store
+
+
+# Prefetch quotes / history / news / explanations for popular symbols before the opening rush
+# Opt-in, like the news ingest: every uvicorn/gunicorn worker runs its own copy, so
+# enable it on one worker (or a single-worker deployment) only
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "0") == "1"
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "1") == "1"
+# Comma-separated HH:MM in WARMUP_TIMEZONE, weekdays only (default: 5 minutes before the NYSE open)
+WARMUP_TIMES = os.getenv("WARMUP_TIMES", "09:25")
+WARMUP_TIMEZONE = os.getenv("WARMUP_TIMEZONE", "America/New_York")
+WARMUP_CONCURRENCY = int(os.getenv("WARMUP_CONCURRENCY", "4"))
+WARMUP_TOP_N = int(os.getenv("WARMUP_TOP_N", "25"))
+WARMUP_MAX_SYMBOLS = int(os.getenv("WARMUP_MAX_SYMBOLS", "100"))
+# The longest chart period the frontend offers; shorter periods are slices of the same cache
+WARMUP_HISTORY_PERIOD = os.getenv("WARMUP_HISTORY_PERIOD", "1y")
+WARMUP_NEWS = os.getenv("WARMUP_NEWS", "1") == "1"
+# Per-symbol metrics explanations. Off by default: with Gemini configured every run (and
+# every restart) would spend up to WARMUP_MAX_SYMBOLS calls of quota
+WARMUP_EXPLANATIONS = os.getenv("WARMUP_EXPLANATIONS", "0") == "1"
+
+# Request counts are halved after every run, so "popular" means recently popular
+WARMUP_COUNT_DECAY = 0.5
+WARMUP_TRACKED_MAX = 2000
+
+_counts_lock = threading.Lock()
+_request_counts: Dict[str, float] = {}
+
+_stats: Dict[str, Any] = {
+    "runs": 0,
+    "symbols_warmed": 0,
+    "errors": 0,
+    "last_run_at": None,
+    "last_run_ms": 0.0,
+    "last_symbols": 0,
+    "next_run_at": None,
+}
+
+
+# ---- request counter ----
+
+def note_symbol_request(symbol: Optional[str]) -> None:
+    """Count one request for a resolved symbol (feeds the top-N list)."""
+    if not symbol:
+        return
+    sym = symbol.upper()
+    with _counts_lock:
+        _request_counts[sym] = _request_counts.get(sym, 0.0) + 1.0
+        if len(_request_counts) > WARMUP_TRACKED_MAX:
+            # Drop the least requested half rather than growing without bound
+            keep = sorted(_request_counts.items(), key=lambda kv: kv[1], reverse=True)[: WARMUP_TRACKED_MAX // 2]
+            _request_counts.clear()
+            _request_counts.update(keep)
+
+
+def top_requested(n: int) -> List[str]:
+    with _counts_lock:
+        ranked = sorted(_request_counts.items(), key=lambda kv: (-kv[1], kv[0]))
+    return [sym for sym, _ in ranked[: max(0, n)]]
+
+
+def _decay_counts() -> None:
+    with _counts_lock:
+        for sym in list(_request_counts):
+            value = _request_counts[sym] * WARMUP_COUNT_DECAY
+            if value < 0.5:
+                del _request_counts[sym]
+            else:
+                _request_counts[sym] = value
+
+
+def warmup_symbols() -> List[str]:
+    """Union of every stored watchlist and the top-N requested symbols (watchlists first)."""
+    try:
+        stored = get_store().all_watchlist_symbols()
+    except Exception:
+        stored = []
+    out: List[str] = []
+    for sym in list(stored or DEFAULT_SYMBOLS) + top_requested(WARMUP_TOP_N):
+        sym = (sym or "").strip().upper()
+        if sym and sym not in out:
+            out.append(sym)
+    return out[:WARMUP_MAX_SYMBOLS]
+
+
+# ---- one run ----
+
+async def _warm_symbol(symbol: str) -> bool:
+    """Same calls (and cache keys) /details and /history make. False if any stage failed."""
+    ok = True
+    sym, _, info = await asyncio.to_thread(resolve_stock_query, symbol)
+    if not sym or not info:
+        return False
+
+    try:
+        await asyncio.to_thread(get_history, sym, WARMUP_HISTORY_PERIOD)
+    except Exception:
+        ok = False
+
+    if WARMUP_NEWS:
+        try:
+            await get_company_news_async(sym, limit=8)
+        except Exception:
+            ok = False
+
+    if WARMUP_EXPLANATIONS:
+        # Only the metrics explanation: it's cached per symbol. The main explanation is keyed
+        # by the rounded change %, so a pre-open copy goes stale as soon as prices move.
+        try:
+            await get_metric_explanations_async(
+                symbol=sym,
+                company_name=info.get("longName", sym),
+                current_price=info.get("currentPrice", info.get("regularMarketPrice", None)),
+                pe_ratio=info.get("trailingPE", None),
+                market_cap=info.get("marketCap", None),
+                week_52_high=info.get("fiftyTwoWeekHigh", None),
+                week_52_low=info.get("fiftyTwoWeekLow", None),
+            )
+        except Exception:
+            ok = False
+    return ok
+
+
+async def warmup_once(symbols: Optional[List[str]] = None) -> Dict[str, Any]:
+    """
+    Quotes for every symbol in one fan-out, then history / news / explanations per
+    symbol with at most WARMUP_CONCURRENCY symbols in flight.
+    """
+    start = time.perf_counter()
+    if symbols is None:
+        symbols = await asyncio.to_thread(warmup_symbols)
+
+    await asyncio.to_thread(get_quotes, symbols)
+
+    sem = asyncio.Semaphore(max(1, WARMUP_CONCURRENCY))
+
+    async def one(sym: str) -> bool:
+        async with sem:
+            try:
+                return await _warm_symbol(sym)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                return False
+
+    results = await asyncio.gather(*(one(s) for s in symbols))
+    errors = sum(1 for ok in results if not ok)
+    _decay_counts()
+
+    elapsed_ms = round((time.perf_counter() - start) * 1000.0, 1)
+    _stats["runs"] += 1
+    _stats["symbols_warmed"] += len(symbols) - errors
+    _stats["errors"] += errors
+    _stats["last_run_at"] = time.time()
+    _stats["last_run_ms"] = elapsed_ms
+    _stats["last_symbols"] = len(symbols)
+    return {"symbols": len(symbols), "errors": errors, "ms": elapsed_ms}
+
+
+# ---- schedule ----
+
+def _parse_times(spec: str) -> List[Tuple[int, int]]:
+    times = []
+    for part in spec.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        hh, _, mm = part.partition(":")
+        try:
+            h, m = int(hh), int(mm or 0)
+        except ValueError:
+            continue
+        if 0 <= h < 24 and 0 <= m < 60:
+            times.append((h, m))
+    return sorted(set(times))
+
+
+def _zone():
+    if ZoneInfo is None:
+        return None
+    try:
+        return ZoneInfo(WARMUP_TIMEZONE)
+    except Exception:
+        return None
+
+
+def next_run_at(now: Optional[float] = None) -> Optional[float]:
+    """Unix time of the next scheduled run (weekdays at WARMUP_TIMES), or None if none are configured."""
+    times = _parse_times(WARMUP_TIMES)
+    if not times:
+        return None
+    tz = _zone()
+    current = datetime.fromtimestamp(time.time() if now is None else now, tz)
+    for day in range(8):
+        d = (current + timedelta(days=day)).date()
+        if d.weekday() >= 5:
+            continue
+        for h, m in times:
+            candidate = datetime(d.year, d.month, d.day, h, m, tzinfo=tz)
+            ts = candidate.timestamp()
+            if ts > current.timestamp():
+                return ts
+    return None
+
+
+async def run_warmup() -> None:
+    """Background loop started from the app lifespan."""
+    if WARMUP_ON_STARTUP:
+        try:
+            await warmup_once()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            pass
+
+    while True:
+        due = next_run_at()
+        _stats["next_run_at"] = due
+        if due is None:
+            return
+        await asyncio.sleep(max(1.0, due - time.time()))
+        try:
+            await warmup_once()
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            pass  # a bad run shouldn't stop the schedule
+
+
+def warmup_stats() -> Dict[str, Any]:
+    with _counts_lock:
+        tracked = len(_request_counts)
+    return {
+        **_stats,
+        "enabled": WARMUP_ENABLED,
+        "times": WARMUP_TIMES,
+        "timezone": WARMUP_TIMEZONE,
+        "concurrency": WARMUP_CONCURRENCY,
+        "tracked_symbols": tracked,
+        "top_requested": top_requested(5),
+    }
@@ -1,16 +1,17 @@
-from typing import Any, Dict, List, Optional
-import requests
+from typing import Any, Dict, List, Optional, Tuple
 
+from .http_client import get_json
+from .metrics import timed
+from . import symbol_index
+
+YAHOO_SEARCH_URL = "https://query2.finance.yahoo.com/v1/finance/search"
 
-def yahoo_search(query: str, max_results: int = 8) -> List[Dict[str, Any]]:
-    url = "https://query2.finance.yahoo.com/v1/finance/search"
-    params = {"q": query, "quotesCount": max_results, "newsCount": 0}
-    headers = {"User-Agent": "Mozilla/5.0"}
 
-    r = requests.get(url, params=params, headers=headers, timeout=10)
-    r.raise_for_status()
-    payload = r.json()
+def _search_params(query: str, max_results: int) -> Dict[str, Any]:
+    return {"q": query, "quotesCount": max_results, "newsCount": 0}
 
+
+def _parse_search(payload: Dict[str, Any]) -> List[Dict[str, Any]]:
     results: List[Dict[str, Any]] = []
     for item in payload.get("quotes", []):
         sym = item.get("symbol")
@@ -31,16 +32,38 @@ def yahoo_search(query: str, max_results: int = 8) -> List[Dict[str, Any]]:
     return results
 
 
-def resolve_to_ticker(user_input: str) -> Optional[str]:
+@timed("yahoo_search")
+def yahoo_search(query: str, max_results: int = 8) -> List[Dict[str, Any]]:
+    payload = get_json("yahoo_search", YAHOO_SEARCH_URL, params=_search_params(query, max_results), timeout=10)
+    results = _parse_search(payload)
+    symbol_index.learn(results)
+    return results
+
+
+def resolve_to_ticker(user_input: str) -> Tuple[Optional[str], bool]:
+    """
+    (ticker, searched). searched is True when Yahoo search actually answered; when it
+    is False the result came from the local index only (a name hit, or Yahoo failed /
+    its breaker is open), so a None there doesn't mean the input has no ticker.
+    """
     q = (user_input or "").strip()
     if not q:
-        return None
+        return None, False
+
+    # Known company name / alias: answered locally, no Yahoo round trip
+    local = symbol_index.lookup_name(q)
+    if local:
+        return local, False
 
+    searched = False
     try:
         results = yahoo_search(q, max_results=5)
+        searched = True
         if results:
-            return results[0]["symbol"]
+            return results[0]["symbol"], True
     except Exception:
-        return None
+        pass
 
-    return None
+    # Yahoo missed or is down: best fuzzy local match, if any
+    fuzzy = symbol_index.search(q, limit=1)
+    return (fuzzy[0]["symbol"] if fuzzy else None), searched
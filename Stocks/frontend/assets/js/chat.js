@@ -40,6 +40,7 @@
       messagesContainer.insertBefore(messageDiv, typing);
 
       messagesContainer.scrollTop = messagesContainer.scrollHeight;
+      return messageDiv;
     }
 
     function showTypingIndicator() {
@@ -52,6 +53,65 @@
       document.getElementById("typingIndicator").classList.remove("show");
     }
 
+    // Parses SSE frames out of a fetch() body; calls onEvent(name, data) per frame
+    async function readSSE(response, onEvent) {
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      let buffer = "";
+
+      while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        let sep;
+        while ((sep = buffer.indexOf("\n\n")) !== -1) {
+          const frame = buffer.slice(0, sep);
+          buffer = buffer.slice(sep + 2);
+
+          let event = "message";
+          let data = "";
+          frame.split("\n").forEach((line) => {
+            if (line.startsWith("event:")) event = line.slice(6).trim();
+            else if (line.startsWith("data:")) data += line.slice(5).trim();
+          });
+          if (data) onEvent(event, JSON.parse(data));
+        }
+      }
+    }
+
+    // Streams the answer into one message bubble as tokens arrive
+    async function streamMessage(message) {
+      const response = await fetch(`${API}/chat/stream`, {
+        method: "POST",
+        headers: { "Content-Type": "application/json" },
+        body: JSON.stringify({ message, context: chatContext }),
+      });
+      if (!response.ok || !response.body) throw new Error("stream unavailable");
+
+      let bubble = null;
+      let text = "";
+      const onEvent = (event, data) => {
+        if (event === "token") {
+          if (!bubble) {
+            hideTypingIndicator();
+            bubble = addChatMessage("");
+          }
+          text += data.text || "";
+          bubble.querySelector(".message-content").textContent = text;
+          const messagesContainer = document.getElementById("chatMessages");
+          messagesContainer.scrollTop = messagesContainer.scrollHeight;
+        }
+      };
+
+      try {
+        await readSSE(response, onEvent);
+      } catch (err) {
+        if (!bubble) throw err; // nothing shown yet: let the caller retry without streaming
+      }
+      if (!bubble) throw new Error("empty stream");
+    }
+
     async function sendMessage() {
       const input = document.getElementById("chatInput");
       const message = input.value.trim();
@@ -62,6 +122,13 @@
       input.value = "";
       showTypingIndicator();
 
+      try {
+        await streamMessage(message);
+        return;
+      } catch (error) {
+        // Fall back to the one-shot endpoint below
+      }
+
       try {
         const response = await fetch(`${API}/chat`, {
           method: "POST",
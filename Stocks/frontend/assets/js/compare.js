@@ -104,6 +104,12 @@ function _cmpRenderResult(payload){
     return;
   }
 
+  // Period analytics (return / beta / volatility), keyed by symbol
+  const stats = {};
+  ((payload.analytics && payload.analytics.stats) || []).forEach(a => { stats[a.symbol] = a; });
+  const period = (payload.analytics && payload.analytics.period) || "1y";
+  const bench = (payload.analytics && payload.analytics.benchmark) || "SPY";
+
   const rows = (payload.stocks || []).map(s => {
     const sym = s.symbol || "-";
     const name = s.name || sym;
@@ -111,6 +117,10 @@ function _cmpRenderResult(payload){
     const change = _cmpPct(s.change);
     const pe = (s.pe_ratio == null) ? "-" : String(s.pe_ratio);
     const mc = _cmpCompactInt(s.market_cap);
+    const a = stats[s.symbol] || {};
+    const ret = _cmpPct(a.return_pct);
+    const beta = (a.beta == null) ? "-" : Number(a.beta).toFixed(2);
+    const vol = (a.volatility_pct == null) ? "-" : `${Number(a.volatility_pct).toFixed(1)}%`;
 
     return `
       <tr>
@@ -119,6 +129,9 @@ function _cmpRenderResult(payload){
         <td>${change}</td>
         <td>${pe}</td>
         <td>${mc}</td>
+        <td>${ret}</td>
+        <td>${beta}</td>
+        <td>${vol}</td>
       </tr>
     `;
   }).join("");
@@ -133,11 +146,14 @@ function _cmpRenderResult(payload){
           <th>Change</th>
           <th>P/E</th>
           <th>Market cap</th>
+          <th>${escapeHtml(period)} return</th>
+          <th>Beta (${escapeHtml(bench)})</th>
+          <th>Volatility</th>
         </tr>
       </thead>
       <tbody>${rows}</tbody>
     </table>
-    <div class="compare-note">${payload.comparison || ""}</div>
+    <div class="compare-note">${escapeHtml(payload.comparison || "")}</div>
   `;
 
   if (window.lucide) lucide.createIcons();
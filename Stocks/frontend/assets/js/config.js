@@ -9,3 +9,32 @@ const API = IS_LOCAL
   : "https://stocksmart-fje8.onrender.com"; 
 
 window.API = API;
+
+// Per-browser user id so each visitor gets their own watchlist/alerts on the backend.
+function getUserId() {
+  try {
+    let id = localStorage.getItem("stocksmartUserId");
+    if (!id) {
+      id = (crypto.randomUUID ? crypto.randomUUID() : String(Date.now()) + Math.random().toString(16).slice(2))
+        .replace(/[^A-Za-z0-9_-]/g, "");
+      localStorage.setItem("stocksmartUserId", id);
+    }
+    return id;
+  } catch (_) {
+    return "default";
+  }
+}
+
+window.USER_ID = getUserId();
+
+// Attach X-User-Id to every call to our API (EventSource can't set headers; it uses ?user=).
+const _fetch = window.fetch.bind(window);
+window.fetch = (input, init = {}) => {
+  const url = typeof input === "string" ? input : input.url;
+  if (url && url.startsWith(API)) {
+    const headers = new Headers(init.headers || {});
+    headers.set("X-User-Id", window.USER_ID);
+    init = { ...init, headers };
+  }
+  return _fetch(input, init);
+};
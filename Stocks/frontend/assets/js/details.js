@@ -100,7 +100,7 @@
 
     async function loadChart(symbol, period = "1mo", btnEl = null) {
       try {
-        const response = await fetch(`${API}/stock/${encodeURIComponent(symbol)}/history?period=${encodeURIComponent(period)}`);
+        const response = await fetch(`${API}/stock/${encodeURIComponent(symbol)}/history?period=${encodeURIComponent(period)}&format=columns`);
         const data = await response.json();
 
         if (data.error) {
@@ -112,8 +112,9 @@
         document.querySelectorAll(".period-btn").forEach((btn) => btn.classList.remove("active"));
         if (btnEl) btnEl.classList.add("active");
 
-        const labels = (data.data || []).map((d) => d.date);
-        const prices = (data.data || []).map((d) => d.close);
+        // format=columns: one array per field
+        const labels = (data.data && data.data.date) || [];
+        const prices = (data.data && data.data.close) || [];
 
         if (currentChart) currentChart.destroy();
 
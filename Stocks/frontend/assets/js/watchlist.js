@@ -32,7 +32,9 @@ async function loadWatchlist() {
       data.watchlist.forEach((stock) => {
         grid.innerHTML += createStockCard(stock);
       });
+      startQuoteStream(data.watchlist.map((s) => s.symbol));
     } else {
+      stopQuoteStream();
       grid.innerHTML = `
         <div class="empty">
           <h3>Your watchlist is empty</h3>
@@ -61,7 +63,7 @@ function createStockCard(stock) {
     : "";
 
   return `
-    <div class="card" onclick="viewStockDetails('${stock.symbol}')">
+    <div class="card" data-symbol="${stock.symbol}" onclick="viewStockDetails('${stock.symbol}')">
       ${alertBadge}
       <div class="card-top">
         <div>
@@ -80,6 +82,46 @@ function createStockCard(stock) {
   `;
 }
 
+/* Live prices: one SSE connection per tab; the server shares one poller per symbol */
+
+let quoteStream = null;
+
+function stopQuoteStream() {
+  if (quoteStream) {
+    quoteStream.close();
+    quoteStream = null;
+  }
+}
+
+function startQuoteStream(symbols) {
+  stopQuoteStream();
+  if (!symbols.length || typeof EventSource === "undefined") return;
+
+  const qs = encodeURIComponent(symbols.join(","));
+  const user = encodeURIComponent(window.USER_ID || "default");
+  quoteStream = new EventSource(`${API}/watchlist/stream?symbols=${qs}&user=${user}`);
+
+  quoteStream.addEventListener("quote", (e) => {
+    let q = null;
+    try {
+      q = JSON.parse(e.data);
+    } catch (_) {
+      return;
+    }
+    const card = document.querySelector(`.card[data-symbol="${q.symbol}"]`);
+    if (!card) return;
+
+    const priceEl = card.querySelector(".price");
+    if (priceEl) priceEl.textContent = money(typeof q.price === "number" ? q.price : null);
+
+    const pill = card.querySelector(".pill");
+    if (pill) {
+      pill.outerHTML = pctPill(typeof q.change_percent === "number" ? q.change_percent : 0);
+      refreshLucide();
+    }
+  });
+}
+
 async function removeFromWatchlist(symbol) {
   if (!confirm(`Remove ${symbol} from watchlist?`)) return;
 
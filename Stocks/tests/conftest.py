@@ -0,0 +1,19 @@
+# tests/conftest.py
+"""
+Test environment: set before anything imports backend, since its modules read
+their configuration from the environment at import time.
+"""
+import os
+import tempfile
+
+_tmp = tempfile.mkdtemp(prefix="stocks-tests-")
+
+# Upstreams answered by backend/replay.py (deterministic synthetic fixtures), no network
+os.environ.setdefault("UPSTREAM_MODE", "replay")
+os.environ.setdefault("REPLAY_DIR", os.path.join(_tmp, "replay"))
+os.environ.setdefault("STOCKS_STORE", "memory")
+os.environ.setdefault("HISTORY_CACHE_DIR", os.path.join(_tmp, "history"))
+# No background jobs in tests
+os.environ.setdefault("ALERT_ENGINE_ENABLED", "0")
+os.environ.setdefault("NEWS_INGEST_ENABLED", "0")
+os.environ.setdefault("WARMUP_ENABLED", "0")
@@ -0,0 +1,120 @@
+# tests/test_indicators.py
+"""
+Indicator kernels against hand-computed values, including where each one starts
+(NaN until its window has filled) and the RSI edge cases.
+"""
+import math
+
+import numpy as np
+import pytest
+
+from backend import indicators
+
+
+CLOSE = np.array(
+    [44.34, 44.09, 44.15, 43.61, 44.33, 44.83, 45.10, 45.42, 45.84, 46.08,
+     45.89, 46.03, 45.61, 46.28, 46.28, 46.00, 46.03, 46.41, 46.22, 45.64],
+    dtype="f8",
+)
+
+
+def _wilder_rsi(close, window):
+    """Reference: per-bar Wilder smoothing, seeded with the first change, NaN until `window` changes."""
+    out = [math.nan] * len(close)
+    avg_gain = avg_loss = None
+    for i in range(1, len(close)):
+        change = close[i] - close[i - 1]
+        gain, loss = max(change, 0.0), max(-change, 0.0)
+        if avg_gain is None:
+            avg_gain, avg_loss = gain, loss
+        else:
+            avg_gain += (gain - avg_gain) / window
+            avg_loss += (loss - avg_loss) / window
+        if i >= window:
+            out[i] = 100.0 if avg_loss == 0 else 100.0 - 100.0 / (1.0 + avg_gain / avg_loss)
+    return np.array(out)
+
+
+def test_sma_matches_window_mean():
+    out = indicators.sma(CLOSE, 5)
+    assert np.isnan(out[:4]).all()
+    for i in range(4, len(CLOSE)):
+        assert out[i] == pytest.approx(CLOSE[i - 4 : i + 1].mean())
+
+
+def test_ema_recursion_and_warmup():
+    span = 5
+    out = indicators.ema(CLOSE, span)
+    alpha = 2.0 / (span + 1)
+    expected = CLOSE[0]
+    for i in range(1, len(CLOSE)):
+        expected = alpha * CLOSE[i] + (1 - alpha) * expected
+        if i < span - 1:
+            assert np.isnan(out[i])
+        else:
+            assert out[i] == pytest.approx(expected)
+
+
+def test_rsi_is_wilder_smoothed():
+    out = indicators.rsi(CLOSE, 14)
+    expected = _wilder_rsi(CLOSE, 14)
+    # The first `window` bars have fewer than `window` price changes behind them
+    assert np.isnan(out[:14]).all()
+    np.testing.assert_allclose(out[14:], expected[14:], rtol=1e-10)
+    assert ((out[14:] > 0) & (out[14:] < 100)).all()
+
+
+def test_rsi_edge_cases():
+    rising = np.arange(1.0, 21.0)
+    assert (indicators.rsi(rising, 14)[14:] == 100.0).all()
+    flat = np.full(20, 10.0)
+    assert (indicators.rsi(flat, 14)[14:] == 50.0).all()
+    falling = rising[::-1].copy()
+    assert (indicators.rsi(falling, 14)[14:] == 0.0).all()
+
+
+def test_macd_histogram_is_line_minus_signal():
+    close = 100 + np.cumsum(np.sin(np.arange(80) / 5.0))
+    out = indicators.macd(close, 12, 26, 9)
+    line = indicators.ema(close, 12) - indicators.ema(close, 26)
+    np.testing.assert_allclose(out["macd"], line, equal_nan=True)
+    np.testing.assert_allclose(out["histogram"], out["macd"] - out["signal"], equal_nan=True)
+    assert np.isnan(out["macd"][:25]).all() and not np.isnan(out["macd"][25:]).any()
+    # The signal line needs `signal` MACD values of its own
+    assert np.isnan(out["signal"][: 25 + 8]).all() and not np.isnan(out["signal"][25 + 8 :]).any()
+
+
+def test_bollinger_bands():
+    out = indicators.bollinger(CLOSE, 5, 2.0)
+    np.testing.assert_allclose(out["middle"], indicators.sma(CLOSE, 5), equal_nan=True)
+    std = CLOSE[-5:].std()  # population std, ddof=0
+    assert out["upper"][-1] == pytest.approx(out["middle"][-1] + 2.0 * std)
+    assert out["lower"][-1] == pytest.approx(out["middle"][-1] - 2.0 * std)
+
+
+def test_drawdown_from_running_peak():
+    close = np.array([100.0, 110.0, 99.0, 121.0, 60.5])
+    np.testing.assert_allclose(indicators.drawdown(close), [0.0, 0.0, -10.0, 0.0, -50.0])
+
+
+def test_volatility_is_annualized_percent():
+    close = 100 * np.exp(np.cumsum(np.tile([0.01, -0.01], 15)))
+    out = indicators.volatility(close, 20)
+    assert np.isnan(out[:20]).all()
+    log_ret = np.diff(np.log(close))[-20:]
+    assert out[-1] == pytest.approx(log_ret.std(ddof=1) * math.sqrt(252) * 100)
+
+
+def test_parse_spec_defaults_and_limits():
+    assert indicators.parse_spec("sma,macd:5,bbands:10-1.5") == [
+        ("sma", (20,)),
+        ("macd", (5, 26, 9)),
+        ("bbands", (10, 1.5)),
+    ]
+    assert indicators.parse_spec("rsi,RSI:14") == [("rsi", (14,))]
+    for bad in ("nope", "sma:0", "sma:1001", "sma:x", "sma:5-6", ","):
+        with pytest.raises(ValueError):
+            indicators.parse_spec(bad)
+    too_many = ",".join(f"sma:{n}" for n in range(1, indicators.MAX_INDICATORS_PER_REQUEST + 2))
+    with pytest.raises(ValueError):
+        indicators.parse_spec(too_many)
@@ -0,0 +1,18 @@
+# tests/test_loadtest_replay.py
+"""
+Performance regression gate: the in-process load test against replayed upstreams
+must stay inside its latency / throughput / error budgets. The budgets leave
+roughly 10x headroom over a laptop run so slow CI machines don't flake, while a
+regression that puts upstream calls back on the request path still fails.
+"""
+from backend import loadtest
+
+BUDGET_FLAGS = ["--max-p95-ms", "250", "--min-rps", "50", "--max-error-rate", "0"]
+
+
+def test_replay_load_within_budget(tmp_path):
+    out = tmp_path / "loadtest.json"
+    code = loadtest.main(
+        ["--requests", "200", "--concurrency", "16", "--warmup", "20", "--json", str(out), *BUDGET_FLAGS]
+    )
+    assert code == 0, out.read_text()
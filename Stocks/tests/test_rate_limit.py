@@ -0,0 +1,107 @@
+# tests/test_rate_limit.py
+"""
+TokenBucketLimiter: queued callers are served by priority (FIFO within a class),
+and a caller whose estimated wait passes its deadline is rejected up front.
+"""
+import asyncio
+import time
+
+import pytest
+
+from backend.rate_limit import (
+    PRIORITY_BACKGROUND,
+    PRIORITY_EXPLAIN,
+    PRIORITY_INTERACTIVE,
+    RateLimited,
+    TokenBucketLimiter,
+)
+
+
+def _empty_limiter(rpm=600, tpm=1_000_000):
+    """10 requests/s by default, starting with nothing in the request bucket."""
+    limiter = TokenBucketLimiter("test", rpm=rpm, tpm=tpm)
+    limiter._requests = 0.0
+    return limiter
+
+
+def _run(limiter, callers):
+    """Start every (name, priority, timeout) caller at once; returns the names in grant order."""
+    order = []
+
+    async def one(name, priority, timeout):
+        try:
+            await limiter.acquire_async(10, priority, timeout)
+            order.append(name)
+        except RateLimited:
+            order.append(name + "!")
+
+    async def main():
+        await asyncio.gather(*(one(*c) for c in callers))
+
+    asyncio.run(main())
+    return order
+
+
+def test_served_in_priority_order():
+    limiter = _empty_limiter()
+    order = _run(
+        limiter,
+        [
+            ("bg1", PRIORITY_BACKGROUND, 5),
+            ("ex1", PRIORITY_EXPLAIN, 5),
+            ("bg2", PRIORITY_BACKGROUND, 5),
+            ("chat", PRIORITY_INTERACTIVE, 5),
+            ("ex2", PRIORITY_EXPLAIN, 5),
+        ],
+    )
+    assert order == ["chat", "ex1", "ex2", "bg1", "bg2"]
+    stats = limiter.stats()
+    assert stats["granted"] == 5 and stats["queued"] == 5 and stats["waiting"] == 0
+
+
+def test_interactive_jumps_a_background_backlog():
+    limiter = _empty_limiter()
+    backlog = [(f"bg{i}", PRIORITY_BACKGROUND, 5) for i in range(8)]
+    # ~0.1s behind nothing but itself; behind the backlog it would need ~0.9s
+    order = _run(limiter, backlog + [("chat", PRIORITY_INTERACTIVE, 0.5)])
+    assert order[0] == "chat"
+    assert order[1:] == [name for name, _, _ in backlog]
+
+
+def test_rejected_up_front_when_deadline_cannot_be_met():
+    limiter = _empty_limiter(rpm=60)  # one request per second
+    started = time.monotonic()
+    with pytest.raises(RateLimited):
+        limiter.acquire(10, PRIORITY_EXPLAIN, timeout=0.2)
+    assert time.monotonic() - started < 0.1  # no point waiting it out
+    stats = limiter.stats()
+    assert stats["rejected"] == 1 and stats["waiting"] == 0
+
+
+def test_low_priority_rejected_behind_higher_priority_queue():
+    limiter = _empty_limiter(rpm=60)
+    order = _run(
+        limiter,
+        [
+            ("chat", PRIORITY_INTERACTIVE, 5),
+            ("bg", PRIORITY_BACKGROUND, 1.5),  # needs ~2s: one slot for chat, one for itself
+        ],
+    )
+    assert order == ["bg!", "chat"]
+
+
+def test_token_budget_and_settle():
+    limiter = TokenBucketLimiter("test", rpm=600, tpm=1000)
+    limiter.acquire(600, PRIORITY_INTERACTIVE, timeout=1)
+    limiter.settle(estimated=600, actual=900)  # used more than estimated
+    assert limiter.stats()["tokens_available"] <= 100
+    with pytest.raises(RateLimited):
+        limiter.acquire(500, PRIORITY_INTERACTIVE, timeout=0.5)  # ~24s of refill away
+
+
+def test_throttle_empties_the_buckets():
+    limiter = TokenBucketLimiter("test", rpm=60, tpm=1_000_000)
+    limiter.throttle()
+    with pytest.raises(RateLimited):
+        limiter.acquire(10, PRIORITY_INTERACTIVE, timeout=0.5)
+    assert limiter.stats()["throttled"] == 1
@@ -0,0 +1,104 @@
+# tests/test_ttl_cache.py
+"""
+TTLCache bounds (entry count and approximate bytes, least recently used first)
+and the fresh / stale / expired life cycle.
+"""
+import pytest
+
+from backend import ttl_cache
+from backend.ttl_cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(ttl_cache.time, "time", fake)
+    return fake
+
+
+def test_lru_eviction_by_entry_count():
+    cache = TTLCache("test-lru", default_ttl=60, max_entries=3)
+    for key in "abc":
+        cache.set(key, key)
+    assert cache.get("a") == "a"  # a is now the most recently used
+    cache.set("d", "d")
+
+    assert cache.get("b") is None
+    assert [cache.get(k) for k in "acd"] == ["a", "c", "d"]
+    assert len(cache) == 3
+    assert cache.stats()["evictions"] == 1
+
+
+def test_byte_bound_evicts_oldest_until_it_fits():
+    # JSON size of a string of n characters is n + 2 (the quotes)
+    cache = TTLCache("test-bytes", default_ttl=60, max_entries=100, max_bytes=30)
+    cache.set("a", "x" * 8)
+    cache.set("b", "x" * 8)
+    cache.set("c", "x" * 8)
+    assert cache.stats()["bytes"] == 30
+
+    cache.set("d", "x" * 18)  # 20 bytes: a and b have to go
+    assert cache.get("a") is None and cache.get("b") is None
+    assert cache.get("c") == "x" * 8 and cache.get("d") == "x" * 18
+    stats = cache.stats()
+    assert stats["bytes"] == 30 and stats["evictions"] == 2
+
+
+def test_oversized_value_is_not_cached():
+    cache = TTLCache("test-oversized", default_ttl=60, max_bytes=10)
+    cache.set("small", "xy")
+    cache.set("big", "x" * 50)
+    assert cache.get("big") is None
+    assert cache.get("small") == "xy"  # didn't flush everything else either
+
+
+def test_replacing_a_key_updates_its_size():
+    cache = TTLCache("test-resize", default_ttl=60, max_bytes=100)
+    cache.set("a", "x" * 48)
+    cache.set("a", "x" * 8)
+    assert len(cache) == 1
+    assert cache.stats()["bytes"] == 10
+
+
+def test_ttl_expiry(clock):
+    cache = TTLCache("test-ttl", default_ttl=10)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=30)
+    clock.now += 11
+    assert cache.get("a") is None
+    assert "a" not in cache
+    assert cache.get("b") == 2
+    assert cache.stats()["expired"] == 1
+
+
+def test_stale_window(clock):
+    cache = TTLCache("test-stale", default_ttl=10, max_stale=20)
+    cache.set("a", 1)
+    assert cache.get_stale("a") == (1, False)
+
+    clock.now += 15  # past the TTL, inside max-stale
+    assert cache.get("a") is None
+    assert cache.get_stale("a") == (1, True)
+
+    clock.now += 20  # past max-stale too
+    assert cache.get_stale("a") is None
+    assert len(cache) == 0
+
+
+def test_sweep_drops_expired_entries(clock):
+    cache = TTLCache("test-sweep", default_ttl=10, max_stale=5)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=100)
+    clock.now += 12
+    assert cache.sweep() == 0  # stale but still servable
+    clock.now += 5
+    assert cache.sweep() == 1
+    assert len(cache) == 1 and cache.stats()["bytes"] == 1